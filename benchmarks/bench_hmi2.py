@@ -0,0 +1,320 @@
+"""
+HMI2 Benchmark Suite
+End-to-end latency and throughput of Hmi2 against the local panel simulator.
+
+Runs src/hmi2.py over a mock UART (hmi2sim.PanelSerial standing in for
+machine.UART), over a pseudo-terminal (hmi2sim.PanelPty opened with
+hmi2transport.SerialPort, the CPython serial backend) and over loopback
+TCP (hmi2sim.PanelServer),
+and reports p50/p95/p99 latencies (the non-blocking poll(0) step included)
+plus sustained tag changes per second as JSON, so results can be diffed
+between revisions.
+
+Usage:
+    python benchmarks/bench_hmi2.py [--transport serial,pty,lan] [--output out.json]
+    python benchmarks/bench_hmi2.py --transport replay --replay scan.cap
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(SRC))
+
+import hmi2capture  # noqa: E402
+import hmi2sim  # noqa: E402
+import hmi2trace  # noqa: E402
+import hmi2transport  # noqa: E402
+
+
+def percentile(sortedSamples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sortedSamples:
+        return None
+    rank = int(round(pct / 100.0 * len(sortedSamples) + 0.5)) - 1
+    rank = max(0, min(rank, len(sortedSamples) - 1))
+    return sortedSamples[rank]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds."""
+    samples = sorted(samples)
+    if not samples:
+        return {'count': 0}
+    return {
+        'count': len(samples),
+        'mean_ms': sum(samples) / len(samples) * 1000.0,
+        'p50_ms': percentile(samples, 50) * 1000.0,
+        'p95_ms': percentile(samples, 95) * 1000.0,
+        'p99_ms': percentile(samples, 99) * 1000.0,
+        'max_ms': samples[-1] * 1000.0,
+    }
+
+
+def timeCalls(fn, iterations):
+    """Call fn(i) iterations times and return the per-call wall times."""
+    samples = []
+    clock = time.perf_counter
+    for i in range(iterations):
+        t0 = clock()
+        fn(i)
+        samples.append(clock() - t0)
+    return samples
+
+
+def loadHmi2():
+    import hmi2
+    return hmi2
+
+
+def connectSerial(args):
+    hmi2 = loadHmi2()
+    panel = hmi2sim.Panel(banks=1)
+    latency = args.latency_ms / 1000.0
+    uart = hmi2sim.PanelSerial(panel, latency=latency, loss=args.loss, seed=args.seed, baudrate=args.baudrate)
+    hmi = hmi2.Hmi2(profile=args.profile)
+    hmi.init(uart, auto_update=not args.no_auto_update, update_interval_ms=args.update_interval_ms,
+             background_scan=args.background_scan)
+    return hmi, panel.bank(1), None, panel
+
+
+def connectPty(args):
+    hmi2 = loadHmi2()
+    server = hmi2sim.PanelPty(latency=args.latency_ms / 1000.0, loss=args.loss, seed=args.seed).start()
+    port = hmi2transport.SerialPort(server.device, args.baudrate)
+    hmi = hmi2.Hmi2(profile=args.profile)
+    hmi.init(port, auto_update=not args.no_auto_update, update_interval_ms=args.update_interval_ms,
+             background_scan=args.background_scan)
+    return hmi, server.panel.bank(1), server, server.panel
+
+
+def connectLan(args):
+    hmi2 = loadHmi2()
+    server = hmi2sim.PanelServer('127.0.0.1', args.port, latency=args.latency_ms / 1000.0,
+                                 loss=args.loss, seed=args.seed).start()
+    hmi = hmi2.Hmi2(profile=args.profile)
+    hmi.init([('127.0.0.1', server.address[1], 1)], auto_update=not args.no_auto_update,
+             update_interval_ms=args.update_interval_ms, background_scan=args.background_scan)
+    # connect2Server() never blocks: step the connect until it completes
+    deadline = time.perf_counter() + hmi.connect_timeout
+    while not hmi.connect2Server() and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    if not hmi.lanConnectionStatus:
+        raise RuntimeError("could not connect to the simulator on port %d" % server.address[1])
+    return hmi, server.panel.bank(1), server, server.panel
+
+
+def applySettings(hmi, settings):
+    for item in settings:
+        name, _, value = item.partition('=')
+        setattr(hmi, name, json.loads(value))
+
+
+def runTransport(name, args):
+    connect = {'serial': connectSerial, 'pty': connectPty}.get(name, connectLan)
+    hmi, bank, server, panel = connect(args)
+    applySettings(hmi, args.set)
+    if args.metrics:
+        hmi.enableMetrics()
+    if args.profile_phases:
+        hmi.enableProfiler()
+    recorder = None
+    if args.trace:
+        recorder = hmi.addTraceHook(hmi2trace.TraceRecorder(args.trace))
+    if args.capture:
+        hmi.startCapture('%s.%s.cap' % (args.capture, name))
+    n = args.iterations
+    bSize, ndfSize = hmi.bSize, hmi.ndfSize
+    result = {'settings': {'linkTimeout': hmi.linkTimeout(),
+                           'bSize': bSize, 'ndfSize': ndfSize}}
+
+    try:
+        # Initial 'a' resync so the measured cycles are steady-state 'e' polls
+        hmi.update()
+
+        ops = {}
+        ops['getBoolean'] = summarize(timeCalls(lambda i: hmi.getBoolean(i % bSize, i % 16), n))
+        ops['setInt'] = summarize(timeCalls(lambda i: hmi.setInt(i % ndfSize, i + 1), n))
+        ops['setFloat'] = summarize(timeCalls(lambda i: hmi.setFloat(i % ndfSize, i + 0.5), n))
+
+        def printOp(i):
+            hmi.setCursor(0, i & 1)
+            hmi.print(i)
+        ops['print'] = summarize(timeCalls(printOp, n))
+        ops['update'] = summarize(timeCalls(lambda i: hmi.update(), n))
+        if hasattr(hmi, 'poll'):
+            # Non-blocking step: time spent per poll(0) call while cycles run
+            ops['poll'] = summarize(timeCalls(lambda i: hmi.poll(0), n))
+            while hmi.cycleState:
+                hmi.poll(100)
+        result['latency'] = ops
+
+        # Sustained inbound: queue changes on the panel, drain with update()
+        script = hmi2sim.randomScript(args.inbound, slot=1, bSize=bSize, ndfSize=ndfSize, seed=args.seed)
+        for event in script:
+            panel.apply(*event[1:])
+        t0 = time.perf_counter()
+        cycles = 0
+        while panel.pending(1) and cycles < args.inbound + 10:
+            hmi.update()
+            cycles += 1
+        elapsed = time.perf_counter() - t0
+        drained = args.inbound - panel.pending(1)
+        result['inbound'] = {
+            'changes': drained,
+            'seconds': elapsed,
+            'changes_per_s': drained / elapsed if elapsed > 0 else None,
+            'update_cycles': cycles,
+        }
+
+        # Sustained outbound: distinct values so every set* produces a frame
+        before = bank.writesReceived
+        t0 = time.perf_counter()
+        for i in range(args.outbound):
+            hmi.setInt(i % ndfSize, (i * 7 + 3) & 0xFFFF)
+        if hasattr(hmi, 'flush'):
+            hmi.flush()
+        elapsed = time.perf_counter() - t0
+        acked = bank.writesReceived - before
+        result['outbound'] = {
+            'changes': args.outbound,
+            'acked': acked,
+            'seconds': elapsed,
+            'changes_per_s': args.outbound / elapsed if elapsed > 0 else None,
+        }
+        result['panel'] = panel.stats()
+        if args.metrics:
+            result['metrics'] = hmi.getMetrics()
+        if args.profile_phases:
+            result['profile'] = hmi.getProfile()
+        if recorder is not None:
+            result['trace'] = {'recorded': len(recorder), 'dropped': recorder.dropped}
+    finally:
+        hmi.stopCapture()
+        if server is not None:
+            server.stop()
+    return result
+
+
+def runReplay(args):
+    """Drive update() through a recorded capture until it is played out."""
+    hmi2 = loadHmi2()
+    port = hmi2capture.ReplayPort(args.replay, speed=args.replay_speed)
+    hmi = hmi2.Hmi2(profile=args.profile)
+    hmi.init(port, auto_update=False, background_scan=False)
+    applySettings(hmi, args.set)
+    if args.metrics:
+        hmi.enableMetrics()
+    if args.profile_phases:
+        hmi.enableProfiler()
+    samples = []
+    clock = time.perf_counter
+    t0 = clock()
+    while not port.finished():
+        cursor = port.cursor
+        start = clock()
+        hmi.update()
+        samples.append(clock() - start)
+        if port.cursor == cursor:
+            # Nothing left in the capture that this scan asks for: not a replayed cycle
+            samples.pop()
+            break
+    elapsed = clock() - t0
+    result = {
+        'capture': args.replay,
+        'speed': args.replay_speed,
+        'seconds': elapsed,
+        'latency': {'update': summarize(samples)},
+        'replay': port.stats(),
+    }
+    if args.metrics:
+        result['metrics'] = hmi.getMetrics()
+    if args.profile_phases:
+        result['profile'] = hmi.getProfile()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Hmi2 latency/throughput benchmark')
+    parser.add_argument('--transport', default='serial,lan', help='comma separated: serial, pty, lan, replay')
+    parser.add_argument('--iterations', type=int, default=200, help='samples per latency operation')
+    parser.add_argument('--inbound', type=int, default=500, help='panel-side changes for the inbound test')
+    parser.add_argument('--outbound', type=int, default=500, help='set* calls for the outbound test')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='injected panel reply latency')
+    parser.add_argument('--loss', type=float, default=0.0, help='injected reply loss probability')
+    parser.add_argument('--baudrate', type=int, default=115200, help='simulated UART baud rate')
+    parser.add_argument('--port', type=int, default=0, help='simulator TCP port (0 = ephemeral)')
+    parser.add_argument('--profile', default=None, help='Hmi2 board profile (UNO, MEGA, DUE, ESP)')
+    parser.add_argument('--update-interval-ms', type=int, default=50)
+    parser.add_argument('--no-auto-update', action='store_true')
+    parser.add_argument('--metrics', action='store_true',
+                        help='record Hmi2 metrics (enableMetrics) and include the snapshot')
+    parser.add_argument('--profile-phases', action='store_true',
+                        help='profile update cycles per phase (enableProfiler) and include the summary')
+    parser.add_argument('--trace', type=int, default=0, metavar='N',
+                        help='attach a TraceRecorder of N events to measure tracing overhead')
+    parser.add_argument('--capture', metavar='PREFIX',
+                        help='capture each transport run to PREFIX.<transport>.cap (Hmi2.startCapture)')
+    parser.add_argument('--replay', metavar='FILE', help='capture log the replay transport plays back')
+    parser.add_argument('--replay-speed', type=float, default=0.0,
+                        help='replay speed: 1 = recorded timing, 0 = as fast as possible (default)')
+    parser.add_argument('--background-scan', action='store_true',
+                        help='let the library scan from its timer/thread backend while measuring')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=JSON',
+                        help='set an Hmi2 attribute after init, e.g. responseTimeout=200')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report to a file instead of stdout')
+    args = parser.parse_args(argv)
+
+    report = {
+        'benchmark': 'hmi2',
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'config': {
+            'iterations': args.iterations,
+            'inbound': args.inbound,
+            'outbound': args.outbound,
+            'latency_ms': args.latency_ms,
+            'loss': args.loss,
+            'baudrate': args.baudrate,
+            'update_interval_ms': args.update_interval_ms,
+            'profile': args.profile,
+            'auto_update': not args.no_auto_update,
+            'background_scan': args.background_scan,
+            'metrics': args.metrics,
+            'profile_phases': args.profile_phases,
+            'trace': args.trace,
+            'capture': args.capture,
+            'replay': args.replay,
+            'replay_speed': args.replay_speed,
+            'set': args.set,
+        },
+        'results': {},
+    }
+    for name in args.transport.split(','):
+        name = name.strip()
+        if name == 'replay':
+            if not args.replay:
+                parser.error("the replay transport needs --replay FILE")
+            report['results'][name] = runReplay(args)
+            continue
+        if name not in ('serial', 'pty', 'lan'):
+            parser.error("unknown transport %r" % name)
+        report['results'][name] = runTransport(name, args)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
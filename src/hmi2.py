@@ -1,20 +1,47 @@
 """
-HMI2 MicroPython Library
-A MicroPython port of the Arduino/ESP HMI2 control panel library.
-Supports LAN (socket) communication with HMI control panel app.
+HMI2 Library - MicroPython / PC
+A port of the Arduino/ESP HMI2 control panel library, one source for boards
+and PCs. Supports UART (serial) and LAN (socket) communication with HMI
+control panel app. On CPython the serial path takes any UART-like object
+(see hmi2transport.openSerial for USB-serial adapters) and background scans
+run from a thread instead of a machine.Timer.
 """
 
-import struct
 import time
-from machine import UART
+from array import array
+
+try:
+    from machine import Timer
+    import micropython
+except ImportError:
+    Timer = None
+
+try:
+    import threading
+except ImportError:
+    threading = None
+
+try:
+    from warnings import warn
+except ImportError:
+    warn = None  # MicroPython ports without the warnings module
+from hmi2codec import encode8, encode16, encode32, encodeFloat, decode8, decode16, decode32, decodeFloat
+from hmi2frame import FrameParser
+from hmi2transport import LanEngine, SharedLan, UartEngine, isSerial, ticksUs, ticksDiffUs, LINK_DOWN, LINK_CONNECTING, LINK_UP
+# hmi2metrics, hmi2profile, hmi2trace and hmi2capture are imported by the
+# calls that enable them, so a board that leaves them off never loads them
+
+# Time helpers for CPython (no ticks_ms in standard Python)
+try:
+    time.ticks_ms()
+except (AttributeError, TypeError):
+    time.ticks_ms = lambda: int(time.time() * 1000)
+    time.ticks_diff = lambda a, b: a - b
 try:
     import socket
-    import network
     LAN_AVAILABLE = True
-    print("[HMI2 DEBUG] socket imported, LAN_AVAILABLE=True")
 except ImportError:
     LAN_AVAILABLE = False
-    print("[HMI2 DEBUG] socket import failed, LAN_AVAILABLE=False")
 
 # Constants
 BYTE6MASK0 = 0x3F
@@ -41,69 +68,214 @@ HDMASK32 = 0xC0000000
 gmask8 = 0xFF
 gmask16 = 0xFFFF
 
+# Bit position of a single-bit mask (lowest-set-bit iteration)
+BIT_INDEX = {1 << i: i for i in range(16)}
+
+# Tag table sizes (bSize, ndfSize) per board, as in the original hmi2.h
+BOARD_PROFILES = {
+    'UNO': (20, 20),   # ATmega328P: UNO, NANO, LEONARDO
+    'MEGA': (60, 50),  # ATmega2560
+    'DUE': (60, 50),   # SAM3X8E
+    'ESP': (60, 50),   # ESP8266 / ESP32
+}
+DEFAULT_PROFILE = 'ESP'
+
+# Largest tables the panel app addresses
+MAX_B_SIZE = 60
+MAX_NDF_SIZE = 50
+
+# Precomputed 16-bit set/clear masks per bit position
+SET_MASK = tuple(1 << i for i in range(16))
+CLEAR_MASK = tuple(0xFFFF ^ (1 << i) for i in range(16))
+
 # Connection types
 HARD_SERIAL = 0
 SOFT_SERIAL = 1
 LAN = 2
 
+# Reply wait (ms) of links without a wire-time budget (LAN)
+RESPONSE_TIMEOUT = 900
+
+# Profiler phases, as numbered in hmi2profile (PHASE_*)
+PHASE_POLL = 0
+PHASE_DRAIN = 1
+PHASE_OVERRIDE = 3
+PHASE_FLUSH = 4
+
+# Write-behind flush buffer: one send per this many bytes of frames
+FLUSH_BUFFER_SIZE = 512
+
+# Timer-scheduled scans: ms one poll() step waits for the next reply
+SCAN_REPLY_WAIT = 10
+
+# poll() update-cycle states
+CYCLE_IDLE = 0
+CYCLE_POLL = 1  # 'a'/'e' sent, waiting for 'c'/'d'
+CYCLE_DRAIN = 2  # 'c' requests in flight
+CYCLE_FLUSH = 3  # pushed frames waiting for their acks
+
+
+class ScanLock:
+    """
+    Re-entrant guard for single-threaded background scans
+    (micropython.schedule): foreground calls always get it, and a scheduled
+    scan tick only when no foreground call is running.
+    """
+
+    def __init__(self):
+        self.depth = 0
+
+    def acquire(self, blocking=True):
+        if self.depth and not blocking:
+            return False
+        self.depth += 1
+        return True
+
+    def release(self):
+        self.depth -= 1
+
+    def __enter__(self):
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.depth -= 1
+
+
+def deprecated(name, replacement):
+    """Warn that Hmi2.name is deprecated in favour of hmi2codec.replacement (where warnings exist)."""
+    if warn is not None:
+        warn("Hmi2.%s is deprecated, use hmi2codec.%s" % (name, replacement), DeprecationWarning, 3)
+
 
 class Hmi2:
     """
-    HMI2 Control Panel Library for MicroPython.
+    HMI2 Control Panel Library for MicroPython and PC.
     Communicates via UART (hardware serial) or LAN (socket) with HMI control panel app.
+    The connection is chosen once in init(): bindLink() binds its engine
+    and link primitives, so request paths never branch on the connection type.
     Manages boolean, integer, double, and float data files with synchronization.
     Provides display/LCD functionality for text output.
     """
     
-    def __init__(self):
-        """Initialize HMI2 object with default values."""
-        print("[HMI2 DEBUG] __init__ start")
-        # File sizes - using ESP32 defaults (largest)
-        self.bSize = 60
-        self.ndfSize = 50
-        
+    def __init__(self, profile=None, b_size=None, ndf_size=None):
+        """
+        Initialize HMI2 object with default values.
+
+        Args:
+            profile: Board profile sizing the tag tables: 'UNO' (20/20),
+                'MEGA', 'DUE' or 'ESP' (60/50). Default 'ESP'
+            b_size: B File words, overrides the profile (1-60)
+            ndf_size: N/D/F File words, overrides the profile (1-50)
+        """
+        # File sizes - from the board profile, ESP32 defaults (largest)
+        if profile is None:
+            profile = DEFAULT_PROFILE
+        sizes = BOARD_PROFILES.get(str(profile).upper())
+        if sizes is None:
+            raise ValueError("Unknown board profile %r. Use one of %s." % (profile, ', '.join(sorted(BOARD_PROFILES))))
+        self.bSize = sizes[0] if b_size is None else b_size
+        self.ndfSize = sizes[1] if ndf_size is None else ndf_size
+        if not 1 <= self.bSize <= MAX_B_SIZE:
+            raise ValueError("b_size must be 1-%d" % MAX_B_SIZE)
+        if not 1 <= self.ndfSize <= MAX_NDF_SIZE:
+            raise ValueError("ndf_size must be 1-%d" % MAX_NDF_SIZE)
+        flagBytes = (self.ndfSize + 7) >> 3
+
+        # Tag tables are typed arrays and the N/D/F flags packed bit-arrays
+        # (bit word & 7 of byte word >> 3), to keep them small and unboxed
+        # on the heap.
+
         # B File (Boolean) - stored as 16-bit words, each bit is a boolean
-        self.bFile = [0] * 60
-        self.bFileOver = [0] * 60
-        self.bFileUpdate = [0] * 60
-        
+        self.bFile = array('H', [0] * self.bSize)
+        self.bFileOver = array('H', [0] * self.bSize)
+        self.bFileUpdate = array('H', [0] * self.bSize)
+
         # N File (16-bit unsigned integer)
-        self.nFile = [0] * 50
-        self.nFileOver = [False] * 50
-        self.nFileUpdate = [False] * 50
-        
+        self.nFile = array('H', [0] * self.ndfSize)
+        self.nFileOver = bytearray(flagBytes)
+        self.nFileUpdate = bytearray(flagBytes)
+
         # D File (32-bit unsigned integer)
-        self.dFile = [0] * 50
-        self.dFileOver = [False] * 50
-        self.dFileUpdate = [False] * 50
-        
-        # F File (float)
-        self.fFile = [0.0] * 50
-        self.fFileOver = [False] * 50
-        self.fFileUpdate = [False] * 50
-        
+        self.dFile = array('I', [0] * self.ndfSize)
+        self.dFileOver = bytearray(flagBytes)
+        self.dFileUpdate = bytearray(flagBytes)
+
+        # F File (float, IEEE-754 single precision like the wire format)
+        self.fFile = array('f', [0.0] * self.ndfSize)
+        self.fFileOver = bytearray(flagBytes)
+        self.fFileUpdate = bytearray(flagBytes)
+        self.fScratch = array('f', [0.0])
+
+        # Dirty indices: words/slots whose *Update flag is set, in first-write
+        # order, so pushes walk the written tags instead of the whole tables
+        self.bUpdateWords = bytearray(self.bSize)
+        self.bUpdateCount = 0
+        self.nUpdateList = bytearray(self.ndfSize)
+        self.nUpdateCount = 0
+        self.dUpdateList = bytearray(self.ndfSize)
+        self.dUpdateCount = 0
+        self.fUpdateList = bytearray(self.ndfSize)
+        self.fUpdateCount = 0
+
+        # Override templates, copied in bulk when the panel sends 'f'
+        self.bOverAll = array('H', [0xFFFF] * self.bSize)
+        self.ndfOverAll = b'\xff' * flagBytes
+
+        # Write-behind: tags changed locally but not yet sent
+        self.writeBehind = False
+        self.pendingWrites = False
+        self.bFilePending = array('H', [0] * self.bSize)
+        self.nFilePending = bytearray(flagBytes)
+        self.dFilePending = bytearray(flagBytes)
+        self.fFilePending = bytearray(flagBytes)
+        self.bPendingWords = bytearray(self.bSize)
+        self.bPendingCount = 0
+        self.nPendingList = bytearray(self.ndfSize)
+        self.nPendingCount = 0
+        self.dPendingList = bytearray(self.ndfSize)
+        self.dPendingCount = 0
+        self.fPendingList = bytearray(self.ndfSize)
+        self.fPendingCount = 0
+        self.flushBuffer = bytearray(FLUSH_BUFFER_SIZE)
+        self.flushView = memoryview(self.flushBuffer)
+        self.flushPos = 0
+        self.flushFrames = 0
+        self.flushAcked = 0
+
         # S File (16-bit signed integer) - not fully implemented in original
-        self.sFile = [0] * 8
+        self.sFile = array('h', [0] * 8)
         
         # Internal state
-        self.inCount = False
         self.syncro = True
         self.overrideSend = False
         self.overDisplay = False
+
+        # poll() update cycle
+        self.cycleState = CYCLE_IDLE
+        self.cycleAcks = 0  # acks owed for frames sent during the cycle
+        self.cycleOutstanding = 0  # 'c' replies owed
+        self.cycleReading = False
+        self.cyclePush = False
+        self.cycleTime = 0
+        self.displayPending = 0  # bit y set: line y changed during a cycle
         
-        # Data fragmentation variables
-        self.ld = 0
-        self.md = 0
-        self.hd = 0
-        self.ld32 = 0
-        self.md32 = 0
-        self.hd32 = 0
-        
-        self.tempValue = 0
-        self.tempValue32 = 0
-        
-        # Communication buffer
+        # Communication buffer (last complete reply frame)
         self.bufferSerial = bytearray(128)
+        # Preallocated request frames in LAN layout: slot, '@', command,
+        # payload, 'b'. Write paths patch the payload in place and send the
+        # *Out view, which skips the slot byte on UART (see initFrames)
+        self.basicFrame = bytearray(b'\x01@eb')
+        self.bFrame = bytearray(b'\x01@C\x00\x000b')  # word, bit, '1'/'0'
+        self.nFrame = bytearray(b'\x01@L' + bytes(4) + b'b')  # word, 3 digits
+        self.dFrame = bytearray(b'\x01@N' + bytes(7) + b'b')  # word, 6 digits
+        self.fFrame = bytearray(b'\x01@P' + bytes(7) + b'b')  # word, 6 digits
+        self.kFrame = bytearray(b'\x01@k' + bytes(34) + b'b')  # 16 chars x 2 digits, display ID, line
+        # Incoming byte streams, split into frames as they arrive
+        self.lanParser = FrameParser(256)
+        self.lanEngine = LanEngine(self.lanParser)
+        self.hardParser = FrameParser(256)
+        self.hardEngine = UartEngine(self.hardParser)
         
         # Display/LCD state
         self.lineA = bytearray(16)
@@ -122,8 +294,6 @@ class Hmi2:
         
         # LAN connection state
         self.reconectTime = 0
-        self.startTime = 0
-        self.serverTime = 0
         self.lanConnectionStatus = False
         self.lanTimeCount = False
         self.reconnectServer = True
@@ -131,6 +301,7 @@ class Hmi2:
         # Connection objects
         self.myHard = None
         self.myLAN = None
+        self.lanShared = None  # SharedLan this bank view runs on, if any
         self.connectionType = None
         
         # LAN settings
@@ -138,44 +309,87 @@ class Hmi2:
         self.myPort = 1030
         self.myLanSlot = 1
         self.connect_timeout = 5.0  # seconds for socket.connect()
+        self.responseTimeout = None  # ms to wait for a reply frame; None: the link's budget (linkTimeout)
+        self.drainWindow = 1  # 'c' requests in flight while draining changes
+
+        # Redundant endpoints: (ip, port, bank) in failover order
+        self.endpoints = []
+        self.endpointIndex = 0
+        self.standbyIndex = 0
+        self.standbyParser = None
+        self.standbyEngine = None  # warm connection to the next endpoint
+        self.failovers = 0
+        self.failoverMs = 0  # duration of the last failover (switch + state re-announce)
+
+        # Instrumentation (enableMetrics()); every hook is one attribute check while off
+        self.metrics = None
+        self.cycleStartUs = 0
+        self.profiler = None  # enableProfiler(): per-phase times of the update cycles
+        self.capture = None  # startCapture(): WireCapture logging every frame
+        # Trace subscribers (addTraceHook()); trace is None, the only one, or a TraceFanout
+        self.traceHooks = []
+        self.trace = None
 
         # Auto-update settings
         self.autoUpdateEnabled = True
         self.updateTimer = None
+        self.backgroundScan = True
+        self.scanLock = ScanLock() if Timer is not None or threading is None else threading.RLock()
+        self.scanStop = None  # Event stopping the scan thread (PC)
+        # Bound once: the timer callback must not allocate
+        self._timerRef = self._timerTick
+        self._scanRef = self._scheduledScan
         self.lastUpdateTime = 0
         self.updateInterval = 50  # milliseconds between updates
+        # Adaptive scan (enableAdaptiveScan): updateInterval is the floor
+        self.scanCeiling = None  # None: scan every updateInterval
+        self.scanPeriod = 50  # milliseconds between scans right now
+        self.scanBackoff = 2
+        self.scanHold = 3  # idle cycles before each backoff step
+        self.scanIdle = 0
+        self.scanActivity = False  # panel changes or local writes since the last cycle
         
+        self.initFrames()
+        self.bindLink()
         # Initialize LCD
         self.initLCD()
-        print("[HMI2 DEBUG] __init__ done")
 
-    def init(self, serial_or_ip, lan_memory_bank=None, auto_update=True, update_interval_ms=50, connect_timeout=5.0):
+    def init(self, serial_or_ip=None, lan_memory_bank=None, auto_update=True, update_interval_ms=50, connect_timeout=5.0, drain_window=1, write_behind=False, background_scan=True, baudrate=None, ip_address=None):
         """
         Initialize HMI2 connection.
 
         Args:
-            serial_or_ip: UART object for serial, or tuple/string for IP address (LAN)
+            serial_or_ip: UART object for serial (machine.UART, or any object with
+                write/readinto/any such as hmi2transport.openSerial()), tuple/string for IP address (LAN), a list of
+                (host, port, bank) endpoints for failover, or a SharedLan
             lan_memory_bank: Memory bank number (1-6) for LAN connection, ignored for serial
             auto_update: Enable automatic background updates (default: True)
             update_interval_ms: Interval between automatic updates in milliseconds (default: 50)
             connect_timeout: Socket connect timeout in seconds (default: 5.0, LAN only)
+            drain_window: 'c' requests kept in flight while draining panel changes (default: 1, no pipelining)
+            write_behind: Queue set* writes and send them coalesced on update()/flush() (default: False)
+            background_scan: Scan from a machine.Timer instead of only on API calls (default: True)
+            baudrate: UART baud rate for the reply timeouts (default: read from the UART, serial only)
+            ip_address: Alias of serial_or_ip, the keyword of the former PC-only init()
         """
-        print("[HMI2 DEBUG] init(serial_or_ip=%r, lan_memory_bank=%r, auto_update=%r, update_interval_ms=%r, connect_timeout=%r)" % (serial_or_ip, lan_memory_bank, auto_update, update_interval_ms, connect_timeout))
+        if serial_or_ip is None:
+            serial_or_ip = ip_address
+        if self.trace is not None:
+            self.trace('init', serial_or_ip, lan_memory_bank)
 
-        if isinstance(serial_or_ip, UART):
+        if isSerial(serial_or_ip):
             # Hardware serial (UART)
-            print("[HMI2 DEBUG] init: UART mode")
             self.initLCD()
             self.connectionType = HARD_SERIAL
             self.myHard = serial_or_ip
+            self.hardEngine.attach(serial_or_ip, baudrate)
+            self.bindLink()
             self.syncro = True
             self.overrideSend = False
             self.overDisplay = False
-        elif isinstance(serial_or_ip, (str, tuple, list)):
+        elif isinstance(serial_or_ip, (str, tuple, list, SharedLan)):
             # LAN connection
-            print("[HMI2 DEBUG] init: LAN mode")
             if not LAN_AVAILABLE:
-                print("[HMI2 DEBUG] init: LAN not available, raising")
                 raise RuntimeError("LAN support not available. socket module required.")
 
             self.initLCD()
@@ -183,12 +397,16 @@ class Hmi2:
             if isinstance(serial_or_ip, str):
                 parts = serial_or_ip.split('.')
                 self.myServer_ip = tuple(int(x) for x in parts)
-                print("[HMI2 DEBUG] init: IP from string -> %r" % (self.myServer_ip,))
+            elif isinstance(serial_or_ip, SharedLan):
+                self.lanShared = serial_or_ip
+                self.myServer_ip = serial_or_ip.serverIp
+            elif isinstance(serial_or_ip, (tuple, list)) and serial_or_ip and isinstance(serial_or_ip[0], (tuple, list)):
+                # Redundant endpoints [(host, port, bank), ...], the first one active
+                self.endpoints = [self.parseEndpoint(entry, lan_memory_bank) for entry in serial_or_ip]
+                self.myServer_ip = self.endpoints[0][0]
             elif isinstance(serial_or_ip, (tuple, list)):
                 self.myServer_ip = tuple(serial_or_ip)
-                print("[HMI2 DEBUG] init: IP from tuple/list -> %r" % (self.myServer_ip,))
             else:
-                print("[HMI2 DEBUG] init: invalid IP format, raising")
                 raise ValueError("Invalid IP address format. Use string or tuple.")
 
             self.myPort = 1030
@@ -201,288 +419,427 @@ class Hmi2:
                 self.myLanSlot = 6
             else:
                 self.myLanSlot = lan_memory_bank
+            if self.endpoints:
+                self.useEndpoint(0)
+                if len(self.endpoints) > 1:
+                    self.standbyIndex = 1
+                    self.standbyParser = FrameParser(256)
+                    self.standbyEngine = LanEngine(self.standbyParser)
 
             self.connectionType = LAN
             self.myLAN = None
             self.lanConnectionStatus = False
             self.reconnectServer = True
             self.connect_timeout = connect_timeout
+            if self.lanShared is not None:
+                # Frames go out on the shared socket, replies are routed back here
+                self.myPort = self.lanShared.port
+                self.lanEngine = self.lanShared.register(self)
+            self.bindLink()
             self.connect2Server()
             self.syncro = True
             self.overrideSend = False
             self.overDisplay = False
         else:
-            print("[HMI2 DEBUG] init: invalid parameter type, raising")
             raise ValueError("Invalid initialization parameter. Use UART object or IP address.")
 
+        self.initFrames()
+        self.drainWindow = max(1, drain_window)
+        self.writeBehind = write_behind
+        self.backgroundScan = background_scan
         self.autoUpdateEnabled = auto_update
         self.updateInterval = update_interval_ms
+        self.scanPeriod = update_interval_ms
         if self.autoUpdateEnabled:
             self._startAutoUpdate()
-        print("[HMI2 DEBUG] init done")
 
-    def connect2Server(self):
-        """Connect to LAN server. Returns True if connected."""
-        print("[HMI2 DEBUG] connect2Server() lanConnectionStatus=%r" % self.lanConnectionStatus)
-        if not self.lanConnectionStatus:
-            if not self.reconnectServer:
-                if (time.ticks_ms() - self.serverTime) > 3000:
-                    self.reconnectServer = True
-            
-            if self.reconnectServer:
-                self.reconnectServer = False
-                print("[HMI2 DEBUG] connect2Server: attempting connection to %r:%r" % (self.myServer_ip, self.myPort))
-                try:
-                    # Create socket address tuple directly
-                    addr = ('.'.join(map(str, self.myServer_ip)), self.myPort)
-                    self.myLAN = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    self.myLAN.settimeout(self.connect_timeout)
-                    self.myLAN.connect(addr)
-                    self.lanTimeCount = False
-                    self.lanConnectionStatus = True
-                    print("[HMI2 DEBUG] connect2Server: connected OK")
-                    return True
-                except Exception as e:
-                    print("[HMI2 DEBUG] connect2Server: exception %r" % e)
-                    self.serverTime = time.ticks_ms()
-                    if self.myLAN:
-                        try:
-                            self.myLAN.close()
-                        except:
-                            pass
-                        self.myLAN = None
-                    return False
-            else:
-                print("[HMI2 DEBUG] connect2Server: not reconnecting yet, return False")
-                return False
+    def initFrames(self):
+        """Stamp the bank slot into the frame templates and select the layout of the connection."""
+        self.slotBytes = 0 if self.connectionType == HARD_SERIAL else 1
+        frames = (self.basicFrame, self.bFrame, self.nFrame, self.dFrame, self.fFrame, self.kFrame)
+        for frame in frames:
+            frame[0] = self.myLanSlot
+        self.basicOut, self.bOut, self.nOut, self.dOut, self.fOut, self.kOut = [
+            memoryview(frame)[1 - self.slotBytes:] for frame in frames]
+
+    def bindLink(self):
+        """
+        Bind the link of the connection chosen in init(): `link` is the
+        engine frames go through (UartEngine, or the active LAN engine) and
+        linkOpen/checkResponse/replyTimeout/linkLost its primitives, so the
+        request paths call them directly. Called again when failover swaps
+        the LAN engine.
+        """
+        if self.connectionType == HARD_SERIAL:
+            self.link = self.hardEngine
+            self.linkOpen = self.hardEngine.ready
+            self.checkResponse = self.checkHardResponse
+            self.replyTimeout = self.cleanHardSerial
+            self.linkLost = self.cleanHardSerial
+            self.linkBudget = self.hardEngine.frameTimeout()
         else:
-            print("[HMI2 DEBUG] connect2Server: already connected, return True")
+            self.link = self.lanEngine
+            self.linkOpen = self.connect2Server
+            self.checkResponse = self.checkLANResponse
+            self.replyTimeout = self.lanReplyTimeout
+            self.linkLost = self.lanLost
+            self.linkBudget = RESPONSE_TIMEOUT
+
+    def connect2Server(self):
+        """
+        Advance the LAN connection without blocking. Returns True if connected.
+        While the link is down, connect attempts are spaced by exponential
+        backoff with jitter (see getNextRetry()); in between this returns
+        False at once and the API works from the local tables.
+        """
+        if self.lanShared is not None:
+            up = self.lanShared.connect()
+            if up and not self.lanConnectionStatus and self.metrics is not None:
+                self.metrics.connected()
+            self.lanConnectionStatus = up
+            return up
+        if self.lanEngine.connected:
             return True
-    
+        if self.reconnectServer:
+            # First attempt after init(): no backoff to wait for
+            self.reconnectServer = False
+            self.lanEngine.retryNow()
+        addr = ('.'.join(map(str, self.myServer_ip)), self.myPort)
+        if self.lanEngine.connectStep(addr, int(self.connect_timeout * 1000)):
+            self.myLAN = self.lanEngine.sock
+            self.lanTimeCount = False
+            self.lanConnectionStatus = True
+            if self.metrics is not None:
+                self.metrics.connected()
+            if self.trace is not None:
+                self.trace('connect', addr)
+            return True
+        if self.standbyEngine is not None and self.lanEngine.state == LINK_DOWN and self.standbyStep():
+            # Active endpoint failed and is backing off: take over the warm standby
+            return self.failover()
+        self.myLAN = None
+        self.lanConnectionStatus = False
+        if self.trace is not None:
+            self.trace('connectWait', self.lanEngine.state, self.lanEngine.retryIn())
+        return False
+
+    def parseEndpoint(self, entry, lan_memory_bank=None):
+        """Normalize a (host, port, bank) endpoint; port and bank are optional."""
+        host = entry[0]
+        if isinstance(host, str):
+            ip = tuple(int(x) for x in host.split('.'))
+        elif isinstance(host, (tuple, list)):
+            ip = tuple(host)
+        else:
+            raise ValueError("Invalid endpoint host %r. Use string or tuple." % (host,))
+        port = entry[1] if len(entry) > 1 else 1030
+        bank = entry[2] if len(entry) > 2 else (lan_memory_bank or 1)
+        return (ip, port, min(6, max(1, bank)))
+
+    def useEndpoint(self, index):
+        """Make endpoints[index] the target of the active connection."""
+        self.endpointIndex = index
+        self.myServer_ip, self.myPort, self.myLanSlot = self.endpoints[index]
+        self.initFrames()
+
+    def standbyStep(self):
+        """
+        Keep the warm standby connection up without blocking: probe it for
+        a close by the peer, or advance its (backed-off) reconnect.
+        Returns True if the standby is connected.
+        """
+        engine = self.standbyEngine
+        if engine.connected:
+            if engine.wait(0) >= 0:
+                # A standby has nothing to answer; drop stray bytes
+                self.standbyParser.reset()
+                return True
+            return False
+        ip, port, slot = self.endpoints[self.standbyIndex]
+        return engine.connectStep(('.'.join(map(str, ip)), port), int(self.connect_timeout * 1000))
+
+    def failover(self):
+        """
+        Switch to the connected standby endpoint and re-announce the full
+        local state to it: every written tag and both display lines are
+        flushed, and the next cycle resyncs with 'a'.
+        The old connection becomes the standby and reconnects with backoff.
+        Returns True if the new link is up.
+        """
+        start = time.ticks_ms()
+        if self.trace is not None:
+            self.trace('failover', self.endpointIndex, self.standbyIndex)
+        if self.metrics is not None:
+            self.metrics.disconnected()
+            self.metrics.connected()
+        self.lanEngine.close()
+        self.lanEngine, self.standbyEngine = self.standbyEngine, self.lanEngine
+        self.lanParser, self.standbyParser = self.standbyParser, self.lanParser
+        self.lanParser.reset()
+        self.bindLink()
+        self.useEndpoint(self.standbyIndex)
+        self.standbyIndex = (self.endpointIndex + 1) % len(self.endpoints)
+        self.myLAN = self.lanEngine.sock
+        self.lanTimeCount = False
+        self.lanConnectionStatus = True
+        self.failovers += 1
+
+        self.reannounce()
+        self.flush()
+        self.failoverMs = time.ticks_diff(time.ticks_ms(), start)
+        return self.lanEngine.connected
+
+    def linkUp(self):
+        """True if frames can go out now (UART, or an established LAN link)."""
+        return self.link.connected
+
+    def getConnectionState(self):
+        """Connection state: LINK_DOWN, LINK_CONNECTING or LINK_UP."""
+        return self.link.state
+
+    def getNextRetry(self):
+        """Milliseconds until the next LAN connect attempt (0 when connected or due)."""
+        return self.link.retryIn()
+
     # Boolean (B File) methods
     def getBoolean(self, word, bit):
         """Get boolean value from B File at word, bit position."""
-        print("[HMI2 DEBUG] getBoolean(word=%r, bit=%r)" % (word, bit))
         self._autoUpdate()
-        r = self.readBFile(word, bit)
-        print("[HMI2 DEBUG] getBoolean -> %r" % r)
-        return r
+        return self.readBFile(word, bit)
     
     def getBFileBit(self, word, bit):
         """Get boolean value from B File at word, bit position."""
-        print("[HMI2 DEBUG] getBFileBit(word=%r, bit=%r)" % (word, bit))
         self._autoUpdate()
         return self.readBFile(word, bit)
     
     def setBoolean(self, word, bit, value):
         """Set boolean value in B File at word, bit position."""
-        print("[HMI2 DEBUG] setBoolean(word=%r, bit=%r, value=%r)" % (word, bit, value))
         self.writeBFile(word, bit, value)
         self._autoUpdate()
     
     def setBFileBit(self, word, bit, value):
         """Set boolean value in B File at word, bit position."""
-        print("[HMI2 DEBUG] setBFileBit(word=%r, bit=%r, value=%r)" % (word, bit, value))
         self.writeBFile(word, bit, value)
         self._autoUpdate()
     
     def readBFile(self, word, bit):
         """Read boolean from B File."""
-        print("[HMI2 DEBUG] readBFile(word=%r, bit=%r)" % (word, bit))
-        if (word >= 0 and word < self.bSize) and (bit >= 0 and bit < 16):
-            r = self.getBitWord(word, bit)
-            print("[HMI2 DEBUG] readBFile -> %r" % r)
-            return r
-        print("[HMI2 DEBUG] readBFile -> False (out of range)")
-        return False
+        with self.scanLock:
+            if (word >= 0 and word < self.bSize) and (bit >= 0 and bit < 16):
+                r = self.getBitWord(word, bit)
+                if self.trace is not None:
+                    self.trace('readBFile', word, bit, r)
+                return r
+            if self.trace is not None:
+                self.trace('readBFile', word, bit, False)
+            return False
     
     def writeBFile(self, word, bit, value):
         """Write boolean to B File."""
-        print("[HMI2 DEBUG] writeBFile(word=%r, bit=%r, value=%r)" % (word, bit, value))
-        if (word >= 0 and word < self.bSize) and (bit >= 0 and bit < 16):
-            if (self.getBitWord(word, bit) != value) or self.getBitWordOver(word, bit):
-                self.setBitWord(word, bit, value)
-                self.setBitWordUpdate(word, bit)
-                self.writeBFile2(word, bit, value)
+        if self.trace is not None:
+            self.trace('writeBFile', word, bit, value)
+        with self.scanLock:
+            if (word >= 0 and word < self.bSize) and (bit >= 0 and bit < 16):
+                if (self.getBitWord(word, bit) != value) or self.getBitWordOver(word, bit):
+                    self.setBitWord(word, bit, value)
+                    self.setBitWordUpdate(word, bit)
+                    self.scanActivity = True
+                    if self.writeBehind or self.cycleState != CYCLE_IDLE or not self.linkUp():
+                        self.setBitWordPending(word, self.setBitToInt(bit))
+                    else:
+                        self.writeBFile2(word, bit, value)
     
     # Integer (N File) methods
     def getInt(self, word):
         """Get 16-bit unsigned integer from N File."""
-        print("[HMI2 DEBUG] getInt(word=%r)" % word)
         self._autoUpdate()
         return self.readNFile(word)
     
     def getNFile(self, word):
         """Get 16-bit unsigned integer from N File."""
-        print("[HMI2 DEBUG] getNFile(word=%r)" % word)
         self._autoUpdate()
         return self.readNFile(word)
     
     def setInt(self, word, value):
         """Set 16-bit unsigned integer in N File."""
-        print("[HMI2 DEBUG] setInt(word=%r, value=%r)" % (word, value))
         self.writeNFile(word, value)
         self._autoUpdate()
     
     def setNFile(self, word, value):
         """Set 16-bit unsigned integer in N File."""
-        print("[HMI2 DEBUG] setNFile(word=%r, value=%r)" % (word, value))
         self.writeNFile(word, value)
         self._autoUpdate()
     
     def readNFile(self, word):
         """Read 16-bit unsigned integer from N File."""
-        print("[HMI2 DEBUG] readNFile(word=%r)" % word)
-        if word >= 0 and word < self.ndfSize:
-            r = self.nFile[word]
-            print("[HMI2 DEBUG] readNFile -> %r" % r)
-            return r
-        print("[HMI2 DEBUG] readNFile -> 0 (out of range)")
-        return 0
+        with self.scanLock:
+            if word >= 0 and word < self.ndfSize:
+                r = self.nFile[word]
+                if self.trace is not None:
+                    self.trace('readNFile', word, r)
+                return r
+            if self.trace is not None:
+                self.trace('readNFile', word, 0)
+            return 0
     
     def writeNFile(self, word, value):
         """Write 16-bit unsigned integer to N File."""
-        print("[HMI2 DEBUG] writeNFile(word=%r, value=%r)" % (word, value))
-        if word >= 0 and word < self.ndfSize:
-            if (self.nFile[word] != value) or self.getNWordOver(word):
-                self.nFile[word] = value
-                self.nFileUpdate[word] = True
-                self.writeNFile2(word, value)
+        if self.trace is not None:
+            self.trace('writeNFile', word, value)
+        with self.scanLock:
+            if word >= 0 and word < self.ndfSize:
+                value &= gmask16
+                if (self.nFile[word] != value) or self.getNWordOver(word):
+                    self.nFile[word] = value
+                    self.setNWordUpdate(word)
+                    self.scanActivity = True
+                    if self.writeBehind or self.cycleState != CYCLE_IDLE or not self.linkUp():
+                        self.setNWordPending(word)
+                    else:
+                        self.writeNFile2(word, value)
     
     # Double/32-bit Integer (D File) methods
     def getDouble(self, word):
         """Get 32-bit unsigned integer from D File."""
-        print("[HMI2 DEBUG] getDouble(word=%r)" % word)
         self._autoUpdate()
         return self.readDFile(word)
     
     def getDInt(self, word):
         """Get 32-bit unsigned integer from D File."""
-        print("[HMI2 DEBUG] getDInt(word=%r)" % word)
         self._autoUpdate()
         return self.readDFile(word)
     
     def setDouble(self, word, value):
         """Set 32-bit unsigned integer in D File."""
-        print("[HMI2 DEBUG] setDouble(word=%r, value=%r)" % (word, value))
         self.writeDFile(word, value)
         self._autoUpdate()
     
     def setDInt(self, word, value):
         """Set 32-bit unsigned integer in D File."""
-        print("[HMI2 DEBUG] setDInt(word=%r, value=%r)" % (word, value))
         self.writeDFile(word, value)
         self._autoUpdate()
     
     def readDFile(self, word):
         """Read 32-bit unsigned integer from D File."""
-        print("[HMI2 DEBUG] readDFile(word=%r)" % word)
-        if word >= 0 and word < self.ndfSize:
-            r = self.dFile[word]
-            print("[HMI2 DEBUG] readDFile -> %r" % r)
-            return r
-        print("[HMI2 DEBUG] readDFile -> 0 (out of range)")
-        return 0
+        with self.scanLock:
+            if word >= 0 and word < self.ndfSize:
+                r = self.dFile[word]
+                if self.trace is not None:
+                    self.trace('readDFile', word, r)
+                return r
+            if self.trace is not None:
+                self.trace('readDFile', word, 0)
+            return 0
     
     def writeDFile(self, word, value):
         """Write 32-bit unsigned integer to D File."""
-        print("[HMI2 DEBUG] writeDFile(word=%r, value=%r)" % (word, value))
-        if word >= 0 and word < self.ndfSize:
-            if (self.dFile[word] != value) or self.getDWordOver(word):
-                self.dFile[word] = value
-                self.dFileUpdate[word] = True
-                self.writeDFile2(word, value)
+        if self.trace is not None:
+            self.trace('writeDFile', word, value)
+        with self.scanLock:
+            if word >= 0 and word < self.ndfSize:
+                value &= 0xFFFFFFFF
+                if (self.dFile[word] != value) or self.getDWordOver(word):
+                    self.dFile[word] = value
+                    self.setDWordUpdate(word)
+                    self.scanActivity = True
+                    if self.writeBehind or self.cycleState != CYCLE_IDLE or not self.linkUp():
+                        self.setDWordPending(word)
+                    else:
+                        self.writeDFile2(word, value)
     
     # Float (F File) methods
     def getFloat(self, word):
         """Get float value from F File."""
-        print("[HMI2 DEBUG] getFloat(word=%r)" % word)
         self._autoUpdate()
         return self.readFFile(word)
     
     def getFFile(self, word):
         """Get float value from F File."""
-        print("[HMI2 DEBUG] getFFile(word=%r)" % word)
         self._autoUpdate()
         return self.readFFile(word)
     
     def setFloat(self, word, value):
         """Set float value in F File."""
-        print("[HMI2 DEBUG] setFloat(word=%r, value=%r)" % (word, value))
         self.writeFFile(word, value)
         self._autoUpdate()
     
     def setFFile(self, word, value):
         """Set float value in F File."""
-        print("[HMI2 DEBUG] setFFile(word=%r, value=%r)" % (word, value))
         self.writeFFile(word, value)
         self._autoUpdate()
     
     def readFFile(self, word):
         """Read float from F File."""
-        print("[HMI2 DEBUG] readFFile(word=%r)" % word)
-        if word >= 0 and word < self.ndfSize:
-            r = self.fFile[word]
-            print("[HMI2 DEBUG] readFFile -> %r" % r)
-            return r
-        print("[HMI2 DEBUG] readFFile -> 0.0 (out of range)")
-        return 0.0
+        with self.scanLock:
+            if word >= 0 and word < self.ndfSize:
+                r = self.fFile[word]
+                if self.trace is not None:
+                    self.trace('readFFile', word, r)
+                return r
+            if self.trace is not None:
+                self.trace('readFFile', word, 0.0)
+            return 0.0
     
     def writeFFile(self, word, value):
         """Write float to F File."""
-        print("[HMI2 DEBUG] writeFFile(word=%r, value=%r)" % (word, value))
-        if word >= 0 and word < self.ndfSize:
-            if (self.fFile[word] != value) or self.getFWordOver(word):
-                self.fFile[word] = value
-                self.fFileUpdate[word] = True
-                self.writeFFile2(word, value)
+        if self.trace is not None:
+            self.trace('writeFFile', word, value)
+        with self.scanLock:
+            if word >= 0 and word < self.ndfSize:
+                # Round to single precision first so unchanged values compare equal
+                self.fScratch[0] = value
+                value = self.fScratch[0]
+                if (self.fFile[word] != value) or self.getFWordOver(word):
+                    self.fFile[word] = value
+                    self.setFWordUpdate(word)
+                    self.scanActivity = True
+                    if self.writeBehind or self.cycleState != CYCLE_IDLE or not self.linkUp():
+                        self.setFWordPending(word)
+                    else:
+                        self.writeFFile2(word, value)
     
     # Display/LCD methods
     def setCursor(self, x, y):
         """Set cursor position for display."""
-        print("[HMI2 DEBUG] setCursor(x=%r, y=%r)" % (x, y))
+        if self.trace is not None:
+            self.trace('setCursor', x, y)
         self.xCursor = x
         self.yCursor = y
     
     def setDisplayID(self, lcdID):
         """Set current display ID (1-10)."""
-        print("[HMI2 DEBUG] setDisplayID(lcdID=%r)" % lcdID)
         if lcdID < 1:
             self.displayID = 1
         elif lcdID > 10:
             self.displayID = 10
         else:
             self.displayID = lcdID
-        print("[HMI2 DEBUG] setDisplayID -> displayID=%r" % self.displayID)
+        if self.trace is not None:
+            self.trace('setDisplayID', self.displayID)
 
     def clearLine0(self):
         """Clear line 0 of display."""
-        print("[HMI2 DEBUG] clearLine0()")
         for i in range(16):
             self.lineA[i] = 32  # Space
     
     def clearLine1(self):
         """Clear line 1 of display."""
-        print("[HMI2 DEBUG] clearLine1()")
         for i in range(16):
             self.lineB[i] = 32  # Space
     
     def resetPostLines(self):
         """Reset post lines for change detection."""
-        print("[HMI2 DEBUG] resetPostLines()")
         for i in range(16):
             self.lineAPost[i] = 32
             self.lineBPost[i] = 32
     
     def print(self, value):
         """Print value to display at current cursor position."""
-        print("[HMI2 DEBUG] print(value=%r)" % value)
         self.writeText2Line(str(value))
         self._autoUpdate()
     
     def initLCD(self):
         """Initialize LCD display state."""
-        print("[HMI2 DEBUG] initLCD()")
         self.clearLine0()
         self.clearLine1()
         self.xCursor = 0
@@ -491,107 +848,196 @@ class Hmi2:
     
     def writeText2Line(self, value):
         """Write text to display line."""
-        print("[HMI2 DEBUG] writeText2Line(value=%r)" % value)
-        okRX = False
-        
-        if self.xCursor >= 0 and self.xCursor < 16:
-            if self.yCursor == 0 or self.yCursor == 1:
-                tempSize = len(value)
-                if tempSize > 0:
-                    for i in range(tempSize):
-                        if self.yCursor == 0:
-                            if self.xCursor < 16:
-                                self.lineA[self.xCursor] = ord(value[i]) if i < len(value) else 32
-                        else:
-                            if self.xCursor < 16:
-                                self.lineB[self.xCursor] = ord(value[i]) if i < len(value) else 32
-                        
-                        self.xCursor += 1
-                        if self.xCursor >= 16:
-                            break
-                    
-                    # Check for changes
-                    for i in range(16):
-                        if self.yCursor == 0:
-                            if self.lineA[i] != self.lineAPost[i]:
-                                okRX = True
-                                self.lineAPost[i] = self.lineA[i]
-                        else:
-                            if self.lineB[i] != self.lineBPost[i]:
-                                okRX = True
-                                self.lineBPost[i] = self.lineB[i]
-        
-        if okRX or self.overDisplay:
-            print("[HMI2 DEBUG] writeText2Line: sending display data (okRX=%r, overDisplay=%r)" % (okRX, self.overDisplay))
-            if self.connectionType == HARD_SERIAL:
-                try:
-                    data = bytearray([64, ord('k')])
-                    for i in range(16):
-                        if self.yCursor == 0:
-                            self.fragmentData8(self.lineA[i])
-                        else:
-                            self.fragmentData8(self.lineB[i])
-                        data.append(self.md)
-                        data.append(self.ld)
-                    data.append(self.displayID)
-                    if self.yCursor == 0:
-                        data.append(49)  # '1'
-                    else:
-                        data.append(48)  # '0'
-                    data.append(98)  # 'b'
-                    self.myHard.write(data)
-                    self.checkHardResponse()
-                except Exception as e:
-                    print("[HMI2 DEBUG] writeText2Line: UART write exception %r" % e)
-
-            elif self.connectionType == LAN and self.connect2Server():
-                try:
-                    data = bytearray([self.myLanSlot, 64, ord('k')])
+        if self.trace is not None:
+            self.trace('writeText2Line', value)
+        with self.scanLock:
+            okRX = False
+
+            if self.xCursor >= 0 and self.xCursor < 16:
+                if self.yCursor == 0 or self.yCursor == 1:
+                    tempSize = len(value)
+                    if tempSize > 0:
+                        for i in range(tempSize):
+                            if self.yCursor == 0:
+                                if self.xCursor < 16:
+                                    self.lineA[self.xCursor] = ord(value[i]) if i < len(value) else 32
+                            else:
+                                if self.xCursor < 16:
+                                    self.lineB[self.xCursor] = ord(value[i]) if i < len(value) else 32
+
+                            self.xCursor += 1
+                            if self.xCursor >= 16:
+                                break
+
+                        # Check for changes
+                        for i in range(16):
+                            if self.yCursor == 0:
+                                if self.lineA[i] != self.lineAPost[i]:
+                                    okRX = True
+                                    self.lineAPost[i] = self.lineA[i]
+                            else:
+                                if self.lineB[i] != self.lineBPost[i]:
+                                    okRX = True
+                                    self.lineBPost[i] = self.lineB[i]
+
+            if okRX or self.overDisplay:
+                self.scanActivity = True
+            if (okRX or self.overDisplay) and (self.writeBehind or self.cycleState != CYCLE_IDLE or not self.linkUp()):
+                # Queued like the tags: sent by the next flush, or when the
+                # poll() cycle that owns the link ends
+                self.displayPending |= 1 << self.yCursor
+                self.pendingWrites = True
+            elif okRX or self.overDisplay:
+                if self.linkOpen():
+                    frame = self.kFrame
+                    chars = self.lineA if self.yCursor == 0 else self.lineB
                     for i in range(16):
-                        if self.yCursor == 0:
-                            self.fragmentData8(self.lineA[i])
-                        else:
-                            self.fragmentData8(self.lineB[i])
-                        data.append(self.md)
-                        data.append(self.ld)
-                    data.append(self.displayID)
-                    if self.yCursor == 0:
-                        data.append(49)
-                    else:
-                        data.append(48)
-                    data.append(98)
-                    self.myLAN.send(data)
-                    self.checkLANResponse()
-                except Exception as e:
-                    print("[HMI2 DEBUG] writeText2Line: send exception %r" % e)
-                    self.lanConnectionStatus = False
-                    self.reconnectServer = True
+                        encode8(frame, 3 + 2 * i, chars[i])
+                    frame[35] = self.displayID
+                    frame[36] = 49 if self.yCursor == 0 else 48
+                    self.request(self.kOut)
 
     # Auto-update methods
     def _startAutoUpdate(self):
-        """Start automatic background updates using a timer."""
-        print("[HMI2 DEBUG] _startAutoUpdate()")
+        """
+        Start automatic background updates.
+        On boards a periodic machine.Timer schedules (micropython.schedule)
+        poll() steps every updateInterval, for as long as replies keep
+        coming within the tick's budget (see _scanSteps); on PC a daemon
+        thread runs one poll() cycle every updateInterval, taking the scan
+        lock per step and waiting for replies outside it.
+        Either way the panel is synced even when the application does not
+        touch the API. Without a timer or threading, updates stay
+        call-driven through _autoUpdate. With enableAdaptiveScan() the
+        drivers still tick every updateInterval and skip undue ticks.
+        """
+        self.lastUpdateTime = time.ticks_ms()
+        self._stopAutoUpdate()
+        if not self.backgroundScan or self.lanShared is not None:
+            return
+        if Timer is None:
+            if threading is not None:
+                self.scanStop = threading.Event()
+                self.updateTimer = threading.Thread(target=self._scanLoop, args=(self.scanStop,), name='hmi2-scan')
+                self.updateTimer.daemon = True
+                self.updateTimer.start()
+            return
         try:
-            # Try to use Timer for periodic updates
-            # Note: Timer implementation varies by platform
-            # For ESP32/ESP8266, we'll use a different approach
-            self.lastUpdateTime = time.ticks_ms()
+            try:
+                self.updateTimer = Timer(-1)
+            except ValueError:
+                # Ports without virtual timers
+                self.updateTimer = Timer(0)
+            self.updateTimer.init(period=self.updateInterval, mode=Timer.PERIODIC, callback=self._timerRef)
         except Exception as ex:
-            print("[HMI2 DEBUG] _startAutoUpdate exception: %r" % ex)
+            self.countError('_startAutoUpdate', ex)
+            self.updateTimer = None
+
+    def _stopAutoUpdate(self):
+        """Stop the background timer or scan thread, if running."""
+        timer = self.updateTimer
+        self.updateTimer = None
+        if timer is None:
+            return
+        if self.scanStop is not None:
+            self.scanStop.set()
+            self.scanStop = None
+            return
+        try:
+            timer.deinit()
+        except Exception as ex:
+            self.countError('_stopAutoUpdate', ex)
+
+    def _scanLoop(self, stop):
+        while not stop.wait(self.updateInterval / 1000.0):
+            try:
+                if self.scanCeiling is not None:
+                    now = time.ticks_ms()
+                    if not self.scanDue(now, self.updateInterval // 2):
+                        continue
+                    self.lastUpdateTime = now
+                self._scanCycle(stop)
+            except Exception as ex:
+                self.countError('_scanLoop', ex)
+
+    def _scanCycle(self, stop):
+        """
+        One update cycle in poll(0) steps. The scan lock is held while a
+        step sends requests and applies the replies that have arrived, and
+        released while waiting for the next ones, so foreground get*/set*
+        calls wait for one step, never for a round trip.
+        """
+        started = False
+        while not stop.is_set():
+            with self.scanLock:
+                if started and self.cycleState == CYCLE_IDLE:
+                    return  # aborted, or finished by a foreground update()
+                if self.poll(0) or self.cycleState == CYCLE_IDLE:
+                    return
+                started = True
+                link = self.link
+                timeout = self.linkTimeout()
+            link.waitReadable(timeout)
+
+    def _timerTick(self, timer):
+        # Timer context: defer the scan to the scheduler, allocation free
+        try:
+            micropython.schedule(self._scanRef, 0)
+        except RuntimeError:
+            pass  # schedule queue full: skip this tick
+
+    def _scheduledScan(self, arg):
+        # Skip the tick if the foreground is inside the library
+        if not self.scanLock.acquire(False):
+            return
+        try:
+            if self.scanCeiling is not None and self.cycleState == CYCLE_IDLE:
+                # Floor-rate tick: start a cycle only once the adaptive period is up
+                now = time.ticks_ms()
+                if not self.scanDue(now, self.updateInterval // 2):
+                    return
+                self.lastUpdateTime = now
+            self._scanSteps()
+        except Exception as ex:
+            self.countError('_scheduledScan', ex)
+        finally:
+            self.scanLock.release()
+
+    def _scanSteps(self):
+        """
+        Drive the cycle from one timer tick while its replies keep coming:
+        poll() steps waiting up to SCAN_REPLY_WAIT ms each, until the cycle
+        is done, a step gets no reply (the cycle waits on the link) or half
+        an update interval has gone. A drain then takes its round trips,
+        not one tick per record.
+        """
+        start = time.ticks_ms()
+        budget = self.updateInterval // 2
+        while True:
+            mark = time.ticks_ms()
+            if self.poll(SCAN_REPLY_WAIT) or self.cycleState == CYCLE_IDLE:
+                return
+            if time.ticks_diff(self.cycleTime, mark) < 0:
+                return  # no reply during the step
+            if time.ticks_diff(time.ticks_ms(), start) >= budget:
+                return
     
     def _autoUpdate(self):
         """Automatically call update() if enough time has passed."""
-        if not self.autoUpdateEnabled:
+        if not self.autoUpdateEnabled or self.updateTimer is not None:
             return
         
         currentTime = time.ticks_ms()
-        if time.ticks_diff(currentTime, self.lastUpdateTime) >= self.updateInterval:
+        if self.scanDue(currentTime):
             self.lastUpdateTime = currentTime
-            print("[HMI2 DEBUG] _autoUpdate: calling update()")
             try:
-                self.update()
+                if self.cycleState != CYCLE_IDLE:
+                    # poll() is driving a cycle: step it without blocking
+                    self.poll(0)
+                else:
+                    self.update()
             except Exception as ex:
-                print("[HMI2 DEBUG] _autoUpdate: update() exception %r" % ex)
+                self.countError('_autoUpdate', ex)
     
     def enableAutoUpdate(self, enabled=True, interval_ms=50):
         """
@@ -601,343 +1047,934 @@ class Hmi2:
             enabled: True to enable auto-update, False to disable
             interval_ms: Update interval in milliseconds (only used when enabling)
         """
-        print("[HMI2 DEBUG] enableAutoUpdate(enabled=%r, interval_ms=%r)" % (enabled, interval_ms))
+        if self.trace is not None:
+            self.trace('autoUpdate', enabled, interval_ms)
         self.autoUpdateEnabled = enabled
         self.updateInterval = interval_ms
+        self.scanPeriod = interval_ms
         if enabled:
             self._startAutoUpdate()
+        else:
+            self._stopAutoUpdate()
+
+    def enableAdaptiveScan(self, enabled=True, ceiling_ms=1000, backoff=2, hold_cycles=3):
+        """
+        Stretch the scan interval while the panel is idle.
+        After hold_cycles cycles in a row with no panel change and no local
+        write, each further idle cycle multiplies the interval by backoff,
+        up to ceiling_ms; the first change record or pending write snaps it
+        back to updateInterval (the floor). Background drivers keep ticking
+        at the floor and skip the ticks that are not due, so a write is
+        picked up within one floor interval whatever the current period.
+
+        Args:
+            enabled: True to adapt, False to scan every updateInterval again
+            ceiling_ms: Longest interval between idle scans (default: 1000)
+            backoff: Interval growth factor per idle cycle (default: 2)
+            hold_cycles: Idle cycles before backing off (default: 3)
+        """
+        self.scanCeiling = max(ceiling_ms, self.updateInterval) if enabled else None
+        self.scanBackoff = backoff
+        self.scanHold = hold_cycles
+        self.scanIdle = 0
+        self.scanPeriod = self.updateInterval
+
+    def getScanInterval(self):
+        """Milliseconds between scans right now (updateInterval unless adaptive scan backed off)."""
+        return self.scanPeriod
+
+    def scanDue(self, now, slack=0):
+        """
+        True if a scan is due at ticks_ms `now`: the current period has run
+        since the last one, or the floor has and there is activity to sync.
+        slack absorbs the jitter of drivers ticking at the floor.
+        """
+        elapsed = time.ticks_diff(now, self.lastUpdateTime) + slack
+        if elapsed >= self.scanPeriod:
+            return True
+        return elapsed >= self.updateInterval and (self.scanActivity or self.pendingWrites)
+
+    def adaptScan(self):
+        """Update the adaptive scan period at the end of a cycle."""
+        if self.scanActivity or self.pendingWrites:
+            self.scanActivity = False
+            self.scanIdle = 0
+            period = self.updateInterval
+        else:
+            self.scanIdle += 1
+            if self.scanIdle <= self.scanHold:
+                return
+            period = min(self.scanCeiling, max(self.updateInterval, int(self.scanPeriod * self.scanBackoff)))
+        if period != self.scanPeriod:
+            self.scanPeriod = period
+            if self.trace is not None:
+                self.trace('scanInterval', period)
     
+    def enableMetrics(self, enabled=True):
+        """
+        Start (or stop) collecting link metrics: frames and bytes per
+        command, reply RTT histogram, timeouts, caught exceptions,
+        (re)connects and update-cycle times (see hmi2metrics).
+        Returns the Hmi2Metrics object, or None when disabling.
+        """
+        if not enabled:
+            self.metrics = None
+        elif self.metrics is None:
+            from hmi2metrics import Hmi2Metrics
+            self.metrics = Hmi2Metrics()
+        return self.metrics
+
+    def getMetrics(self):
+        """Snapshot of the metrics as a dict (None unless enableMetrics() was called)."""
+        if self.metrics is None:
+            return None
+        snapshot = self.metrics.snapshot()
+        snapshot['state'] = self.getConnectionState()
+        snapshot['failovers'] = self.failovers
+        snapshot['failoverMs'] = self.failoverMs
+        return snapshot
+
+    def enableProfiler(self, enabled=True):
+        """
+        Start (or stop) profiling the update cycles: wall time per phase
+        (poll, drain, decode, override, flush), records decoded per type
+        and bytes moved per cycle (see hmi2profile).
+        Returns the Hmi2Profiler, or None when disabling.
+        """
+        if not enabled:
+            self.profiler = None
+        elif self.profiler is None:
+            from hmi2profile import Hmi2Profiler
+            self.profiler = Hmi2Profiler()
+        return self.profiler
+
+    def getProfile(self):
+        """Profiler summary as a dict (None unless enableProfiler() was called)."""
+        if self.profiler is None:
+            return None
+        return self.profiler.summary()
+
+    def startCapture(self, target):
+        """
+        Log every frame sent and received, with monotonic timestamps, to
+        `target` (a path or a binary stream) until stopCapture(). The log
+        plays back through hmi2capture.ReplayPort.
+        Returns the WireCapture.
+        """
+        self.stopCapture()
+        from hmi2capture import WireCapture
+        self.capture = WireCapture(target)
+        return self.capture
+
+    def stopCapture(self):
+        """Stop capturing and close the log. Returns the WireCapture, or None if not capturing."""
+        capture = self.capture
+        self.capture = None
+        if capture is not None:
+            capture.close()
+        return capture
+
+    def addTraceHook(self, hook):
+        """
+        Subscribe hook(event, *args) to the trace events (see hmi2trace):
+        e.g. a TraceRecorder kept for post-mortems, or printTrace.
+        Events are only built while at least one hook is attached.
+        Returns the hook.
+        """
+        if hook not in self.traceHooks:
+            self.traceHooks.append(hook)
+        self.bindTrace()
+        return hook
+
+    def removeTraceHook(self, hook):
+        """Unsubscribe a hook added with addTraceHook()."""
+        if hook in self.traceHooks:
+            self.traceHooks.remove(hook)
+        self.bindTrace()
+
+    def bindTrace(self):
+        """Point `trace` at the subscribers: None without any, so every trace point is one attribute check."""
+        if not self.traceHooks:
+            self.trace = None
+        elif len(self.traceHooks) == 1:
+            self.trace = self.traceHooks[0]
+        else:
+            from hmi2trace import TraceFanout
+            self.trace = TraceFanout(list(self.traceHooks))
+
+    def countError(self, where, ex):
+        """Count and trace an exception caught in `where` instead of raised."""
+        if self.metrics is not None:
+            self.metrics.error()
+        if self.trace is not None:
+            self.trace('error', where, ex)
+
     # Update and synchronization
     def update(self):
         """Update communication and synchronize data with HMI app."""
-        print("[HMI2 DEBUG] update() start syncro=%r" % self.syncro)
-        okData = False
-        update2Android = False
-        
-        if self.syncro:
-            okData = self.sendBasicCommand('a')
-            print("[HMI2 DEBUG] update: sendBasicCommand('a') -> okData=%r" % okData)
-        else:
-            okData = self.sendBasicCommand('e')
-            print("[HMI2 DEBUG] update: sendBasicCommand('e') -> okData=%r" % okData)
+        if self.trace is not None:
+            self.trace('update', self.syncro)
+        with self.scanLock:
+            okData = False
+            update2Android = False
+            if self.metrics is not None:
+                self.cycleStartUs = ticksUs()
 
-        if okData:
-            print("[HMI2 DEBUG] update: bufferSerial[0]=%r (ord 'c'=%r)" % (self.bufferSerial[0], ord('c')))
-            if self.bufferSerial[0] == ord('c'):
-                readingData = True
-                print("[HMI2 DEBUG] update: entering read loop (buffer='c')")
-
-                while readingData:
-                    okData = self.sendBasicCommand('c')
-                    
-                    if okData:
-                        cmd = self.bufferSerial[0]
-                        print("[HMI2 DEBUG] update: cmd=%r" % cmd)
-                        if cmd == 65:  # BINARY
-                            if self.bufferSerial[1] < self.bSize:
-                                if self.bufferSerial[3] == ord('1'):
-                                    self.setBitWord(self.bufferSerial[1], self.bufferSerial[2], True)
-                                else:
-                                    self.setBitWord(self.bufferSerial[1], self.bufferSerial[2], False)
-                        elif cmd == 75:  # INT
-                            if self.bufferSerial[1] < self.ndfSize:
-                                self.nFile[self.bufferSerial[1]] = self.joinInt16(
-                                    self.bufferSerial[2], self.bufferSerial[3], self.bufferSerial[4])
-                        elif cmd == 77:  # DINT
-                            if self.bufferSerial[1] < self.ndfSize:
-                                self.dFile[self.bufferSerial[1]] = self.joinInt32(
-                                    self.bufferSerial[2], self.bufferSerial[3], self.bufferSerial[4],
-                                    self.bufferSerial[5], self.bufferSerial[6], self.bufferSerial[7])
-                        elif cmd == 79:  # REAL
-                            if self.bufferSerial[1] < self.ndfSize:
-                                preFloat = self.joinInt32(
-                                    self.bufferSerial[2], self.bufferSerial[3], self.bufferSerial[4],
-                                    self.bufferSerial[5], self.bufferSerial[6], self.bufferSerial[7])
-                                self.fFile[self.bufferSerial[1]] = self.joinFloat(preFloat)
-                        elif cmd == 100:
-                            print("[HMI2 DEBUG] update: cmd=100, exit read loop, syncro=False")
-                            readingData = False
-                            self.syncro = False
-                        elif cmd == 102:
-                            print("[HMI2 DEBUG] update: cmd=102, overrideSend=True")
-                            self.overrideSend = True
-                        elif cmd == 103:
-                            print("[HMI2 DEBUG] update: cmd=103, exit read loop, update2Android=True")
-                            readingData = False
-                            self.syncro = False
-                            update2Android = True
+            if self.cycleState != CYCLE_IDLE:
+                # Finish the cycle poll() started instead of starting another
+                while self.cycleState != CYCLE_IDLE:
+                    self.poll(self.linkTimeout())
+                return
+
+            if self.standbyEngine is not None:
+                self.standbyStep()
+
+            prof = self.profiler
+            if prof is not None:
+                prof.start()
+
+            if self.pendingWrites:
+                # Write-behind frames, or writes queued while the link was down
+                self.flush()
+                if prof is not None:
+                    prof.mark(PHASE_FLUSH)
+
+            if self.syncro:
+                okData = self.sendBasicCommand('a')
+            else:
+                okData = self.sendBasicCommand('e')
+            if prof is not None:
+                if okData:
+                    prof.mark(PHASE_POLL)
+                else:
+                    prof.abort()  # no reply or no link: its times would skew the totals
+
+            if okData:
+                if self.bufferSerial[0] == ord('c'):
+                    self.scanActivity = True
+                    if self.drainWindow > 1:
+                        update2Android = self.drainPipelined()
                     else:
-                        print("[HMI2 DEBUG] update: !okData in loop, exit read loop")
-                        readingData = False
-            elif self.bufferSerial[0] == ord('d'):
-                print("[HMI2 DEBUG] update: buffer='d', syncro=False")
-                self.syncro = False
-        
+                        update2Android = self.drainSerial()
+                elif self.bufferSerial[0] == ord('d'):
+                    self.syncro = False
+            if prof is not None:
+                prof.mark(PHASE_DRAIN)
+
+            self.applyOverride()
+            if prof is not None:
+                prof.mark(PHASE_OVERRIDE)
+
+            if update2Android:
+                if self.writeBehind:
+                    self.markPending()
+                    self.flush()
+                else:
+                    # Walk the dirty indices only: cost follows the written tags
+                    for k in range(self.bUpdateCount):
+                        i = self.bUpdateWords[k]
+                        bits = self.bFileUpdate[i]
+                        while bits:
+                            low = bits & -bits
+                            bits ^= low
+                            j = BIT_INDEX[low]
+                            self.writeBFile2(i, j, self.getBitWord(i, j))
+
+                    for k in range(self.nUpdateCount):
+                        i = self.nUpdateList[k]
+                        self.writeNFile2(i, self.nFile[i])
+
+                    for k in range(self.dUpdateCount):
+                        i = self.dUpdateList[k]
+                        self.writeDFile2(i, self.dFile[i])
+
+                    for k in range(self.fUpdateCount):
+                        i = self.fUpdateList[k]
+                        self.writeFFile2(i, self.fFile[i])
+            if prof is not None:
+                prof.end(PHASE_FLUSH)
+            if self.metrics is not None:
+                self.metrics.cycle(ticksDiffUs(ticksUs(), self.cycleStartUs))
+            if self.scanCeiling is not None:
+                self.adaptScan()
+            if self.trace is not None:
+                self.trace('updateDone', update2Android)
+
+    def drainSerial(self):
+        """
+        Drain change records with one 'c' round trip at a time.
+        Returns True if the panel ended with 'g' (push local updates).
+        """
+        update2Android = False
+        readingData = True
+
+        while readingData:
+            okData = self.sendBasicCommand('c')
+
+            if okData:
+                cmd = self.decodeRecord()
+                if cmd == 100:
+                    readingData = False
+                elif cmd == 103:
+                    readingData = False
+                    update2Android = True
+            else:
+                readingData = False
+        if self.trace is not None:
+            self.trace('drainDone', update2Android)
+        return update2Android
+
+    def drainPipelined(self):
+        """
+        Drain change records keeping up to drainWindow 'c' requests in flight.
+        Replies are matched in order; once 'd' or 'g' ends the drain, the
+        replies still outstanding are collected and applied as well, so a
+        record the panel queued meanwhile is not lost.
+        Returns True if the panel asked for local updates ('g').
+        """
+        update2Android = False
+        readingData = True
+        outstanding = 0
+
+        while readingData or outstanding:
+            while readingData and outstanding < self.drainWindow:
+                if not self.postBasicCommand('c'):
+                    readingData = False
+                    break
+                outstanding += 1
+
+            if outstanding == 0:
+                break
+
+            if not self.checkResponse():
+                # Reply lost or link down: the rest of the window is abandoned
+                break
+            outstanding -= 1
+
+            cmd = self.decodeRecord()
+            if cmd == 100:
+                readingData = False
+            elif cmd == 103:
+                readingData = False
+                update2Android = True
+
+        if self.trace is not None:
+            self.trace('drainDone', update2Android)
+        return update2Android
+
+    def decodeRecord(self):
+        """Apply the panel record held in bufferSerial. Returns its code byte."""
+        cmd = self.bufferSerial[0]
+        if self.trace is not None:
+            self.trace('record', cmd)
+        if self.profiler is not None:
+            decodeStart = ticksUs()
+        if cmd == 65:  # BINARY
+            if self.bufferSerial[1] < self.bSize and self.bufferSerial[2] < 16:
+                if self.bufferSerial[3] == ord('1'):
+                    self.setBitWord(self.bufferSerial[1], self.bufferSerial[2], True)
+                else:
+                    self.setBitWord(self.bufferSerial[1], self.bufferSerial[2], False)
+        elif cmd == 75:  # INT
+            if self.bufferSerial[1] < self.ndfSize:
+                self.nFile[self.bufferSerial[1]] = decode16(self.bufferSerial, 2)
+        elif cmd == 77:  # DINT
+            if self.bufferSerial[1] < self.ndfSize:
+                self.dFile[self.bufferSerial[1]] = decode32(self.bufferSerial, 2)
+        elif cmd == 79:  # REAL
+            if self.bufferSerial[1] < self.ndfSize:
+                self.fFile[self.bufferSerial[1]] = decodeFloat(self.bufferSerial, 2)
+        elif cmd == 100:
+            self.syncro = False
+        elif cmd == 102:
+            self.overrideSend = True
+        elif cmd == 103:
+            self.syncro = False
+        if self.profiler is not None:
+            self.profiler.record(cmd, ticksDiffUs(ticksUs(), decodeStart))
+        return cmd
+
+    def applyOverride(self):
+        """End-of-cycle override handling: after 'f' every tag is resent on its next write."""
         if self.overDisplay:
-            print("[HMI2 DEBUG] update: clearing overDisplay")
             self.overDisplay = False
-        
+
         if self.overrideSend:
-            print("[HMI2 DEBUG] update: overrideSend, setting overDisplay and file overrides")
+            if self.trace is not None:
+                self.trace('override')
             self.overrideSend = False
             self.overDisplay = True
-            
-            for i in range(self.bSize):
-                self.bFileOver[i] = -1
-            
-            for i in range(self.ndfSize):
-                self.nFileOver[i] = True
-                self.dFileOver[i] = True
-                self.fFileOver[i] = True
-        
-        if update2Android:
-            print("[HMI2 DEBUG] update: update2Android, pushing B/N/D/F updates")
-            for i in range(self.bSize):
-                if self.bFileUpdate[i] != 0:
-                    for j in range(16):
-                        if self.getBitWordUpdate(i, j):
-                            self.writeBFile2(i, j, self.getBitWord(i, j))
-            
-            for i in range(self.ndfSize):
-                if self.nFileUpdate[i]:
-                    self.writeNFile2(i, self.nFile[i])
-                
-                if self.dFileUpdate[i]:
-                    self.writeDFile2(i, self.dFile[i])
-                
-                if self.fFileUpdate[i]:
-                    self.writeFFile2(i, self.fFile[i])
-        print("[HMI2 DEBUG] update() done")
+
+            # Bulk fill from preallocated templates instead of per-entry loops
+            self.bFileOver[:] = self.bOverAll
+            self.nFileOver[:] = self.ndfOverAll
+            self.dFileOver[:] = self.ndfOverAll
+            self.fFileOver[:] = self.ndfOverAll
+
+    # Non-blocking update cycle
+    def poll(self, timeout_ms=0):
+        """
+        Advance the update cycle without blocking longer than timeout_ms.
+        Starts a new cycle when idle, then handles every reply that has
+        arrived, sending the next requests as the state machine goes
+        (POLL: 'a'/'e' sent -> DRAIN: 'c' records -> FLUSH: pushed frames
+        acked -> IDLE). Call it from a main loop instead of update() to
+        interleave other work; set* calls made meanwhile are queued and
+        sent when the cycle ends.
+
+        Returns:
+            True if a cycle completed during this call.
+        """
+        with self.scanLock:
+            if self.cycleState == CYCLE_IDLE and not self.startCycle():
+                return False
+            start = time.ticks_ms()
+            timeout = self.linkTimeout()
+            waited = False
+            while True:
+                if self.replyFrame() >= 0:
+                    self.cycleTime = time.ticks_ms()
+                    if self.cycleStep():
+                        if self.profiler is not None:
+                            self.profiler.end(PHASE_FLUSH)
+                        if self.metrics is not None:
+                            self.metrics.cycle(ticksDiffUs(ticksUs(), self.cycleStartUs))
+                        if self.scanCeiling is not None:
+                            self.adaptScan()
+                        return True
+                    continue
+                now = time.ticks_ms()
+                idle = time.ticks_diff(now, self.cycleTime)
+                if idle > timeout:
+                    if self.trace is not None:
+                        self.trace('timeout', timeout)
+                    if self.metrics is not None:
+                        self.metrics.timeout()
+                    self.abortCycle()
+                    self.replyTimeout()
+                    return False
+                remaining = timeout_ms - time.ticks_diff(now, start)
+                if waited and remaining <= 0:
+                    return False
+                if not self.linkWait(max(0, min(remaining, timeout - idle))):
+                    if self.trace is not None:
+                        self.trace('linkLost', 'poll')
+                    self.abortCycle()
+                    return False
+                waited = True
+
+    def startCycle(self):
+        """Send pending writes and the 'a'/'e' poll of a new cycle. Returns True if started."""
+        if self.standbyEngine is not None:
+            self.standbyStep()
+        if not self.linkReady():
+            return False
+        self.cycleState = CYCLE_POLL
+        self.cycleAcks = 0
+        self.cycleOutstanding = 0
+        self.cyclePush = False
+        self.cycleTime = time.ticks_ms()
+        if self.metrics is not None:
+            self.cycleStartUs = ticksUs()
+        if self.profiler is not None:
+            self.profiler.start()
+        if self.pendingWrites:
+            self.packPending()
+            if self.profiler is not None:
+                self.profiler.mark(PHASE_FLUSH)
+        if not self.postBasicCommand('a' if self.syncro else 'e'):
+            self.abortCycle()
+            return False
+        return True
+
+    def cycleStep(self):
+        """Consume the reply frame in bufferSerial. Returns True when the cycle is done."""
+        if self.cycleAcks:
+            # Acks of the frames this cycle sent arrive first, in order
+            self.cycleAcks -= 1
+            self.flushAcked += 1
+            if self.cycleState == CYCLE_FLUSH and not self.cycleAcks:
+                self.cycleState = CYCLE_IDLE
+                return True
+            return False
+
+        if self.cycleState == CYCLE_POLL:
+            if self.profiler is not None:
+                self.profiler.mark(PHASE_POLL)
+            if self.bufferSerial[0] == 99:  # 'c'
+                self.scanActivity = True
+                self.cycleState = CYCLE_DRAIN
+                self.cycleReading = True
+                self.postDrain()
+                if self.cycleOutstanding:
+                    return False
+            elif self.bufferSerial[0] == 100:  # 'd'
+                self.syncro = False
+            return self.endCycle()
+
+        # CYCLE_DRAIN
+        self.cycleOutstanding -= 1
+        cmd = self.decodeRecord()
+        if cmd == 100:
+            self.cycleReading = False
+        elif cmd == 103:
+            self.cycleReading = False
+            self.cyclePush = True
+        self.postDrain()
+        if self.cycleOutstanding:
+            return False
+        if self.profiler is not None:
+            self.profiler.mark(PHASE_DRAIN)
+        return self.endCycle()
+
+    def postDrain(self):
+        """Keep up to drainWindow 'c' requests in flight while records keep coming."""
+        while self.cycleReading and self.cycleOutstanding < self.drainWindow:
+            if not self.postBasicCommand('c'):
+                self.cycleReading = False
+                break
+            self.cycleOutstanding += 1
+
+    def endCycle(self):
+        """Apply overrides and send what the cycle has to push. Returns True if idle again."""
+        self.applyOverride()
+        if self.profiler is not None:
+            self.profiler.mark(PHASE_OVERRIDE)
+        if self.cyclePush:
+            self.cyclePush = False
+            self.markPending()
+        if self.pendingWrites:
+            self.packPending()
+        if self.cycleAcks:
+            self.cycleState = CYCLE_FLUSH
+            return False
+        self.cycleState = CYCLE_IDLE
+        return True
+
+    def abortCycle(self):
+        """
+        Drop the running poll() cycle (reply timeout or lost link). Frames
+        the cycle sent whose acks are still owed may not have reached the
+        panel, so the written tags are queued again.
+        """
+        if self.profiler is not None:
+            self.profiler.abort()
+        if self.cycleAcks:
+            self.requeueWrites()
+        self.cycleState = CYCLE_IDLE
+        self.cycleAcks = 0
+        self.cycleOutstanding = 0
+        self.cycleReading = False
+        self.cyclePush = False
+
+    def replyFrame(self):
+        """Pop the next buffered reply frame into bufferSerial without waiting. Returns its length or -1."""
+        n = self.link.parser.nextFrame(self.bufferSerial)
+        if n >= 0:
+            self._onReceived(n)
+        return n
+
+    def _onSent(self, cmd, data, frames=1):
+        """
+        Report a buffer just written to the link to the enabled metrics,
+        profiler, capture and trace hooks. cmd is the command byte of a
+        single request, or None for `frames` frames packed by packFrame()
+        and packDisplay() (which counted their commands as they packed).
+        """
+        if self.metrics is not None and cmd is not None:
+            self.metrics.sent(cmd, len(data))
+        if self.profiler is not None:
+            self.profiler.sent(len(data))
+        if self.capture is not None:
+            self.capture.sent(data)
+        if self.trace is not None:
+            if cmd is None:
+                self.trace('sendFrames', frames, len(data))
+            else:
+                self.trace('send', cmd, len(data))
+
+    def _onReceived(self, n):
+        """Report the n-byte reply frame in bufferSerial to the enabled hooks."""
+        if self.metrics is not None:
+            self.metrics.received(self.bufferSerial[0], n)
+        if self.profiler is not None:
+            self.profiler.received(n)
+        if self.capture is not None:
+            self.capture.received(self.bufferSerial, n)
+        if self.trace is not None:
+            self.trace('reply', self.bufferSerial[0], n)
+
+    def linkWait(self, timeout_ms):
+        """Wait up to timeout_ms for link activity. Returns False if the link is lost."""
+        try:
+            if self.link.wait(timeout_ms) >= 0:
+                return True
+        except Exception as ex:
+            self.countError('linkWait', ex)
+            return True
+        self.linkLost()
+        return False
+
+    def linkTimeout(self):
+        """
+        Milliseconds to wait for one reply: responseTimeout when set,
+        otherwise the link's budget (RESPONSE_TIMEOUT on LAN, the wire time
+        at the line's baud rate plus the panel's latency on UART).
+        """
+        if self.responseTimeout is not None:
+            return self.responseTimeout
+        return self.linkBudget
 
     # Communication methods
     def sendBasicCommand(self, command):
-        """Send basic command to HMI."""
-        print("[HMI2 DEBUG] sendBasicCommand(command=%r)" % command)
+        """Send basic command to HMI and wait for its reply."""
         okData = False
 
-        if self.connectionType == HARD_SERIAL:
-            try:
-                self.myHard.write(bytearray([64, ord(command), 98]))  # '@', command, 'b'
-                okData = self.checkHardResponse()
-            except Exception as e:
-                print("[HMI2 DEBUG] sendBasicCommand: UART write exception %r" % e)
-        elif self.connectionType == LAN and self.connect2Server():
-            try:
-                self.myLAN.send(bytearray([self.myLanSlot, 64, ord(command), 98]))
-                okData = self.checkLANResponse()
-            except Exception as e:
-                print("[HMI2 DEBUG] sendBasicCommand: send exception %r" % e)
-                self.lanConnectionStatus = False
-                self.reconnectServer = True
-        print("[HMI2 DEBUG] sendBasicCommand -> okData=%r" % okData)
+        if self.postBasicCommand(command):
+            okData = self.checkResponse()
         return okData
+
+    def postBasicCommand(self, command):
+        """Send basic command to HMI without waiting. Returns True if sent."""
+        if not self.linkOpen():
+            return False
+        self.basicFrame[2] = ord(command)
+        if self.link.send(self.basicOut):
+            self._onSent(self.basicFrame[2], self.basicOut)
+            return True
+        if self.trace is not None:
+            self.trace('linkLost', 'send')
+        self.linkLost()
+        return False
+
+    def request(self, frame):
+        """Send one request frame and wait for its reply (checkResponse). Returns True if acknowledged."""
+        if self.link.send(frame):
+            self._onSent(frame[1 + self.slotBytes], frame)
+            return self.checkResponse()
+        if self.trace is not None:
+            self.trace('linkLost', 'send')
+        self.linkLost()
+        return False
     
     def writeBFile2(self, word, bit, value):
         """Write boolean to HMI via communication."""
-        print("[HMI2 DEBUG] writeBFile2(word=%r, bit=%r, value=%r)" % (word, bit, value))
-        if self.connectionType == HARD_SERIAL:
-            try:
-                data = bytearray([64, ord('C'), word, bit])
-                data.append(49 if value else 48)  # '1' or '0'
-                data.append(98)  # 'b'
-                self.myHard.write(data)
-                self.checkHardResponse()
-            except Exception as e:
-                print("[HMI2 DEBUG] writeBFile2: UART write exception %r" % e)
-        elif self.connectionType == LAN and self.connect2Server():
-            try:
-                data = bytearray([self.myLanSlot, 64, ord('C'), word, bit])
-                data.append(49 if value else 48)
-                data.append(98)
-                self.myLAN.send(data)
-                self.checkLANResponse()
-            except Exception as e:
-                print("[HMI2 DEBUG] writeBFile2: send exception %r" % e)
-                self.lanConnectionStatus = False
-                self.reconnectServer = True
+        if self.linkOpen():
+            frame = self.bFrame
+            frame[3] = word
+            frame[4] = bit
+            frame[5] = 49 if value else 48  # '1' or '0'
+            self.request(self.bOut)
 
     def writeNFile2(self, word, value):
         """Write integer to HMI via communication."""
-        print("[HMI2 DEBUG] writeNFile2(word=%r, value=%r)" % (word, value))
-        self.fragmentData16(value)
-
-        if self.connectionType == HARD_SERIAL:
-            try:
-                self.myHard.write(bytearray([64, ord('L'), word, self.hd, self.md, self.ld, 98]))
-                self.checkHardResponse()
-            except Exception as e:
-                print("[HMI2 DEBUG] writeNFile2: UART write exception %r" % e)
-        elif self.connectionType == LAN and self.connect2Server():
-            try:
-                self.myLAN.send(bytearray([self.myLanSlot, 64, ord('L'), word, self.hd, self.md, self.ld, 98]))
-                self.checkLANResponse()
-            except Exception as e:
-                print("[HMI2 DEBUG] writeNFile2: send exception %r" % e)
-                self.lanConnectionStatus = False
-                self.reconnectServer = True
+        if self.linkOpen():
+            self.nFrame[3] = word
+            encode16(self.nFrame, 4, value)
+            self.request(self.nOut)
 
     def writeDFile2(self, word, value):
         """Write double/32-bit integer to HMI via communication."""
-        print("[HMI2 DEBUG] writeDFile2(word=%r, value=%r)" % (word, value))
-        self.fragmentData32(value)
-
-        if self.connectionType == HARD_SERIAL:
-            try:
-                self.myHard.write(bytearray([
-                    64, ord('N'), word, self.hd32, self.md32, self.ld32, self.hd, self.md, self.ld, 98
-                ]))
-                self.checkHardResponse()
-            except Exception as e:
-                print("[HMI2 DEBUG] writeDFile2: UART write exception %r" % e)
-        elif self.connectionType == LAN and self.connect2Server():
-            try:
-                self.myLAN.send(bytearray([
-                    self.myLanSlot, 64, ord('N'), word, self.hd32, self.md32, self.ld32,
-                    self.hd, self.md, self.ld, 98
-                ]))
-                self.checkLANResponse()
-            except Exception as e:
-                print("[HMI2 DEBUG] writeDFile2: send exception %r" % e)
-                self.lanConnectionStatus = False
-                self.reconnectServer = True
+        if self.linkOpen():
+            self.dFrame[3] = word
+            encode32(self.dFrame, 4, value)
+            self.request(self.dOut)
 
     def writeFFile2(self, word, value):
         """Write float to HMI via communication."""
-        print("[HMI2 DEBUG] writeFFile2(word=%r, value=%r)" % (word, value))
-        self.fragmentDataFloat(value)
+        if self.linkOpen():
+            self.fFrame[3] = word
+            encodeFloat(self.fFrame, 4, value)
+            self.request(self.fOut)
 
-        if self.connectionType == HARD_SERIAL:
-            try:
-                self.myHard.write(bytearray([
-                    64, ord('P'), word, self.hd32, self.md32, self.ld32, self.hd, self.md, self.ld, 98
-                ]))
-                self.checkHardResponse()
-            except Exception as e:
-                print("[HMI2 DEBUG] writeFFile2: UART write exception %r" % e)
-        elif self.connectionType == LAN and self.connect2Server():
-            try:
-                self.myLAN.send(bytearray([
-                    self.myLanSlot, 64, ord('P'), word, self.hd32, self.md32, self.ld32,
-                    self.hd, self.md, self.ld, 98
-                ]))
-                self.checkLANResponse()
-            except Exception as e:
-                print("[HMI2 DEBUG] writeFFile2: send exception %r" % e)
-                self.lanConnectionStatus = False
-                self.reconnectServer = True
+    def flush(self):
+        """
+        Send every pending write-behind frame.
+        Frames are packed back to back into flushBuffer and written with a
+        single send per buffer-full; the acks are then consumed as a stream.
+        Returns the number of frames acknowledged by the panel.
+        """
+        with self.scanLock:
+            if not self.pendingWrites:
+                return 0
+            if self.cycleState != CYCLE_IDLE:
+                # The running poll() cycle sends them when it ends
+                return 0
+            if not self.linkReady():
+                return 0
+            self.flushAcked = 0
+            self.packPending()
+            if self.trace is not None:
+                self.trace('flush', self.flushAcked)
+            return self.flushAcked
 
-    def checkHardResponse(self):
-        """Check response from hardware serial."""
-        print("[HMI2 DEBUG] checkHardResponse() start")
-        okData = False
-        self.inCount = True
-        self.startTime = time.ticks_ms()
+    def packPending(self):
+        """Pack every pending frame (tags, then display lines) into flushBuffer and send it."""
+        self.pendingWrites = False
+        buf = self.flushBuffer
 
-        while self.inCount:
-            try:
-                if self.myHard.any():
-                    self.inCount = False
-                    data = self.myHard.read(128)
-                    if data:
-                        print("[HMI2 DEBUG] checkHardResponse: recv %r bytes" % len(data))
-                        idx = 0
-                        for byte in data:
-                            if idx < len(self.bufferSerial):
-                                self.bufferSerial[idx] = byte
-                                idx += 1
-                                if byte == 98:  # 'b'
-                                    break
-                        if idx > 0:
-                            okData = True
-            except Exception as ex:
-                print("[HMI2 DEBUG] checkHardResponse: read exception %r" % ex)
+        for k in range(self.bPendingCount):
+            i = self.bPendingWords[k]
+            bits = self.bFilePending[i]
+            self.bFilePending[i] = 0
+            while bits:
+                low = bits & -bits
+                bits ^= low
+                pos = self.packFrame(67, i, 3)  # 'C'
+                buf[pos] = BIT_INDEX[low]
+                buf[pos + 1] = 49 if self.bFile[i] & low else 48
+                buf[pos + 2] = 98
+        self.bPendingCount = 0
+
+        for k in range(self.nPendingCount):
+            i = self.nPendingList[k]
+            self.nFilePending[i >> 3] &= ~(1 << (i & 7))
+            pos = self.packFrame(76, i, 4)  # 'L'
+            encode16(buf, pos, self.nFile[i])
+            buf[pos + 3] = 98
+        self.nPendingCount = 0
+
+        for k in range(self.dPendingCount):
+            i = self.dPendingList[k]
+            self.dFilePending[i >> 3] &= ~(1 << (i & 7))
+            pos = self.packFrame(78, i, 7)  # 'N'
+            encode32(buf, pos, self.dFile[i])
+            buf[pos + 6] = 98
+        self.dPendingCount = 0
 
-            if (time.ticks_ms() - self.startTime) > 900:
-                print("[HMI2 DEBUG] checkHardResponse: timeout 900ms")
-                self.inCount = False
+        for k in range(self.fPendingCount):
+            i = self.fPendingList[k]
+            self.fFilePending[i >> 3] &= ~(1 << (i & 7))
+            pos = self.packFrame(80, i, 7)  # 'P'
+            encodeFloat(buf, pos, self.fFile[i])
+            buf[pos + 6] = 98
+        self.fPendingCount = 0
+
+        for line in range(2):
+            if self.displayPending & (1 << line):
+                self.packDisplay(line)
+        self.displayPending = 0
+
+        self.sendFrames()
+
+    def packFrame(self, command, word, payloadSize):
+        """
+        Reserve a frame in flushBuffer and write its header.
+        Sends the buffered frames first if the new one does not fit.
+        Returns the offset where the payload (terminator included) goes.
+        """
+        size = payloadSize + 3 + self.slotBytes
+        if self.flushPos + size > len(self.flushBuffer):
+            self.sendFrames()
+        buf = self.flushBuffer
+        pos = self.flushPos
+        if self.slotBytes:
+            buf[pos] = self.myLanSlot
+            pos += 1
+        buf[pos] = 64  # '@'
+        buf[pos + 1] = command
+        buf[pos + 2] = word
+        self.flushPos += size
+        self.flushFrames += 1
+        if self.metrics is not None:
+            self.metrics.sent(command, size)
+        return pos + 3
+
+    def packDisplay(self, line):
+        """Pack the 'k' frame of display line 0/1 into flushBuffer."""
+        size = 37 + self.slotBytes
+        if self.flushPos + size > len(self.flushBuffer):
+            self.sendFrames()
+        buf = self.flushBuffer
+        pos = self.flushPos
+        if self.slotBytes:
+            buf[pos] = self.myLanSlot
+            pos += 1
+        buf[pos] = 64  # '@'
+        buf[pos + 1] = 107  # 'k'
+        pos += 2
+        chars = self.lineA if line == 0 else self.lineB
+        for i in range(16):
+            pos = encode8(buf, pos, chars[i])
+        buf[pos] = self.displayID
+        buf[pos + 1] = 49 if line == 0 else 48
+        buf[pos + 2] = 98
+        self.flushPos += size
+        self.flushFrames += 1
+        if self.metrics is not None:
+            self.metrics.sent(107, size)
+
+    def sendFrames(self):
+        """Send the frames packed in flushBuffer and consume their acks."""
+        frames = self.flushFrames
+        length = self.flushPos
+        self.flushPos = 0
+        self.flushFrames = 0
+        if frames == 0:
+            return
+        if not self.sendRaw(self.flushView[:length], frames):
+            if self.trace is not None:
+                self.trace('linkLost', 'send')
+            self.linkLost()
+            return
+        self._onSent(None, self.flushView[:length], frames)
+        if self.cycleState != CYCLE_IDLE:
+            # poll() consumes the acks as they arrive
+            self.cycleAcks += frames
+            return
+        acked = 0
+        while acked < frames:
+            if not self.checkResponse():
+                if self.trace is not None:
+                    self.trace('unacked', frames - acked, frames)
+                # Which frames the panel applied is unknown: send them all again
+                self.requeueWrites()
+                break
+            acked += 1
+        self.flushAcked += acked
+
+    def markPending(self):
+        """Queue every locally written tag (the *Update flags) for the next flush."""
+        for k in range(self.bUpdateCount):
+            i = self.bUpdateWords[k]
+            self.setBitWordPending(i, self.bFileUpdate[i])
+        for k in range(self.nUpdateCount):
+            self.setNWordPending(self.nUpdateList[k])
+        for k in range(self.dUpdateCount):
+            self.setDWordPending(self.dUpdateList[k])
+        for k in range(self.fUpdateCount):
+            self.setFWordPending(self.fUpdateList[k])
+
+    def requeueWrites(self):
+        """Queue every written tag and both display lines for the next flush again."""
+        self.markPending()
+        self.displayPending = 3
+        self.pendingWrites = True
+
+    def reannounce(self):
+        """Resync with 'a' on the next cycle and queue the full local state (a new or reset link)."""
+        self.syncro = True
+        self.requeueWrites()
+
+    def linkReady(self):
+        """True if the active connection can take a frame now."""
+        return self.linkOpen()
+
+    def sendRaw(self, data, frames=1):
+        """Write a buffer packing `frames` frames to the active connection. Returns True if sent."""
+        return self.link.send(data, frames)
+
+    def checkHardResponse(self):
+        """
+        Wait for the next reply frame on the UART.
+        The engine sleeps between polls; the wait follows the baud rate (see linkTimeout).
+        """
+        okData = False
+        timeout = self.linkTimeout()
+        n = -1
+        try:
+            n = self.link.readFrame(self.bufferSerial, timeout)
+            okData = n >= 0
+        except Exception as ex:
+            self.countError('checkHardResponse', ex)
+        if okData:
+            self._onReceived(n)
+        else:
+            if self.trace is not None:
+                self.trace('timeout', timeout)
+            if self.metrics is not None:
+                self.metrics.timeout()
+            self.cleanHardSerial()
 
-        self.cleanHardSerial()
-        print("[HMI2 DEBUG] checkHardResponse -> okData=%r" % okData)
         return okData
 
     def checkLANResponse(self):
-        """Check response from LAN connection."""
-        print("[HMI2 DEBUG] checkLANResponse() start")
+        """
+        Wait for the next reply frame on the LAN connection.
+        Sleeps in the engine's readiness poll, at most linkTimeout().
+        """
         okData = False
-        self.inCount = True
-        self.startTime = time.ticks_ms()
-        
-        while self.inCount:
-            try:
-                if self.myLAN:
-                    self.myLAN.settimeout(0.1)
-                    data = self.myLAN.recv(128)
-                    if data:
-                        print("[HMI2 DEBUG] checkLANResponse: recv %r bytes" % len(data))
-                        self.inCount = False
-                        idx = 0
-                        for byte in data:
-                            if idx < len(self.bufferSerial):
-                                self.bufferSerial[idx] = byte
-                                idx += 1
-                                if byte == 98:  # 'b'
-                                    break
-                        if idx > 0:
-                            self.lanTimeCount = False
-                            okData = True
-            except Exception as ex:
-                print("[HMI2 DEBUG] checkLANResponse recv exception: %r" % ex)
-
-            if (time.ticks_ms() - self.startTime) > 900:
-                print("[HMI2 DEBUG] checkLANResponse: timeout 900ms")
-                self.inCount = False
-                if not self.lanTimeCount:
-                    self.lanTimeCount = True
-                    self.reconectTime = time.ticks_ms()
-        
-        self.cleanLan()
-        
-        if self.lanTimeCount:
-            if (time.ticks_ms() - self.reconectTime) > 3000:
-                print("[HMI2 DEBUG] checkLANResponse: closing socket, lanConnectionStatus=False")
-                try:
-                    if self.myLAN:
-                        self.myLAN.close()
-                except Exception as ex:
-                    print("[HMI2 DEBUG] checkLANResponse close exception: %r" % ex)
-                self.myLAN = None
-                self.lanConnectionStatus = False
-                self.lanTimeCount = False
-
-        print("[HMI2 DEBUG] checkLANResponse -> okData=%r" % okData)
+        timeout = self.linkTimeout()
+        n = self.link.readFrame(self.bufferSerial, timeout)
+        if n >= 0:
+            self.lanTimeCount = False
+            okData = True
+            self._onReceived(n)
+        elif not self.lanEngine.connected:
+            if self.trace is not None:
+                self.trace('linkLost', 'closed')
+            self.lanLost()
+        else:
+            if self.trace is not None:
+                self.trace('timeout', timeout)
+            if self.metrics is not None:
+                self.metrics.timeout()
+            self.lanReplyTimeout()
+
         return okData
 
+    def lanReplyTimeout(self):
+        """
+        No LAN reply in time: drop the partial frame; close the socket if
+        replies stay missing for 3 s, or fail over at once when a standby
+        endpoint is connected. On a SharedLan every bank's stream is reset.
+        """
+        if self.lanShared is not None:
+            if self.trace is not None:
+                self.trace('linkLost', 'sharedResync')
+            self.lanShared.resync()
+            return
+        self.cleanLan()
+        if self.standbyEngine is not None and self.standbyEngine.connected:
+            self.lanEngine.failed()
+            self.closeLan()
+            self.lanTimeCount = False
+            self.connect2Server()
+            return
+        if not self.lanTimeCount:
+            self.lanTimeCount = True
+            self.reconectTime = time.ticks_ms()
+        elif (time.ticks_ms() - self.reconectTime) > 3000:
+            if self.trace is not None:
+                self.trace('linkLost', 'replyTimeout')
+            self.lanEngine.failed()
+            self.lanLost()
+            self.lanTimeCount = False
+
     def cleanHardSerial(self):
-        """Clean hardware serial buffer."""
-        print("[HMI2 DEBUG] cleanHardSerial()")
+        """Discard buffered and pending serial bytes (partial frame left by a timeout)."""
+        if self.trace is not None:
+            self.trace('cleanLink')
         try:
-            if self.myHard.any():
-                self.myHard.read(self.myHard.any())
+            self.hardEngine.discard()
         except Exception as ex:
-            print("[HMI2 DEBUG] cleanHardSerial exception: %r" % ex)
+            self.countError('cleanHardSerial', ex)
 
     def cleanLan(self):
-        """Clean LAN buffer."""
-        print("[HMI2 DEBUG] cleanLan()")
-        try:
-            if self.myLAN:
-                self.myLAN.settimeout(0.01)
-                try:
-                    self.myLAN.recv(128)
-                except Exception:
-                    pass
-        except Exception as ex:
-            print("[HMI2 DEBUG] cleanLan exception: %r" % ex)
+        """Discard buffered LAN bytes (partial frame left by a timeout)."""
+        if self.trace is not None:
+            self.trace('cleanLink')
+        self.lanParser.reset()
+
+    def lanLost(self):
+        """The LAN link broke: close it and queue the writes it may have swallowed again."""
+        self.closeLan()
+        self.requeueWrites()
+
+    def closeLan(self):
+        """Close the LAN socket and mark the connection as lost."""
+        if self.trace is not None:
+            self.trace('closeLan')
+        if self.lanConnectionStatus and self.metrics is not None:
+            self.metrics.disconnected()
+        self.lanEngine.close()
+        self.myLAN = None
+        self.lanConnectionStatus = False
+        self.lanParser.reset()
     
     # Bit manipulation methods
     def setBitWord(self, wordPos, bitPos, value):
         """Set bit in word."""
-        print("[HMI2 DEBUG] setBitWord(wordPos=%r, bitPos=%r, value=%r)" % (wordPos, bitPos, value))
         temp = self.bFile[wordPos]
         
         if value:
@@ -958,6 +1995,9 @@ class Hmi2:
     def setBitWordUpdate(self, wordPos, bitPos):
         """Set update flag for bit."""
         temp = self.bFileUpdate[wordPos]
+        if temp == 0:
+            self.bUpdateWords[self.bUpdateCount] = wordPos
+            self.bUpdateCount += 1
         temp |= self.setBitToInt(bitPos)
         temp &= gmask16
         self.bFileUpdate[wordPos] = temp
@@ -968,6 +2008,65 @@ class Hmi2:
         tempInt >>= bitPos
         tempInt &= 1
         return tempInt == 1
+
+    def setNWordUpdate(self, wordPos):
+        """Set update flag for N word."""
+        mask = 1 << (wordPos & 7)
+        if not self.nFileUpdate[wordPos >> 3] & mask:
+            self.nFileUpdate[wordPos >> 3] |= mask
+            self.nUpdateList[self.nUpdateCount] = wordPos
+            self.nUpdateCount += 1
+
+    def setDWordUpdate(self, wordPos):
+        """Set update flag for D word."""
+        mask = 1 << (wordPos & 7)
+        if not self.dFileUpdate[wordPos >> 3] & mask:
+            self.dFileUpdate[wordPos >> 3] |= mask
+            self.dUpdateList[self.dUpdateCount] = wordPos
+            self.dUpdateCount += 1
+
+    def setFWordUpdate(self, wordPos):
+        """Set update flag for F word."""
+        mask = 1 << (wordPos & 7)
+        if not self.fFileUpdate[wordPos >> 3] & mask:
+            self.fFileUpdate[wordPos >> 3] |= mask
+            self.fUpdateList[self.fUpdateCount] = wordPos
+            self.fUpdateCount += 1
+
+    def setBitWordPending(self, wordPos, mask):
+        """Queue the bits in mask of a B word for the next flush."""
+        if self.bFilePending[wordPos] == 0:
+            self.bPendingWords[self.bPendingCount] = wordPos
+            self.bPendingCount += 1
+        self.bFilePending[wordPos] |= mask
+        self.pendingWrites = True
+
+    def setNWordPending(self, wordPos):
+        """Queue an N word for the next flush."""
+        mask = 1 << (wordPos & 7)
+        if not self.nFilePending[wordPos >> 3] & mask:
+            self.nFilePending[wordPos >> 3] |= mask
+            self.nPendingList[self.nPendingCount] = wordPos
+            self.nPendingCount += 1
+        self.pendingWrites = True
+
+    def setDWordPending(self, wordPos):
+        """Queue a D word for the next flush."""
+        mask = 1 << (wordPos & 7)
+        if not self.dFilePending[wordPos >> 3] & mask:
+            self.dFilePending[wordPos >> 3] |= mask
+            self.dPendingList[self.dPendingCount] = wordPos
+            self.dPendingCount += 1
+        self.pendingWrites = True
+
+    def setFWordPending(self, wordPos):
+        """Queue an F word for the next flush."""
+        mask = 1 << (wordPos & 7)
+        if not self.fFilePending[wordPos >> 3] & mask:
+            self.fFilePending[wordPos >> 3] |= mask
+            self.fPendingList[self.fPendingCount] = wordPos
+            self.fPendingCount += 1
+        self.pendingWrites = True
     
     def resetBitWordOver(self, wordPos, bitPos):
         """Reset override flag for bit."""
@@ -989,115 +2088,86 @@ class Hmi2:
         return False
     
     def getNWordOver(self, wordPos):
-        """Get override flag for N word."""
-        temp = self.nFileOver[wordPos]
-        if temp:
-            self.nFileOver[wordPos] = False
-        return temp
+        """Get (and consume) override flag for N word."""
+        mask = 1 << (wordPos & 7)
+        if self.nFileOver[wordPos >> 3] & mask:
+            self.nFileOver[wordPos >> 3] &= ~mask
+            return True
+        return False
     
     def getDWordOver(self, wordPos):
-        """Get override flag for D word."""
-        temp = self.dFileOver[wordPos]
-        if temp:
-            self.dFileOver[wordPos] = False
-        return temp
+        """Get (and consume) override flag for D word."""
+        mask = 1 << (wordPos & 7)
+        if self.dFileOver[wordPos >> 3] & mask:
+            self.dFileOver[wordPos >> 3] &= ~mask
+            return True
+        return False
     
     def getFWordOver(self, wordPos):
-        """Get override flag for F word."""
-        temp = self.fFileOver[wordPos]
-        if temp:
-            self.fFileOver[wordPos] = False
-        return temp
+        """Get (and consume) override flag for F word."""
+        mask = 1 << (wordPos & 7)
+        if self.fFileOver[wordPos >> 3] & mask:
+            self.fFileOver[wordPos >> 3] &= ~mask
+            return True
+        return False
     
     def setBitToInt(self, bitPos):
         """Convert bit position to integer mask."""
-        temp = 1
-        if bitPos > 0:
-            temp <<= bitPos
-        return temp
+        return SET_MASK[bitPos]
     
     def clearBitToInt(self, bitPos):
         """Create mask to clear bit."""
-        temp = 0xFFFE
-        if bitPos > 0:
-            for i in range(bitPos):
-                temp <<= 1
-                temp += 1
-        return temp
-    
-    # Data fragmentation and joining methods
+        return CLEAR_MASK[bitPos]
+
+    # Deprecated digit helpers: thin wrappers over hmi2codec for old callers.
+    # The fragmentData* methods leave their digits in the hd/md/ld and
+    # hd32/md32/ld32 attributes, which no other method reads or writes.
     def fragmentData32(self, tempInt32):
-        """Fragment 32-bit integer into 6-bit parts."""
-        print("[HMI2 DEBUG] fragmentData32(tempInt32=%r)" % tempInt32)
-        self.ld = tempInt32 & BYTE6MASK0
-        
-        self.tempValue32 = tempInt32 & BYTE6MASK1
-        self.md = self.tempValue32 >> 6
-        
-        self.tempValue32 = tempInt32 & BYTE6MASK2
-        self.hd = self.tempValue32 >> 12
-        
-        self.tempValue32 = tempInt32 & BYTE6MASK3
-        self.ld32 = self.tempValue32 >> 18
-        
-        self.tempValue32 = tempInt32 & BYTE6MASK4
-        self.md32 = self.tempValue32 >> 24
-        
-        self.tempValue32 = tempInt32 & BYTE6MASK5
-        self.hd32 = self.tempValue32 >> 30
-    
+        """Deprecated: use hmi2codec.encode32. Split a 32-bit value into hd32/md32/ld32/hd/md/ld."""
+        deprecated('fragmentData32', 'encode32')
+        digits = bytearray(6)
+        encode32(digits, 0, tempInt32)
+        self.hd32, self.md32, self.ld32, self.hd, self.md, self.ld = digits
+
     def fragmentData16(self, tempInt16):
-        """Fragment 16-bit integer into 6-bit parts."""
-        print("[HMI2 DEBUG] fragmentData16(tempInt16=%r)" % tempInt16)
-        self.ld = tempInt16 & LDMASK
-        
-        self.tempValue = tempInt16 & MDMASK
-        self.md = self.tempValue >> 6
-        
-        self.tempValue = tempInt16 & HDMASK
-        self.hd = self.tempValue >> 12
-    
+        """Deprecated: use hmi2codec.encode16. Split a 16-bit value into hd/md/ld."""
+        deprecated('fragmentData16', 'encode16')
+        digits = bytearray(3)
+        encode16(digits, 0, tempInt16)
+        self.hd, self.md, self.ld = digits
+
     def fragmentData8(self, tempInt16):
-        """Fragment 8-bit value into 6-bit parts."""
-        print("[HMI2 DEBUG] fragmentData8(tempInt16=%r)" % tempInt16)
-        self.ld = tempInt16 & LDMASK
-        
-        self.tempValue = tempInt16 & MDMASK
-        self.md = self.tempValue >> 6
-    
+        """Deprecated: use hmi2codec.encode8. Split an 8-bit value into md/ld."""
+        deprecated('fragmentData8', 'encode8')
+        digits = bytearray(2)
+        encode8(digits, 0, tempInt16)
+        self.md, self.ld = digits
+
     def fragmentDataFloat(self, preFloat):
-        """Fragment float into 32-bit integer parts."""
-        print("[HMI2 DEBUG] fragmentDataFloat(preFloat=%r)" % preFloat)
-        # Convert float to bytes
-        float_bytes = struct.pack('>f', preFloat)
-        tempUint32 = struct.unpack('>I', float_bytes)[0]
-        
-        self.fragmentData32(tempUint32)
-    
+        """Deprecated: use hmi2codec.encodeFloat. Split a float's single precision bits like fragmentData32."""
+        deprecated('fragmentDataFloat', 'encodeFloat')
+        digits = bytearray(6)
+        encodeFloat(digits, 0, preFloat)
+        self.hd32, self.md32, self.ld32, self.hd, self.md, self.ld = digits
+
     def joinInt8(self, tempMd, tempLd):
-        """Join two 6-bit parts into 8-bit integer."""
-        tempLd1 = tempLd
-        tempMd1 = tempMd << 6
-        temp = tempLd1 | tempMd1
-        temp &= gmask8
-        return temp
-    
+        """Deprecated: use hmi2codec.decode8. Join two 6-bit digits into an 8-bit value."""
+        deprecated('joinInt8', 'decode8')
+        return decode8((tempMd, tempLd), 0)
+
     def joinInt16(self, tempHd, tempMd, tempLd):
-        """Join three 6-bit parts into 16-bit integer."""
-        tempLd1 = tempLd
-        tempMd1 = tempMd << 6
-        tempHd1 = tempHd << 12
-        temp = tempLd1 | tempMd1 | tempHd1
-        temp &= gmask16
-        return temp
-    
+        """Deprecated: use hmi2codec.decode16. Join three 6-bit digits into a 16-bit value."""
+        deprecated('joinInt16', 'decode16')
+        return decode16((tempHd, tempMd, tempLd), 0)
+
     def joinInt32(self, temp6, temp5, temp4, temp3, temp2, temp1):
-        """Join six 6-bit parts into 32-bit integer."""
-        tempB = (temp6 << 30) | (temp5 << 24) | (temp4 << 18) | (temp3 << 12) | (temp2 << 6) | temp1
-        return tempB
-    
+        """Deprecated: use hmi2codec.decode32. Join six 6-bit digits into a 32-bit value."""
+        deprecated('joinInt32', 'decode32')
+        return decode32((temp6, temp5, temp4, temp3, temp2, temp1), 0)
+
     def joinFloat(self, tempInt32):
-        """Join 32-bit integer into float."""
-        float_bytes = struct.pack('>I', tempInt32)
-        temp = struct.unpack('>f', float_bytes)[0]
-        return temp
+        """Deprecated: use hmi2codec.decodeFloat. The float whose single precision bits are tempInt32."""
+        deprecated('joinFloat', 'decodeFloat')
+        digits = bytearray(6)
+        encode32(digits, 0, tempInt32)
+        return decodeFloat(digits, 0)
@@ -0,0 +1,267 @@
+"""
+HMI2 Async Library
+asyncio (CPython) / uasyncio (MicroPython) driver for the HMI2 control panel.
+AsyncHmi2 keeps the tag tables, codecs and update-cycle state machine of
+Hmi2 but talks to the panel over asyncio streams, so a slow panel suspends
+only the scan task instead of every getBoolean/setInt caller. LAN only.
+
+Usage:
+    hmi = AsyncHmi2()
+    hmi.init("192.168.1.10", 1, scan_interval_ms=50)
+    await hmi.connect()
+    hmi.start()           # background scan task
+    hmi.setInt(0, 1234)   # queued, sent by the next scan
+"""
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+import time
+
+from hmi2 import Hmi2, LAN, CYCLE_IDLE, CYCLE_FLUSH, LINK_DOWN, LINK_UP, PHASE_FLUSH
+from hmi2transport import ticksUs, ticksDiffUs
+
+
+class AsyncHmi2(Hmi2):
+    """
+    Hmi2 over asyncio streams.
+    get*/set*/print only touch the local tables: writes are always
+    write-behind and go out with the next update() or flush(). Scans run
+    in a background task (start()) or on demand with await update().
+    """
+
+    def __init__(self, profile=None, b_size=None, ndf_size=None):
+        Hmi2.__init__(self, profile, b_size, ndf_size)
+        self.reader = None
+        self.writer = None
+        self.lock = asyncio.Lock()
+        self.scanTask = None
+        self.scanInterval = 50  # milliseconds between background scans
+        self.reconnectDelay = 3000  # milliseconds between connect attempts
+        self.autoUpdateEnabled = False
+        self.writeBehind = True
+
+    def init(self, ip_address, lan_memory_bank=None, scan_interval_ms=50, connect_timeout=5.0, drain_window=4, port=1030):
+        """
+        Configure the LAN connection without opening it (see connect()).
+
+        Args:
+            ip_address: IP address as string (e.g. "192.168.1.10") or tuple (192, 168, 1, 10)
+            lan_memory_bank: Memory bank number (1-6), default 1
+            scan_interval_ms: Pause between background scans in milliseconds (default: 50)
+            connect_timeout: Connect timeout in seconds (default: 5.0)
+            drain_window: 'c' requests kept in flight while draining panel changes (default: 4)
+            port: Panel app TCP port (default: 1030)
+        """
+        if isinstance(ip_address, str):
+            self.myServer_ip = tuple(int(x) for x in ip_address.split('.'))
+        elif isinstance(ip_address, (tuple, list)):
+            self.myServer_ip = tuple(ip_address)
+        else:
+            raise ValueError("Invalid IP address format. Use string or tuple.")
+        self.myPort = port
+        if lan_memory_bank is None:
+            self.myLanSlot = 1
+        else:
+            self.myLanSlot = min(6, max(1, lan_memory_bank))
+
+        self.initLCD()
+        self.connectionType = LAN
+        self.connect_timeout = connect_timeout
+        self.drainWindow = max(1, drain_window)
+        self.scanInterval = scan_interval_ms
+        self.updateInterval = scan_interval_ms  # floor of the adaptive scan
+        self.scanPeriod = scan_interval_ms
+        self.syncro = True
+        self.overrideSend = False
+        self.overDisplay = False
+
+    async def connect(self):
+        """Open the connection to the panel app. Raises OSError (or TimeoutError) on failure."""
+        self.closeLan()
+        host = '.'.join(map(str, self.myServer_ip))
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(host, self.myPort), self.connect_timeout)
+        try:
+            import socket
+            sock = self.writer.get_extra_info('socket')
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except Exception:
+            pass  # uasyncio streams expose no socket options
+        self.lanParser.reset()
+        self.lanTimeCount = False
+        self.lanConnectionStatus = True
+        self.syncro = True
+        if self.metrics is not None:
+            self.metrics.connected()
+        if self.trace is not None:
+            self.trace('connect', (host, self.myPort))
+        return True
+
+    async def update(self):
+        """
+        Run one update cycle: pending writes, 'a'/'e' poll, record drain
+        and the push the panel asked for.
+        Returns True if the cycle completed.
+        """
+        async with self.lock:
+            if self.cycleState == CYCLE_IDLE and not self.startCycle():
+                return False
+            done = await self.runCycle()
+            if done and self.profiler is not None:
+                self.profiler.end(PHASE_FLUSH)
+            if done and self.metrics is not None:
+                self.metrics.cycle(ticksDiffUs(ticksUs(), self.cycleStartUs))
+            if done and self.scanCeiling is not None:
+                self.adaptScan()
+            return done
+
+    async def flush(self):
+        """
+        Send every pending write now. Returns the number of frames acknowledged.
+        If the acks stop coming (timeout or lost link), the writes stay
+        queued for the next flush or scan.
+        """
+        async with self.lock:
+            if not self.pendingWrites or not self.linkReady():
+                return 0
+            self.cycleState = CYCLE_FLUSH
+            self.cycleAcks = 0
+            self.flushAcked = 0
+            self.packPending()
+            if not self.cycleAcks:
+                self.cycleState = CYCLE_IDLE
+                return 0
+            # cycleStep() counts the acks into flushAcked; an aborted cycle requeues the rest
+            await self.runCycle()
+            return self.flushAcked
+
+    async def runCycle(self):
+        """Feed replies to the cycle state machine until it is idle again."""
+        timeout = self.linkTimeout()
+        while True:
+            done = False
+            while self.replyFrame() >= 0:
+                if self.cycleStep():
+                    done = True
+                    break
+            try:
+                # Also the last push of a finished cycle: a reset here is a lost link, not a crash
+                await self.writer.drain()
+                if done:
+                    return True
+                data = await asyncio.wait_for(self.reader.read(self.lanParser.space() or 64), timeout / 1000)
+            except asyncio.TimeoutError:
+                if self.metrics is not None:
+                    self.metrics.timeout()
+                if self.trace is not None:
+                    self.trace('timeout', timeout)
+                self.abortCycle()
+                self.replyTimeout()
+                return False
+            except OSError:
+                data = b''
+            if not data:
+                # Connection closed by the panel app
+                if self.trace is not None:
+                    self.trace('linkLost', 'closed')
+                self.abortCycle()
+                self.closeLan()
+                return False
+            self.lanParser.feed(data)
+            self.lanTimeCount = False
+
+    def start(self):
+        """Start the background scan task (idempotent). Returns the task."""
+        if self.scanTask is None:
+            self.scanTask = asyncio.create_task(self.scan())
+        return self.scanTask
+
+    async def stop(self):
+        """Cancel the background scan task."""
+        task = self.scanTask
+        self.scanTask = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def close(self):
+        """Stop scanning and close the connection."""
+        await self.stop()
+        self.closeLan()
+
+    async def scan(self):
+        """
+        Background loop: update() every scanInterval, reconnecting when the
+        link drops. With enableAdaptiveScan() the loop still wakes every
+        scanInterval but only scans when scanDue() says so.
+        """
+        while True:
+            if self.writer is None:
+                try:
+                    await self.connect()
+                except (OSError, asyncio.TimeoutError):
+                    await asyncio.sleep(self.reconnectDelay / 1000)
+                    continue
+            try:
+                if self.scanCeiling is None:
+                    await self.update()
+                else:
+                    now = time.ticks_ms()
+                    if self.scanDue(now, self.scanInterval // 2):
+                        self.lastUpdateTime = now
+                        await self.update()
+            except OSError as ex:
+                # The scan task outlives any link failure: drop the link and reconnect
+                self.countError('scan', ex)
+                self.abortCycle()
+                self.closeLan()
+            await asyncio.sleep(self.scanInterval / 1000)
+
+    # Link primitives used by the shared cycle state machine
+    def linkReady(self):
+        return self.writer is not None
+
+    def linkUp(self):
+        return self.writer is not None
+
+    def getConnectionState(self):
+        return LINK_UP if self.writer is not None else LINK_DOWN
+
+    def postBasicCommand(self, command):
+        if self.writer is None:
+            return False
+        frame = bytes((self.myLanSlot, 64, ord(command), 98))
+        self.writer.write(frame)
+        self._onSent(frame[2], frame)
+        return True
+
+    def sendRaw(self, data, frames=1):
+        if self.writer is None:
+            return False
+        self.writer.write(bytes(data))
+        return True
+
+    def closeLan(self):
+        writer = self.writer
+        if writer is not None and self.metrics is not None:
+            self.metrics.disconnected()
+        if self.trace is not None:
+            self.trace('closeLan')
+        self.reader = None
+        self.writer = None
+        self.lanConnectionStatus = False
+        self.lanParser.reset()
+        if writer is not None:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    def _autoUpdate(self):
+        # Scans run in the background task, never inline in get*/set*
+        pass
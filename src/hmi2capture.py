@@ -0,0 +1,300 @@
+"""
+HMI2 Wire Capture
+Records every frame an Hmi2 sends and receives into a compact binary log,
+and plays such a log back as a UART-like port, so a production scan can be
+reproduced and benchmarked on a workstation without a panel attached.
+
+Log format: the 8-byte MAGIC, then one record per frame:
+    kind     1 byte, KIND_OUT (request) or KIND_IN (reply frame)
+    delta    4 bytes little-endian, microseconds since the previous record
+    length   2 bytes little-endian
+    data     `length` bytes, exactly as on the wire
+Outbound records are what one send carried (a single request, or a packed
+write-behind buffer); inbound records are one reply frame each, terminator
+included. Timestamps come from the monotonic ticks_us counter.
+Works on MicroPython and CPython.
+
+Usage:
+    hmi.startCapture('scan.cap')
+    ...
+    hmi.stopCapture()
+
+    port = ReplayPort('scan.cap', speed=0)
+    hmi = Hmi2()
+    hmi.init(port, auto_update=False)
+    while not port.finished():
+        hmi.update()
+"""
+
+import struct
+
+from hmi2transport import ticksAdd, ticksUs, ticksDiffUs
+
+MAGIC = b'HMI2CAP1'
+KIND_OUT = 0
+KIND_IN = 1
+RECORD_HEADER = '<BIH'
+HEADER_SIZE = 7
+
+FRAME_START = 64  # '@'
+FRAME_END = 98  # 'b'
+
+# Requests every scan makes: the 'a'/'e' poll and the 'c' drain
+SCAN_REQUESTS = (b'@ab', b'@eb', b'@cb')
+
+REPLAY_BAUDRATE = 1000000  # what ReplayPort reports: UART reply timeouts stay short
+
+
+class WireCapture:
+    """
+    Writer of a capture log. `target` is a path or a binary stream with
+    write(); a path is opened here and closed by close(). The record
+    header is packed into one preallocated buffer.
+    """
+
+    def __init__(self, target):
+        if isinstance(target, str):
+            self.stream = open(target, 'wb')
+            self.owned = True
+        else:
+            self.stream = target
+            self.owned = False
+        self.header = bytearray(HEADER_SIZE)
+        self.last = ticksUs()
+        self.framesOut = 0
+        self.framesIn = 0
+        self.bytes = len(MAGIC)
+        self.stream.write(MAGIC)
+
+    def record(self, kind, data, n=None):
+        """Append data[:n] (all of it by default) as one record."""
+        if n is None:
+            n = len(data)
+        elif n > len(data):
+            n = len(data)  # reply frame truncated by the receive buffer
+        now = ticksUs()
+        struct.pack_into(RECORD_HEADER, self.header, 0, kind, ticksDiffUs(now, self.last) & 0xFFFFFFFF, n)
+        self.last = now
+        self.stream.write(self.header)
+        self.stream.write(memoryview(data)[:n])
+        self.bytes += HEADER_SIZE + n
+
+    def sent(self, data):
+        """Record an outbound send."""
+        self.framesOut += 1
+        self.record(KIND_OUT, data)
+
+    def received(self, data, n):
+        """Record one reply frame held in data[:n]."""
+        self.framesIn += 1
+        self.record(KIND_IN, data, n)
+
+    def flush(self):
+        if hasattr(self.stream, 'flush'):
+            self.stream.flush()
+
+    def close(self):
+        """Flush the log, and close it if it was opened from a path."""
+        self.flush()
+        if self.owned:
+            self.stream.close()
+
+
+def readCapture(source):
+    """
+    Read a capture log (path, bytes, or binary stream).
+
+    Returns:
+        A list of (us, kind, data) records, us counted from the first one.
+
+    Raises:
+        ValueError: If source is not a capture log or ends mid-record.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            raw = f.read()
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        raw = bytes(source)
+    else:
+        raw = source.read()
+    if raw[:len(MAGIC)] != MAGIC:
+        raise ValueError("not an HMI2 capture log")
+    records = []
+    pos = len(MAGIC)
+    us = 0
+    first = True
+    while pos < len(raw):
+        if pos + HEADER_SIZE > len(raw):
+            raise ValueError("capture log truncated at byte %d" % pos)
+        kind, delta, n = struct.unpack_from(RECORD_HEADER, raw, pos)
+        pos += HEADER_SIZE
+        if pos + n > len(raw):
+            raise ValueError("capture log truncated at byte %d" % pos)
+        if not first:
+            us += delta
+        first = False
+        records.append((us, kind, raw[pos:pos + n]))
+        pos += n
+    return records
+
+
+def stripSlots(data):
+    """
+    Request bytes without the LAN slot byte in front of each frame, so UART
+    and LAN captures compare equal. Frame bytes are 6-bit digits, words and
+    ASCII flags, so 'b' only ever appears as a terminator.
+    """
+    data = bytes(data)
+    out = bytearray()
+    start = 0
+    n = len(data)
+    while start < n:
+        end = data.find(b'b', start)
+        if end < 0:
+            end = n - 1
+        if data[start] != FRAME_START and end > start:
+            start += 1
+        out += data[start:end + 1]
+        start = end + 1
+    return bytes(out)
+
+
+class ReplayPort:
+    """
+    UART-like port (write/readinto/any/baudrate) playing a capture back, so
+    Hmi2.init() drives it through the serial path whatever link recorded
+    it. Each write is matched with the next recorded request that carries
+    the same frames (slot bytes ignored; recorded requests the library
+    does not make this time, such as application writes, are skipped), and
+    the replies recorded after that request are released with their
+    original delays divided by `speed`: 1.0 is real time, 0 as fast as
+    possible. A write that matches nothing counts as a mismatch and gets
+    no reply, like a lost frame. replyLatency reports the slowest recorded
+    reply at that speed, so reply timeouts cover it.
+    Replay the session with the drain_window it was recorded with, so the
+    'c' requests pipeline the same way.
+    """
+
+    def __init__(self, source, speed=1.0, baudrate=REPLAY_BAUDRATE):
+        self.records = readCapture(source)
+        # Request bytes -> indices of the records carrying them, ascending
+        self.index = {}
+        # Past the last scan request only application writes are left,
+        # which a replay does not make again
+        self.lastScan = -1
+        sentUs = 0
+        slowestUs = 0
+        for i in range(len(self.records)):
+            us, kind, data = self.records[i]
+            if kind == KIND_IN:
+                slowestUs = max(slowestUs, us - sentUs)
+            else:
+                sentUs = us
+                key = stripSlots(data)
+                if key in self.index:
+                    self.index[key].append(i)
+                else:
+                    self.index[key] = [i]
+                if key in SCAN_REQUESTS:
+                    self.lastScan = i
+        self.speed = speed
+        self.baudrate = baudrate
+        # Longest request->reply delay of the playback, in ms: UartEngine
+        # waits at least this long for a reply on top of the wire time
+        self.replyLatency = int(slowestUs / speed) // 1000 + 1 if speed else 0
+        self.rewind()
+
+    def rewind(self):
+        """Start the playback over."""
+        self.cursor = 0  # first record not matched or skipped yet
+        self.queue = []  # released replies: [dueUs, data, offset]
+        self.writes = 0
+        self.matched = 0
+        self.skipped = 0
+        self.mismatches = 0
+
+    def finished(self):
+        """
+        True once the last recorded scan request has been matched or passed
+        over and every released reply read. Recorded requests after it
+        (trailing application writes) are not waited for.
+        """
+        return self.cursor > self.lastScan and not self.queue
+
+    def write(self, data):
+        self.writes += 1
+        now = ticksUs()
+        records = self.records
+        i = self.nextRecord(stripSlots(data))
+        if i < 0:
+            self.mismatches += 1
+            return len(data)
+        # Requests (and their replies) passed over were not made this time
+        for k in range(self.cursor, i):
+            if records[k][1] == KIND_OUT:
+                self.skipped += 1
+        self.matched += 1
+        sentUs = records[i][0]
+        i += 1
+        while i < len(records) and records[i][1] == KIND_IN:
+            us, kind, reply = records[i]
+            delay = int((us - sentUs) / self.speed) if self.speed else 0
+            self.queue.append([ticksAdd(now, delay), reply, 0])
+            i += 1
+        self.cursor = i
+        return len(data)
+
+    def nextRecord(self, key):
+        """Index of the first request record at or after the cursor carrying key, or -1."""
+        found = self.index.get(key)
+        if not found:
+            return -1
+        lo = 0
+        hi = len(found)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if found[mid] < self.cursor:
+                lo = mid + 1
+            else:
+                hi = mid
+        return found[lo] if lo < len(found) else -1
+
+    def any(self):
+        """Bytes of the replies that are due."""
+        now = ticksUs()
+        total = 0
+        for entry in self.queue:
+            if ticksDiffUs(now, entry[0]) < 0:
+                break
+            total += len(entry[1]) - entry[2]
+        return total
+
+    def readinto(self, buf):
+        """Copy due reply bytes into buf. Returns the count, or None if nothing is due."""
+        now = ticksUs()
+        n = 0
+        while self.queue and n < len(buf):
+            entry = self.queue[0]
+            if ticksDiffUs(now, entry[0]) < 0:
+                break
+            data, offset = entry[1], entry[2]
+            chunk = min(len(buf) - n, len(data) - offset)
+            buf[n:n + chunk] = data[offset:offset + chunk]
+            n += chunk
+            if offset + chunk == len(data):
+                self.queue.pop(0)
+            else:
+                entry[2] = offset + chunk
+        return n or None
+
+    def stats(self):
+        return {
+            'records': len(self.records),
+            'writes': self.writes,
+            'matched': self.matched,
+            'skipped': self.skipped,
+            'mismatches': self.mismatches,
+        }
+
+    def __repr__(self):
+        return 'ReplayPort(records=%d, speed=%r, baudrate=%d)' % (len(self.records), self.speed, self.baudrate)
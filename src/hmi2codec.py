@@ -0,0 +1,254 @@
+"""
+HMI2 Codec
+Stateless encoders/decoders for HMI2 tag values.
+On the wire every value travels as 6-bit digits, most significant first:
+8-bit values (display characters) as 2 digits, N words as 3, D words and
+F values (IEEE-754 single bits) as 6. Encoders write the digits straight
+into a caller-supplied buffer at an offset and return the offset after
+them; decoders read from any buffer or memoryview. Nothing is kept in
+module or instance state, so every function is reentrant and safe to call
+from timers, threads and scheduled callbacks. Works on MicroPython and
+CPython.
+encodeFrames()/decodeFrames() convert whole tag ranges to and from a
+contiguous stream of fixed-size frames in one pass, vectorized with NumPy
+when it is installed.
+"""
+
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    FLOAT32 = struct.Struct('>f')
+    UINT32 = struct.Struct('>I')
+except AttributeError:
+    # MicroPython: no struct.Struct, bind the format once instead
+    class _Struct:
+        def __init__(self, fmt):
+            self.format = fmt
+            self.size = struct.calcsize(fmt)
+
+        def pack(self, *values):
+            return struct.pack(self.format, *values)
+
+        def pack_into(self, buf, offset, *values):
+            struct.pack_into(self.format, buf, offset, *values)
+
+        def unpack(self, data):
+            return struct.unpack(self.format, data)
+
+        def unpack_from(self, data, offset=0):
+            return struct.unpack_from(self.format, data, offset)
+
+    FLOAT32 = _Struct('>f')
+    UINT32 = _Struct('>I')
+
+# Wire size of each encoding, in 6-bit digits (bytes)
+SIZE8 = 2
+SIZE16 = 3
+SIZE32 = 6
+
+# Value digits per frame command: writes 'L'/'N'/'P', panel records 'K'/'M'/'O'
+COMMAND_DIGITS = {76: SIZE16, 78: SIZE32, 80: SIZE32, 75: SIZE16, 77: SIZE32, 79: SIZE32}
+FLOAT_COMMANDS = (79, 80)  # 'O', 'P'
+FRAME_END = 98  # 'b'
+
+NUMPY_MIN = 16  # frames below which the plain loop beats NumPy's setup cost
+
+
+def encode8(buf, pos, value):
+    """Write an 8-bit value as 2 digits at buf[pos]. Returns pos + 2."""
+    buf[pos] = (value >> 6) & 0x3F
+    buf[pos + 1] = value & 0x3F
+    return pos + 2
+
+
+def encode16(buf, pos, value):
+    """Write a 16-bit value as 3 digits at buf[pos]. Returns pos + 3."""
+    buf[pos] = (value >> 12) & 0x0F
+    buf[pos + 1] = (value >> 6) & 0x3F
+    buf[pos + 2] = value & 0x3F
+    return pos + 3
+
+
+def encode32(buf, pos, value):
+    """Write a 32-bit value as 6 digits at buf[pos]. Returns pos + 6."""
+    buf[pos] = (value >> 30) & 0x03
+    buf[pos + 1] = (value >> 24) & 0x3F
+    buf[pos + 2] = (value >> 18) & 0x3F
+    buf[pos + 3] = (value >> 12) & 0x3F
+    buf[pos + 4] = (value >> 6) & 0x3F
+    buf[pos + 5] = value & 0x3F
+    return pos + 6
+
+
+def encodeFloat(buf, pos, value):
+    """
+    Write a float (single precision bits) as 6 digits at buf[pos].
+    The IEEE-754 bytes are staged in the digit slots themselves, so no
+    scratch buffer is needed. Returns pos + 6.
+    """
+    FLOAT32.pack_into(buf, pos, value)
+    return encode32(buf, pos, UINT32.unpack_from(buf, pos)[0])
+
+
+def decode8(buf, pos):
+    """Read 2 digits at buf[pos] as an 8-bit value."""
+    return ((buf[pos] << 6) | buf[pos + 1]) & 0xFF
+
+
+def decode16(buf, pos):
+    """Read 3 digits at buf[pos] as a 16-bit value."""
+    return ((buf[pos] << 12) | (buf[pos + 1] << 6) | buf[pos + 2]) & 0xFFFF
+
+
+def decode32(buf, pos):
+    """Read 6 digits at buf[pos] as a 32-bit value."""
+    return ((buf[pos] << 30) | (buf[pos + 1] << 24) | (buf[pos + 2] << 18)
+            | (buf[pos + 3] << 12) | (buf[pos + 4] << 6) | buf[pos + 5]) & 0xFFFFFFFF
+
+
+def decodeFloat(buf, pos):
+    """Read 6 digits at buf[pos] as single precision bits and return the float."""
+    return FLOAT32.unpack(UINT32.pack(decode32(buf, pos)))[0]
+
+
+def frameSize(command, prefixSize=1):
+    """Bytes of one value frame: prefix, command, word, digits, terminator."""
+    return prefixSize + 3 + COMMAND_DIGITS[command]
+
+
+def encodeFrames(buf, pos, command, values, start=0, prefix=b'@'):
+    """
+    Write one frame per value into buf[pos:]: prefix, command, word
+    (start, start + 1, ...), the value digits and the terminator.
+
+    Args:
+        buf: Writable buffer with room for len(values) * frameSize() bytes
+        pos: Offset of the first frame
+        command: Frame command byte (76 'L', 78 'N', 80 'P', or the panel
+            records 75 'K', 77 'M', 79 'O')
+        values: Sequence, array or memoryview of N/D/F values
+        start: Word number of values[0]
+        prefix: Bytes before the command: b'@' for UART writes,
+            bytes((slot, 64)) for LAN writes, b'' for panel records
+
+    Returns:
+        The offset after the last frame.
+
+    Raises:
+        ValueError: If a word number falls outside 0..255 (one byte).
+    """
+    digits = COMMAND_DIGITS[command]
+    count = len(values)
+    if count and (start < 0 or start + count > 256):
+        raise ValueError("words %d..%d do not fit in one byte" % (start, start + count - 1))
+    if numpy is not None and count >= NUMPY_MIN:
+        return _encodeFramesNumpy(buf, pos, command, values, start, prefix, digits)
+    if command in FLOAT_COMMANDS:
+        encode = encodeFloat
+    elif digits == SIZE16:
+        encode = encode16
+    else:
+        encode = encode32
+    p = len(prefix)
+    size = p + 3 + digits
+    for k in range(count):
+        buf[pos:pos + p] = prefix
+        buf[pos + p] = command
+        buf[pos + p + 1] = start + k
+        encode(buf, pos + p + 2, values[k])
+        pos += size
+        buf[pos - 1] = FRAME_END
+    return pos
+
+
+def decodeFrames(data, command, table, prefixSize=1):
+    """
+    Store every frame of a contiguous stream of `command` frames (as
+    written by encodeFrames) into table[word]. Words beyond the table
+    are skipped.
+
+    Args:
+        data: Buffer or memoryview holding whole frames only
+        command: Frame command byte of every frame in the stream
+        table: List or array receiving the values (array('f') for floats)
+        prefixSize: Bytes before the command byte in each frame
+
+    Returns:
+        The number of frames decoded.
+
+    Raises:
+        ValueError: If data is not a whole number of `command` frames.
+    """
+    digits = COMMAND_DIGITS[command]
+    size = prefixSize + 3 + digits
+    count = len(data) // size
+    if count * size != len(data):
+        raise ValueError("%d bytes is not a whole number of %d-byte frames" % (len(data), size))
+    if numpy is not None and count >= NUMPY_MIN and hasattr(table, 'typecode'):
+        return _decodeFramesNumpy(data, command, table, prefixSize, digits, count)
+    if command in FLOAT_COMMANDS:
+        decode = decodeFloat
+    elif digits == SIZE16:
+        decode = decode16
+    else:
+        decode = decode32
+    limit = len(table)
+    pos = 0
+    for k in range(count):
+        if data[pos + prefixSize] != command or data[pos + size - 1] != FRAME_END:
+            raise ValueError("frame %d is not a %r frame" % (k, chr(command)))
+        word = data[pos + prefixSize + 1]
+        if word < limit:
+            table[word] = decode(data, pos + prefixSize + 2)
+        pos += size
+    return count
+
+
+def _encodeFramesNumpy(buf, pos, command, values, start, prefix, digits):
+    count = len(values)
+    p = len(prefix)
+    size = p + 3 + digits
+    if command in FLOAT_COMMANDS:
+        bits = numpy.asarray(values, dtype=numpy.float32).view(numpy.uint32)
+    else:
+        # Wrap like the integer masks of encode16/encode32
+        bits = (numpy.asarray(values, dtype=numpy.int64) & 0xFFFFFFFF).astype(numpy.uint32)
+        if digits == SIZE16:
+            bits = bits & 0xFFFF
+    # Write straight into buf through a (count, size) view
+    frames = numpy.frombuffer(buf, dtype=numpy.uint8, count=count * size, offset=pos).reshape(count, size)
+    if p:
+        frames[:, :p] = numpy.frombuffer(bytes(prefix), dtype=numpy.uint8)
+    frames[:, p] = command
+    frames[:, p + 1] = numpy.arange(start, start + count, dtype=numpy.uint32) & 0xFF
+    for d in range(digits):
+        frames[:, p + 2 + d] = (bits >> (6 * (digits - 1 - d))) & 0x3F
+    frames[:, size - 1] = FRAME_END
+    return pos + count * size
+
+
+def _decodeFramesNumpy(data, command, table, prefixSize, digits, count):
+    size = prefixSize + 3 + digits
+    frames = numpy.frombuffer(data, dtype=numpy.uint8, count=count * size).reshape(count, size)
+    bad = (frames[:, prefixSize] != command) | (frames[:, size - 1] != FRAME_END)
+    if bad.any():
+        raise ValueError("frame %d is not a %r frame" % (int(bad.argmax()), chr(command)))
+    bits = numpy.zeros(count, dtype=numpy.uint32)
+    for d in range(digits):
+        bits = (bits << 6) | frames[:, prefixSize + 2 + d]
+    if command in FLOAT_COMMANDS:
+        values = bits.view(numpy.float32)
+    elif digits == SIZE16:
+        values = bits & 0xFFFF
+    else:
+        values = bits
+    words = frames[:, prefixSize + 1]
+    keep = words < len(table)
+    target = numpy.frombuffer(table, dtype=numpy.dtype(table.typecode))
+    target[words[keep]] = values[keep]
+    return count
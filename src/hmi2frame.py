@@ -0,0 +1,173 @@
+"""
+HMI2 Frame Parser
+Incremental, resumable splitter for 'b'-terminated HMI2 reply frames.
+Bytes are kept in a preallocated ring buffer so data belonging to the next
+frame survives between calls, and a frame is returned as soon as its
+terminator arrives. Works on MicroPython and CPython.
+"""
+
+FRAME_END = 98  # 'b'
+
+
+class FrameParser:
+    """
+    Ring-buffered frame splitter.
+    Feed bytes with feed() or readFrom(), then pull complete frames with
+    nextFrame(). Scanning resumes where the previous call stopped, so a
+    frame split over several reads is only scanned once.
+    """
+
+    def __init__(self, size=256):
+        self.size = size
+        self.ring = bytearray(size)
+        self.view = memoryview(self.ring)
+        self.head = 0  # first byte of the current (incomplete) frame
+        self.count = 0  # bytes held in the ring
+        self.scanned = 0  # bytes of the current frame known not to be FRAME_END
+        self.overflows = 0
+        self._hasFind = hasattr(self.ring, 'find')
+
+    def reset(self):
+        """Discard every buffered byte."""
+        self.head = 0
+        self.count = 0
+        self.scanned = 0
+
+    def pending(self):
+        """Number of buffered bytes not yet returned as a frame."""
+        return self.count
+
+    def space(self):
+        """Number of free bytes in the ring."""
+        return self.size - self.count
+
+    def ready(self):
+        """True if a complete frame is buffered."""
+        return self._find() >= 0
+
+    def _tail(self):
+        tail = self.head + self.count
+        if tail >= self.size:
+            tail -= self.size
+        return tail
+
+    def _writable(self):
+        """Largest contiguous free region as (start, length)."""
+        if self.count == 0:
+            # Rewind so a whole frame fits without wrapping
+            self.head = 0
+            self.scanned = 0
+            return 0, self.size
+        tail = self._tail()
+        if tail >= self.head:
+            return tail, self.size - tail
+        return tail, self.head - tail
+
+    def _dropOverflow(self):
+        # A full ring without a terminator cannot hold a valid frame
+        self.overflows += 1
+        self.reset()
+
+    def feed(self, data):
+        """Append bytes to the ring. Returns the number of bytes accepted."""
+        n = len(data)
+        accepted = 0
+        while accepted < n:
+            if self.count == self.size:
+                if self._find() >= 0:
+                    break
+                self._dropOverflow()
+            start, length = self._writable()
+            chunk = min(length, n - accepted)
+            self.ring[start:start + chunk] = data[accepted:accepted + chunk]
+            self.count += chunk
+            accepted += chunk
+        return accepted
+
+    def readFrom(self, readinto, limit=None):
+        """
+        Fill the ring from a stream.
+
+        Args:
+            readinto: Callable taking a writable memoryview and returning the
+                number of bytes stored (socket.recv_into, UART.readinto, ...)
+            limit: Read at most this many bytes (e.g. what UART.any()
+                reports, so a UART read never waits for more)
+
+        Returns:
+            Bytes read, 0 at end of stream, or None if nothing was available.
+        """
+        if self.count == self.size:
+            if self._find() >= 0:
+                return 0
+            self._dropOverflow()
+        start, length = self._writable()
+        if limit is not None and limit < length:
+            length = limit
+        n = readinto(self.view[start:start + length])
+        if n:
+            self.count += n
+        return n
+
+    def _find(self):
+        """Offset of the first FRAME_END after head, or -1."""
+        if self.scanned >= self.count:
+            return -1
+        start = self.head + self.scanned
+        if start >= self.size:
+            start -= self.size
+        end = self.head + self.count
+        ring = self.ring
+        if self._hasFind:
+            if end <= self.size:
+                pos = ring.find(FRAME_END, start, end)
+                if pos >= 0:
+                    return pos - self.head
+            else:
+                if start >= self.head:
+                    pos = ring.find(FRAME_END, start, self.size)
+                    if pos >= 0:
+                        return pos - self.head
+                    start = 0
+                pos = ring.find(FRAME_END, start, end - self.size)
+                if pos >= 0:
+                    return pos + self.size - self.head
+        else:
+            offset = self.scanned
+            pos = start
+            while offset < self.count:
+                if ring[pos] == FRAME_END:
+                    return offset
+                offset += 1
+                pos += 1
+                if pos == self.size:
+                    pos = 0
+        self.scanned = self.count
+        return -1
+
+    def nextFrame(self, out):
+        """
+        Pop the next complete frame into `out`.
+
+        Args:
+            out: Writable buffer receiving the frame, terminator included;
+                longer frames are truncated to len(out)
+
+        Returns:
+            The frame length, or -1 if no complete frame is buffered yet.
+        """
+        offset = self._find()
+        if offset < 0:
+            return -1
+        length = offset + 1
+        copy = min(length, len(out))
+        first = min(copy, self.size - self.head)
+        out[0:first] = self.view[self.head:self.head + first]
+        if copy > first:
+            out[first:copy] = self.view[0:copy - first]
+        self.head += length
+        if self.head >= self.size:
+            self.head -= self.size
+        self.count -= length
+        self.scanned = 0
+        return length
@@ -0,0 +1,158 @@
+"""
+HMI2 Metrics
+Allocation-free instrumentation for Hmi2: frames and bytes per command in
+each direction, reply round-trip times in a fixed-bucket histogram, reply
+timeouts, caught exceptions, (re)connects and update-cycle times.
+Every counter lives in an array allocated once, so recording from the scan
+timer or a hot path never allocates; snapshot() builds the plain dict a
+dashboard or exporter reads. Works on MicroPython and CPython.
+
+Usage:
+    metrics = hmi.enableMetrics()
+    ...
+    print(hmi.getMetrics())
+"""
+
+from array import array
+
+from hmi2transport import ticksUs, ticksDiffUs  # noqa: F401 (re-exported)
+
+# Upper bounds (microseconds) of the RTT histogram buckets; one more bucket
+# counts everything slower
+RTT_BUCKETS = (250, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 200000, 500000, 1000000)
+
+# Frame command bytes are '@'..'\x7f': counters are indexed by command - 64
+COMMAND_BASE = 64
+COMMAND_SLOTS = 64
+
+# Requests whose send time is remembered until their reply arrives
+INFLIGHT_SIZE = 128
+
+
+class Hmi2Metrics:
+    """
+    Counters of one Hmi2 link.
+    Replies arrive in request order, so a ring of send timestamps pairs
+    each reply with its request for the RTT histogram, pipelined drains and
+    packed flushes included. A timeout or a lost link clears the ring.
+    """
+
+    def __init__(self):
+        zeros = [0] * COMMAND_SLOTS
+        self.framesOut = array('L', zeros)
+        self.bytesOut = array('L', zeros)
+        self.framesIn = array('L', zeros)
+        self.bytesIn = array('L', zeros)
+        self.rttCounts = array('L', [0] * (len(RTT_BUCKETS) + 1))
+        # ticks_us values are small ints on MicroPython: a list stores them without boxing
+        self.inflight = [0] * INFLIGHT_SIZE
+        self.reset()
+
+    def reset(self):
+        """Zero every counter."""
+        for table in (self.framesOut, self.bytesOut, self.framesIn, self.bytesIn, self.rttCounts):
+            for i in range(len(table)):
+                table[i] = 0
+        self.inflightHead = 0
+        self.inflightCount = 0
+        self.rttCount = 0
+        self.rttSumUs = 0
+        self.rttMaxUs = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.cycles = 0
+        self.cycleLastUs = 0
+        self.cycleMaxUs = 0
+        self.cycleTotalUs = 0
+
+    def sent(self, command, nbytes):
+        """Count a request frame and remember when it went out."""
+        i = (command - COMMAND_BASE) & (COMMAND_SLOTS - 1)
+        self.framesOut[i] += 1
+        self.bytesOut[i] += nbytes
+        if self.inflightCount == INFLIGHT_SIZE:
+            # More in flight than a flush can produce: pairing is lost, start over
+            self.inflightCount = 0
+        self.inflight[(self.inflightHead + self.inflightCount) % INFLIGHT_SIZE] = ticksUs()
+        self.inflightCount += 1
+
+    def received(self, command, nbytes):
+        """Count a reply frame and record the round trip of its request."""
+        i = (command - COMMAND_BASE) & (COMMAND_SLOTS - 1)
+        self.framesIn[i] += 1
+        self.bytesIn[i] += nbytes
+        if not self.inflightCount:
+            return
+        rtt = ticksDiffUs(ticksUs(), self.inflight[self.inflightHead])
+        self.inflightHead = (self.inflightHead + 1) % INFLIGHT_SIZE
+        self.inflightCount -= 1
+        self.rttCount += 1
+        self.rttSumUs += rtt
+        if rtt > self.rttMaxUs:
+            self.rttMaxUs = rtt
+        b = 0
+        n = len(RTT_BUCKETS)
+        while b < n and rtt > RTT_BUCKETS[b]:
+            b += 1
+        self.rttCounts[b] += 1
+
+    def timeout(self):
+        """A reply did not arrive in time; the requests still in flight are forgotten."""
+        self.timeouts += 1
+        self.inflightCount = 0
+
+    def error(self):
+        """An exception was caught instead of raised."""
+        self.errors += 1
+
+    def connected(self):
+        self.connects += 1
+
+    def disconnected(self):
+        self.disconnects += 1
+        self.inflightCount = 0
+
+    def cycle(self, us):
+        """Record the duration of one update cycle."""
+        self.cycles += 1
+        self.cycleLastUs = us
+        self.cycleTotalUs += us
+        if us > self.cycleMaxUs:
+            self.cycleMaxUs = us
+
+    def snapshot(self):
+        """
+        Counters as a plain dict (allocates; call it from the reporting side).
+        Per-command tables are keyed by the command character and list only
+        the commands seen; rttCounts has one entry per RTT_BUCKETS bound
+        plus the overflow bucket.
+        """
+        return {
+            'framesOut': self._perCommand(self.framesOut),
+            'bytesOut': self._perCommand(self.bytesOut),
+            'framesIn': self._perCommand(self.framesIn),
+            'bytesIn': self._perCommand(self.bytesIn),
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'connects': self.connects,
+            'reconnects': max(0, self.connects - 1),
+            'disconnects': self.disconnects,
+            'cycles': self.cycles,
+            'cycleLastUs': self.cycleLastUs,
+            'cycleMaxUs': self.cycleMaxUs,
+            'cycleTotalUs': self.cycleTotalUs,
+            'rttBucketsUs': RTT_BUCKETS,
+            'rttCounts': list(self.rttCounts),
+            'rttCount': self.rttCount,
+            'rttSumUs': self.rttSumUs,
+            'rttMaxUs': self.rttMaxUs,
+        }
+
+    def _perCommand(self, table):
+        out = {}
+        for i in range(COMMAND_SLOTS):
+            if table[i]:
+                out[chr(COMMAND_BASE + i)] = table[i]
+        return out
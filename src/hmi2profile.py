@@ -0,0 +1,181 @@
+"""
+HMI2 Profiler
+Per-phase wall time of Hmi2 update cycles, to tell whether a slow scan is
+network-bound, decode-bound or flush-bound before tuning anything:
+
+    poll      'a'/'e' request until its reply
+    drain     'c' round trips, waiting for records (decoding excluded)
+    decode    applying the drained records to the tables
+    override  the 'f' override broadcast (every *FileOver set)
+    flush     pending writes and the 'g' push, acks included
+
+It also counts the records decoded per type ('A' 65, 'K' 75, 'M' 77,
+'O' 79, control codes) and the bytes moved by each cycle. Accumulators
+are lists allocated once; summary()/report() build the result on the
+reporting side. Works on MicroPython and CPython.
+
+Usage:
+    profiler = hmi.enableProfiler()
+    ...
+    profiler.report()
+"""
+
+from hmi2transport import ticksUs, ticksDiffUs
+
+PHASE_POLL = 0
+PHASE_DRAIN = 1
+PHASE_DECODE = 2
+PHASE_OVERRIDE = 3
+PHASE_FLUSH = 4
+PHASE_NAMES = ('poll', 'drain', 'decode', 'override', 'flush')
+PHASES = len(PHASE_NAMES)
+
+# What a scan dominated by each phase is waiting on
+PHASE_BOUND = ('network', 'network', 'decode', 'override', 'flush')
+
+# Panel records with a tag value; any other code is a control code
+RECORD_NAMES = ((65, 'A'), (75, 'K'), (77, 'M'), (79, 'O'))
+
+
+class Hmi2Profiler:
+    """
+    Phase timer of one Hmi2. The cycle code calls start() when a cycle
+    begins, mark(phase) when a phase ends (the time since the previous
+    mark goes to that phase) and end(phase) or abort() when it is over.
+    Decode time is measured per record and taken out of the drain phase.
+    """
+
+    def __init__(self):
+        self.current = [0] * PHASES
+        self.totalUs = [0] * PHASES
+        self.maxUs = [0] * PHASES
+        self.records = [0] * 128
+        self.reset()
+
+    def reset(self):
+        """Zero every accumulator."""
+        for table in (self.current, self.totalUs, self.maxUs, self.records):
+            for i in range(len(table)):
+                table[i] = 0
+        self.active = False
+        self.last = 0
+        self.decodeUs = 0  # decode time since the last mark, taken out of it
+        self.cycles = 0
+        self.aborted = 0
+        self.bytesOut = 0
+        self.bytesIn = 0
+        self.bytesOutTotal = 0
+        self.bytesInTotal = 0
+        self.bytesOutMax = 0
+        self.bytesInMax = 0
+
+    def start(self):
+        """A cycle begins: phase times and byte counts restart from zero."""
+        for i in range(PHASES):
+            self.current[i] = 0
+        self.bytesOut = 0
+        self.bytesIn = 0
+        self.decodeUs = 0
+        self.active = True
+        self.last = ticksUs()
+
+    def mark(self, phase):
+        """Charge the time since the previous mark (decoding excluded) to `phase`."""
+        if not self.active:
+            return
+        now = ticksUs()
+        self.current[phase] += ticksDiffUs(now, self.last) - self.decodeUs
+        self.current[PHASE_DECODE] += self.decodeUs
+        self.decodeUs = 0
+        self.last = now
+
+    def end(self, phase):
+        """Mark `phase` and fold the cycle into the totals."""
+        if not self.active:
+            return
+        self.mark(phase)
+        self.active = False
+        self.cycles += 1
+        for i in range(PHASES):
+            us = self.current[i]
+            self.totalUs[i] += us
+            if us > self.maxUs[i]:
+                self.maxUs[i] = us
+        self.bytesOutTotal += self.bytesOut
+        self.bytesInTotal += self.bytesIn
+        if self.bytesOut > self.bytesOutMax:
+            self.bytesOutMax = self.bytesOut
+        if self.bytesIn > self.bytesInMax:
+            self.bytesInMax = self.bytesIn
+
+    def abort(self):
+        """The cycle was dropped (reply timeout or lost link): its times are discarded."""
+        if self.active:
+            self.active = False
+            self.aborted += 1
+
+    def sent(self, nbytes):
+        self.bytesOut += nbytes
+
+    def received(self, nbytes):
+        self.bytesIn += nbytes
+
+    def record(self, code, us):
+        """Count one decoded panel record and the microseconds it took."""
+        self.records[code & 127] += 1
+        self.decodeUs += us
+
+    def summary(self):
+        """
+        Totals as a plain dict: per phase the total/mean/max microseconds
+        and its share of the profiled time, records per type, bytes per
+        cycle, the dominant phase and what it means ('network', 'decode',
+        'override' or 'flush').
+        """
+        cycles = self.cycles or 1
+        overall = sum(self.totalUs) or 1
+        phases = {}
+        dominant = 0
+        for i in range(PHASES):
+            phases[PHASE_NAMES[i]] = {
+                'totalUs': self.totalUs[i],
+                'meanUs': self.totalUs[i] // cycles,
+                'maxUs': self.maxUs[i],
+                'share': self.totalUs[i] / overall,
+            }
+            if self.totalUs[i] > self.totalUs[dominant]:
+                dominant = i
+        records = {}
+        typed = 0
+        for code, name in RECORD_NAMES:
+            records[name] = self.records[code]
+            typed += self.records[code]
+        records['control'] = sum(self.records) - typed
+        network = self.totalUs[PHASE_POLL] + self.totalUs[PHASE_DRAIN]
+        if network >= self.totalUs[dominant]:
+            bound = 'network'
+        else:
+            bound = PHASE_BOUND[dominant]
+        return {
+            'cycles': self.cycles,
+            'aborted': self.aborted,
+            'phases': phases,
+            'dominant': PHASE_NAMES[dominant],
+            'bound': bound,
+            'records': records,
+            'bytesOut': {'total': self.bytesOutTotal, 'mean': self.bytesOutTotal // cycles, 'max': self.bytesOutMax},
+            'bytesIn': {'total': self.bytesInTotal, 'mean': self.bytesInTotal // cycles, 'max': self.bytesInMax},
+        }
+
+    def report(self, out=print):
+        """Write the summary as a small table: `out` is called with each line."""
+        s = self.summary()
+        out("[HMI2] %d cycles (%d aborted), %s-bound: %s dominates" % (s['cycles'], s['aborted'], s['bound'], s['dominant']))
+        out("[HMI2] %-9s %10s %9s %9s %6s" % ('phase', 'total us', 'mean us', 'max us', 'share'))
+        for name in PHASE_NAMES:
+            p = s['phases'][name]
+            out("[HMI2] %-9s %10d %9d %9d %5.1f%%" % (name, p['totalUs'], p['meanUs'], p['maxUs'], p['share'] * 100))
+        r = s['records']
+        out("[HMI2] records A %d K %d M %d O %d control %d" % (r['A'], r['K'], r['M'], r['O'], r['control']))
+        out("[HMI2] bytes/cycle out mean %d max %d, in mean %d max %d" % (
+            s['bytesOut']['mean'], s['bytesOut']['max'], s['bytesIn']['mean'], s['bytesIn']['max']))
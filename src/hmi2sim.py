@@ -0,0 +1,702 @@
+"""
+HMI2 Panel Simulator
+A pure-Python stand-in for the HMI Control Panel app.
+Speaks the Hmi2 wire protocol over TCP (LAN, port 1030), over a UART-like
+loopback object or over a pseudo-terminal, serves all six memory banks, and supports scriptable change
+streams plus injected latency and loss for benchmarking and soak tests.
+"""
+
+import os
+import random
+import select
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+# Frame bytes
+FRAME_START = 64  # '@'
+FRAME_END = 98  # 'b'
+
+DEFAULT_PORT = 1030
+BANK_COUNT = 6
+
+# Records and control codes sent by the panel
+REC_BINARY = 65  # 'A'
+REC_INT = 75  # 'K'
+REC_DINT = 77  # 'M'
+REC_REAL = 79  # 'O'
+CODE_CHANGES = 99  # 'c'
+CODE_DONE = 100  # 'd'
+CODE_OVERRIDE = 102  # 'f'
+CODE_UPDATE = 103  # 'g'
+
+# Commands sent by the client
+CMD_SYNC = 97  # 'a'
+CMD_POLL = 101  # 'e'
+CMD_NEXT = 99  # 'c'
+CMD_BFILE = 67  # 'C'
+CMD_NFILE = 76  # 'L'
+CMD_DFILE = 78  # 'N'
+CMD_FFILE = 80  # 'P'
+CMD_TEXT = 107  # 'k'
+
+
+def split6(value, parts):
+    """Split an unsigned value into `parts` 6-bit groups, most significant first."""
+    out = []
+    for i in range(parts - 1, -1, -1):
+        out.append((value >> (6 * i)) & 0x3F)
+    return out
+
+
+def join6(parts):
+    """Join 6-bit groups (most significant first) into an unsigned value."""
+    value = 0
+    for part in parts:
+        value = (value << 6) | (part & 0x3F)
+    return value
+
+
+def floatToBits(value):
+    """Reinterpret a float as its IEEE-754 single precision bit pattern."""
+    return struct.unpack('>I', struct.pack('>f', value))[0]
+
+
+def bitsToFloat(bits):
+    """Reinterpret an IEEE-754 single precision bit pattern as a float."""
+    return struct.unpack('>f', struct.pack('>I', bits & 0xFFFFFFFF))[0]
+
+
+class PanelBank:
+    """
+    One memory bank (LAN slot 1-6) of the simulated panel.
+    Holds the panel-side B/N/D/F tables, the LCD lines written by the client
+    and the queue of change records waiting to be drained with 'c'.
+    """
+
+    def __init__(self, slot, bSize=60, ndfSize=50):
+        self.slot = slot
+        self.bSize = bSize
+        self.ndfSize = ndfSize
+
+        self.bFile = [0] * bSize
+        self.nFile = [0] * ndfSize
+        self.dFile = [0] * ndfSize
+        self.fFile = [0.0] * ndfSize
+
+        # displayID -> [line0, line1] as 16-byte bytearrays
+        self.displays = {}
+
+        # Records waiting for the client, and tags owned by the panel side
+        # (replayed to the client on every 'a' resync)
+        self.changes = deque()
+        self.panelTags = {}
+        self.updateRequested = False
+        self.overrideOnSync = False
+
+        self.writesReceived = 0
+        self.recordsSent = 0
+
+    # Panel-side changes (what a user tapping on the app would do)
+    def setBoolean(self, word, bit, value):
+        """Change a B File bit on the panel and queue an 'A' record."""
+        if 0 <= word < self.bSize and 0 <= bit < 16:
+            if value:
+                self.bFile[word] |= (1 << bit)
+            else:
+                self.bFile[word] &= ~(1 << bit) & 0xFFFF
+            record = bytes([REC_BINARY, word, bit, 49 if value else 48, FRAME_END])
+            self.panelTags[('B', word, bit)] = record
+            self.changes.append(record)
+
+    def setInt(self, word, value):
+        """Change an N File word on the panel and queue a 'K' record."""
+        if 0 <= word < self.ndfSize:
+            value &= 0xFFFF
+            self.nFile[word] = value
+            record = bytes([REC_INT, word] + split6(value, 3) + [FRAME_END])
+            self.panelTags[('N', word)] = record
+            self.changes.append(record)
+
+    def setDInt(self, word, value):
+        """Change a D File word on the panel and queue an 'M' record."""
+        if 0 <= word < self.ndfSize:
+            value &= 0xFFFFFFFF
+            self.dFile[word] = value
+            record = bytes([REC_DINT, word] + split6(value, 6) + [FRAME_END])
+            self.panelTags[('D', word)] = record
+            self.changes.append(record)
+
+    def setFloat(self, word, value):
+        """Change an F File word on the panel and queue an 'O' record."""
+        if 0 <= word < self.ndfSize:
+            bits = floatToBits(value)
+            self.fFile[word] = bitsToFloat(bits)
+            record = bytes([REC_REAL, word] + split6(bits, 6) + [FRAME_END])
+            self.panelTags[('F', word)] = record
+            self.changes.append(record)
+
+    def requestOverride(self):
+        """Queue an 'f': the client must resend every tag on its next write."""
+        self.changes.append(bytes([CODE_OVERRIDE, FRAME_END]))
+
+    def requestUpdate(self):
+        """End the next drain with 'g': the client pushes all its written tags."""
+        self.updateRequested = True
+
+    def getBoolean(self, word, bit):
+        """Read a B File bit as last seen by the panel."""
+        return bool((self.bFile[word] >> bit) & 1)
+
+    def getLine(self, displayID, line):
+        """Read an LCD line (0 or 1) of a display as text."""
+        lines = self.displays.get(displayID)
+        if lines is None:
+            return ' ' * 16
+        return lines[line].decode('latin-1')
+
+    # Protocol handling
+    def handle(self, cmd, payload):
+        """Handle one client command for this bank and return the reply frame."""
+        if cmd == CMD_SYNC:
+            # Resync: replay everything the panel owns, then ask for the
+            # client's state with a trailing 'g'
+            self.changes.clear()
+            if self.overrideOnSync:
+                self.requestOverride()
+            for record in self.panelTags.values():
+                self.changes.append(record)
+            self.updateRequested = True
+            return bytes([CODE_CHANGES, FRAME_END])
+
+        if cmd == CMD_POLL:
+            if self.changes or self.updateRequested:
+                return bytes([CODE_CHANGES, FRAME_END])
+            return bytes([CODE_DONE, FRAME_END])
+
+        if cmd == CMD_NEXT:
+            if self.changes:
+                self.recordsSent += 1
+                return self.changes.popleft()
+            if self.updateRequested:
+                self.updateRequested = False
+                return bytes([CODE_UPDATE, FRAME_END])
+            return bytes([CODE_DONE, FRAME_END])
+
+        if cmd == CMD_BFILE and len(payload) >= 3:
+            word, bit = payload[0], payload[1]
+            if word < self.bSize and bit < 16:
+                if payload[2] == 49:
+                    self.bFile[word] |= (1 << bit)
+                else:
+                    self.bFile[word] &= ~(1 << bit) & 0xFFFF
+        elif cmd == CMD_NFILE and len(payload) >= 4:
+            if payload[0] < self.ndfSize:
+                self.nFile[payload[0]] = join6(payload[1:4]) & 0xFFFF
+        elif cmd == CMD_DFILE and len(payload) >= 7:
+            if payload[0] < self.ndfSize:
+                self.dFile[payload[0]] = join6(payload[1:7]) & 0xFFFFFFFF
+        elif cmd == CMD_FFILE and len(payload) >= 7:
+            if payload[0] < self.ndfSize:
+                self.fFile[payload[0]] = bitsToFloat(join6(payload[1:7]))
+        elif cmd == CMD_TEXT and len(payload) >= 34:
+            text = bytearray(16)
+            for i in range(16):
+                text[i] = ((payload[2 * i] << 6) | payload[2 * i + 1]) & 0xFF
+            lines = self.displays.setdefault(payload[32], [bytearray(b' ' * 16), bytearray(b' ' * 16)])
+            lines[0 if payload[33] == 49 else 1] = text
+        else:
+            return bytes([CODE_DONE, FRAME_END])
+
+        self.writesReceived += 1
+        # Writes are acknowledged by echoing the command letter
+        return bytes([cmd, FRAME_END])
+
+
+class Panel:
+    """
+    Transport-independent protocol engine of the simulated panel.
+    Owns the six memory banks and turns client frames into reply frames.
+    """
+
+    def __init__(self, banks=BANK_COUNT, bSize=60, ndfSize=50):
+        self.banks = [PanelBank(i + 1, bSize, ndfSize) for i in range(banks)]
+        self.lock = threading.RLock()
+
+        self.framesIn = 0
+        self.framesOut = 0
+        self.bytesIn = 0
+        self.bytesOut = 0
+        self.commandCounts = {}
+
+    def bank(self, slot):
+        """Return the bank for a LAN slot (1-6)."""
+        return self.banks[slot - 1]
+
+    def handleFrame(self, frame, lan=True):
+        """
+        Handle one complete client frame (terminator included).
+
+        Args:
+            frame: Bytes of the frame, '[slot,]@,cmd,...,b'
+            lan: True if the frame carries the LAN slot prefix
+
+        Returns:
+            The reply frame, or None if the frame is malformed.
+        """
+        offset = 1 if lan else 0
+        if len(frame) < offset + 3 or frame[offset] != FRAME_START:
+            return None
+        slot = frame[0] if lan else 1
+        if slot < 1 or slot > len(self.banks):
+            return None
+        cmd = frame[offset + 1]
+        payload = frame[offset + 2:-1]
+
+        with self.lock:
+            reply = self.bank(slot).handle(cmd, payload)
+            self.framesIn += 1
+            self.bytesIn += len(frame)
+            self.framesOut += 1
+            self.bytesOut += len(reply)
+            key = chr(cmd)
+            self.commandCounts[key] = self.commandCounts.get(key, 0) + 1
+        return reply
+
+    def apply(self, slot, method, *args):
+        """Apply a panel-side change, e.g. apply(1, 'setInt', 4, 1234)."""
+        with self.lock:
+            getattr(self.bank(slot), method)(*args)
+
+    def pending(self, slot=None):
+        """Number of change records still queued (for one bank or all)."""
+        with self.lock:
+            if slot is not None:
+                return len(self.bank(slot).changes)
+            return sum(len(b.changes) for b in self.banks)
+
+    def stats(self):
+        """Snapshot of frame and byte counters."""
+        with self.lock:
+            return {
+                'framesIn': self.framesIn,
+                'framesOut': self.framesOut,
+                'bytesIn': self.bytesIn,
+                'bytesOut': self.bytesOut,
+                'commands': dict(self.commandCounts),
+                'pending': sum(len(b.changes) for b in self.banks),
+            }
+
+    def play(self, events, speed=1.0):
+        """
+        Play a change script in a background thread.
+
+        Args:
+            events: Iterable of (at_seconds, slot, method, *args) tuples,
+                e.g. (0.5, 1, 'setInt', 4, 1234)
+            speed: Time scale, 2.0 plays twice as fast, 0 plays without delays
+
+        Returns:
+            The started daemon thread.
+        """
+        def run():
+            start = time.monotonic()
+            for event in events:
+                if speed > 0:
+                    delay = event[0] / speed - (time.monotonic() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+                self.apply(*event[1:])
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+
+def randomScript(count, slot=1, period=0.0, kinds='BNDF', bSize=60, ndfSize=50, seed=None):
+    """
+    Build a random change script for Panel.play().
+
+    Args:
+        count: Number of changes
+        slot: Memory bank the changes go to
+        period: Seconds between consecutive changes
+        kinds: Tag files to draw from ('B', 'N', 'D', 'F')
+        seed: Seed for a reproducible script
+    """
+    rnd = random.Random(seed)
+    events = []
+    for i in range(count):
+        kind = rnd.choice(kinds)
+        at = i * period
+        if kind == 'B':
+            events.append((at, slot, 'setBoolean', rnd.randrange(bSize), rnd.randrange(16), rnd.random() < 0.5))
+        elif kind == 'N':
+            events.append((at, slot, 'setInt', rnd.randrange(ndfSize), rnd.randrange(0x10000)))
+        elif kind == 'D':
+            events.append((at, slot, 'setDInt', rnd.randrange(ndfSize), rnd.randrange(0x100000000)))
+        else:
+            events.append((at, slot, 'setFloat', rnd.randrange(ndfSize), rnd.uniform(-1000.0, 1000.0)))
+    return events
+
+
+class LinkModel:
+    """
+    Injected link impairments: reply latency (fixed or uniform jitter range)
+    and reply loss probability.
+    """
+
+    def __init__(self, latency=0.0, loss=0.0, seed=None):
+        self.latency = latency
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.dropped = 0
+
+    def delay(self):
+        """Seconds to hold back the next reply."""
+        if isinstance(self.latency, (tuple, list)):
+            return self.random.uniform(self.latency[0], self.latency[1])
+        return self.latency
+
+    def drop(self):
+        """True if the next reply should be lost."""
+        if self.loss > 0 and self.random.random() < self.loss:
+            self.dropped += 1
+            return True
+        return False
+
+
+class PanelServer:
+    """
+    TCP front-end of the simulated panel, equivalent to the app listening on
+    port 1030. Every client connection gets its own reader thread; replies
+    are released by a writer thread once their injected latency has elapsed,
+    so pipelined requests overlap like on a real link.
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, panel=None, latency=0.0, loss=0.0, seed=None):
+        self.host = host
+        self.port = port
+        self.panel = panel if panel is not None else Panel()
+        self.link = LinkModel(latency, loss, seed)
+        self.address = None
+        self.connections = 0
+
+        self._listener = None
+        self._running = False
+        self._clients = []
+        self._clientsLock = threading.Lock()
+
+    def start(self):
+        """Bind, listen and serve in a background thread. Returns self."""
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((self.host, self.port))
+        self._listener.listen(8)
+        self.address = self._listener.getsockname()
+        self._running = True
+        threading.Thread(target=self._acceptLoop, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop listening and close every client connection."""
+        self._running = False
+        if self._listener:
+            try:
+                self._listener.close()
+            except OSError:
+                pass
+            self._listener = None
+        self.dropConnections()
+
+    def dropConnections(self):
+        """Close every client connection (simulates a link outage)."""
+        with self._clientsLock:
+            clients, self._clients = self._clients, []
+        for conn in clients:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _acceptLoop(self):
+        while self._running:
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._clientsLock:
+                self._clients.append(conn)
+            self.connections += 1
+            threading.Thread(target=self._serveClient, args=(conn,), daemon=True).start()
+
+    def _serveClient(self, conn):
+        outbox = deque()
+        ready = threading.Condition()
+        state = {'open': True, 'due': 0.0}
+
+        def writer():
+            while True:
+                with ready:
+                    while state['open'] and not outbox:
+                        ready.wait()
+                    if not outbox:
+                        return
+                    due, data = outbox.popleft()
+                wait = due - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                try:
+                    conn.sendall(data)
+                except OSError:
+                    return
+
+        threadWriter = threading.Thread(target=writer, daemon=True)
+        threadWriter.start()
+
+        pending = bytearray()
+        try:
+            while self._running:
+                data = conn.recv(4096)
+                if not data:
+                    break
+                pending += data
+                while True:
+                    end = pending.find(FRAME_END)
+                    if end < 0:
+                        break
+                    frame = bytes(pending[:end + 1])
+                    del pending[:end + 1]
+                    reply = self.panel.handleFrame(frame, lan=True)
+                    if reply is None or self.link.drop():
+                        continue
+                    # Keep replies in order even when the jitter shrinks
+                    due = max(time.monotonic() + self.link.delay(), state['due'])
+                    state['due'] = due
+                    with ready:
+                        outbox.append((due, reply))
+                        ready.notify()
+        except OSError:
+            pass
+        finally:
+            with ready:
+                state['open'] = False
+                ready.notify()
+            threadWriter.join(1.0)
+            try:
+                conn.close()
+            except OSError:
+                pass
+            with self._clientsLock:
+                if conn in self._clients:
+                    self._clients.remove(conn)
+
+
+class PanelSerial:
+    """
+    UART-like loopback to the simulated panel, for the serial path of Hmi2.
+    The client writes frames with write(); replies become readable through
+    any()/read()/readinto() once the injected latency and the wire time at
+    the configured baud rate have elapsed.
+    """
+
+    def __init__(self, panel=None, latency=0.0, loss=0.0, seed=None, baudrate=None):
+        self.panel = panel if panel is not None else Panel(banks=1)
+        self.link = LinkModel(latency, loss, seed)
+        self.baudrate = baudrate
+
+        self._tx = bytearray()
+        self._rx = bytearray()
+        self._inflight = deque()
+        self._due = 0.0
+
+    def _wireTime(self, nbytes):
+        if not self.baudrate:
+            return 0.0
+        return nbytes * 10.0 / self.baudrate  # 8N1: 10 bit times per byte
+
+    def _release(self):
+        now = time.monotonic()
+        while self._inflight and self._inflight[0][0] <= now:
+            self._rx += self._inflight.popleft()[1]
+
+    def write(self, buf):
+        """Send bytes to the panel; returns the number of bytes written."""
+        self._tx += buf
+        now = time.monotonic()
+        while True:
+            end = self._tx.find(FRAME_END)
+            if end < 0:
+                break
+            frame = bytes(self._tx[:end + 1])
+            del self._tx[:end + 1]
+            reply = self.panel.handleFrame(frame, lan=False)
+            if reply is None or self.link.drop():
+                continue
+            due = now + self._wireTime(len(frame) + len(reply)) + self.link.delay()
+            self._due = max(due, self._due)
+            self._inflight.append((self._due, reply))
+        return len(buf)
+
+    def any(self):
+        """Number of reply bytes ready to be read."""
+        self._release()
+        return len(self._rx)
+
+    def read(self, nbytes=None):
+        """Read up to nbytes ready bytes, or None if nothing is ready."""
+        self._release()
+        if not self._rx:
+            return None
+        if nbytes is None or nbytes > len(self._rx):
+            nbytes = len(self._rx)
+        data = bytes(self._rx[:nbytes])
+        del self._rx[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        """Read ready bytes into buf; returns the count, or None if nothing is ready."""
+        self._release()
+        if not self._rx:
+            return None
+        n = len(buf) if nbytes is None else min(nbytes, len(buf))
+        n = min(n, len(self._rx))
+        buf[:n] = self._rx[:n]
+        del self._rx[:n]
+        return n
+
+
+class PanelPty:
+    """
+    Pseudo-terminal front-end of the simulated panel, standing in for a
+    USB-serial adapter wired to the panel app. `device` is the slave end:
+    open it like any serial port (hmi2transport.SerialPort/openSerial) and
+    pass that to Hmi2.init(); a background thread answers on the master
+    end. Replies are held back by the injected latency only, a pty has no
+    wire time. POSIX only.
+    """
+
+    def __init__(self, panel=None, latency=0.0, loss=0.0, seed=None):
+        self.panel = panel if panel is not None else Panel(banks=1)
+        self.link = LinkModel(latency, loss, seed)
+        self.device = None
+
+        self._master = -1
+        self._slave = -1
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Open the pty and serve it in a background thread. Returns self."""
+        import tty
+        self._master, self._slave = os.openpty()
+        # Raw until the client configures it; the slave stays open here so
+        # the master does not read EIO while no client has the device open
+        tty.setraw(self._slave)
+        self.device = os.ttyname(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close both ends."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd >= 0:
+                os.close(fd)
+        self._master = self._slave = -1
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _serve(self):
+        pending = bytearray()
+        outbox = deque()
+        due = 0.0
+        while self._running:
+            timeout = 0.1
+            if outbox:
+                timeout = max(0.0, outbox[0][0] - time.monotonic())
+            readable, _, _ = select.select((self._master,), (), (), timeout)
+            now = time.monotonic()
+            while outbox and outbox[0][0] <= now:
+                os.write(self._master, outbox.popleft()[1])
+            if not readable:
+                continue
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                break
+            pending += data
+            while True:
+                end = pending.find(FRAME_END)
+                if end < 0:
+                    break
+                frame = bytes(pending[:end + 1])
+                del pending[:end + 1]
+                reply = self.panel.handleFrame(frame, lan=False)
+                if reply is None or self.link.drop():
+                    continue
+                due = max(time.monotonic() + self.link.delay(), due)
+                if not outbox and due <= time.monotonic():
+                    os.write(self._master, reply)
+                else:
+                    outbox.append((due, reply))
+
+
+def main(argv=None):
+    """Run a standalone simulated panel: python hmi2sim.py --port 1030"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='HMI Control Panel simulator (Hmi2 wire protocol)')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='reply latency in milliseconds')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='extra uniform reply jitter in milliseconds')
+    parser.add_argument('--loss', type=float, default=0.0, help='reply loss probability (0-1)')
+    parser.add_argument('--changes', type=int, default=0, help='random panel-side changes to inject')
+    parser.add_argument('--period-ms', type=float, default=100.0, help='milliseconds between injected changes')
+    parser.add_argument('--bank', type=int, default=1, help='memory bank for injected changes')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    latency = args.latency_ms / 1000.0
+    if args.jitter_ms > 0:
+        latency = (latency, latency + args.jitter_ms / 1000.0)
+
+    server = PanelServer(args.host, args.port, latency=latency, loss=args.loss, seed=args.seed).start()
+    print("HMI2 panel simulator listening on %s:%d" % server.address)
+    if args.changes:
+        server.panel.play(randomScript(args.changes, args.bank, args.period_ms / 1000.0, seed=args.seed))
+    try:
+        while True:
+            time.sleep(5)
+            print(server.panel.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+HMI2 Trace
+Structured trace events for Hmi2, replacing the old "[HMI2 DEBUG]" prints.
+The library calls `self.trace(event, *args)` behind a single
+`self.trace is not None` check, so with no subscriber attached nothing is
+formatted or allocated. A subscriber is any callable(event, *args); event
+is a short string naming what happened, args its raw values (no text is
+built on the library side).
+
+Events:
+    init            serial_or_ip, lan_memory_bank
+    connect         (ip, port): LAN link established
+    connectWait     state, retryIn ms: LAN link not up yet
+    failover        from endpoint index, to endpoint index
+    linkLost        reason: 'send', 'closed', 'poll', 'replyTimeout', 'sharedResync'
+    send            command byte, bytes: one request frame
+    sendFrames      frames, bytes: one packed write-behind buffer
+    reply           code byte, bytes: one reply frame
+    timeout         ms: no reply in time
+    unacked         missing, frames: packed frames left unacknowledged
+    update          syncro: blocking cycle started
+    updateDone      update2Android
+    drainDone       update2Android
+    record          code byte: panel change record applied
+    override        the panel asked for a full resend ('f')
+    flush           pending writes sent (acked frames)
+    readBFile       word, bit, value
+    readNFile/readDFile/readFFile       word, value
+    writeBFile      word, bit, value
+    writeNFile/writeDFile/writeFFile    word, value
+    setCursor       x, y
+    setDisplayID    displayID
+    writeText2Line  text
+    autoUpdate      enabled, interval_ms
+    scanInterval    ms: adaptive scan period changed
+    cleanLink       a partial reply was discarded
+    closeLan        the LAN socket was closed
+    error           where, exception: caught instead of raised
+
+Usage:
+    recorder = TraceRecorder(256)
+    hmi.addTraceHook(recorder)
+    ...
+    recorder.dump()            # post-mortem: the last 256 events
+    hmi.addTraceHook(printTrace)  # live, on the console
+"""
+
+from hmi2transport import ticksUs, ticksDiffUs
+
+
+def printTrace(event, *args):
+    """Subscriber printing every event on the console."""
+    print("[HMI2] %s %r" % (event, args))
+
+
+class TraceRecorder:
+    """
+    Ring buffer of the last `size` events, each stamped with ticksUs().
+    Slots are allocated once; recording stores references only (the args
+    tuple the call built), so it is cheap enough to leave attached in the
+    field and dump after an incident.
+    """
+
+    def __init__(self, size=256):
+        self.size = size
+        self.stamps = [0] * size
+        self.names = [None] * size
+        self.args = [None] * size
+        self.clear()
+
+    def clear(self):
+        """Forget every recorded event."""
+        self.head = 0
+        self.count = 0
+        self.dropped = 0
+
+    def __call__(self, event, *args):
+        i = self.head
+        self.stamps[i] = ticksUs()
+        self.names[i] = event
+        self.args[i] = args
+        self.head = (i + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+        else:
+            self.dropped += 1
+
+    def __len__(self):
+        return self.count
+
+    def events(self):
+        """Recorded events, oldest first, as (ticksUs, event, args) tuples."""
+        start = (self.head - self.count) % self.size
+        out = []
+        for k in range(self.count):
+            i = (start + k) % self.size
+            out.append((self.stamps[i], self.names[i], self.args[i]))
+        return out
+
+    def dump(self, out=print):
+        """
+        Write the recorded events, oldest first, one line each with the
+        microseconds since the first one: `out` is called with each line.
+        """
+        events = self.events()
+        if self.dropped:
+            out("[HMI2] %d older events dropped" % self.dropped)
+        if not events:
+            return
+        first = events[0][0]
+        for stamp, event, args in events:
+            out("[HMI2] +%dus %s %r" % (ticksDiffUs(stamp, first), event, args))
+
+
+class TraceFanout:
+    """Subscriber forwarding each event to several subscribers, in order."""
+
+    def __init__(self, hooks):
+        self.hooks = hooks
+
+    def __call__(self, event, *args):
+        for hook in self.hooks:
+            hook(event, *args)
@@ -0,0 +1,909 @@
+"""
+HMI2 Transport
+Non-blocking socket engine for the HMI2 LAN link.
+The socket is non-blocking from connect() on and driven by readiness (select.poll, or selectors where poll is missing): received
+bytes go straight into a FrameParser and outbound bytes the kernel cannot
+take yet wait in a queue until the socket is writable again. Waiting for a
+reply is one poll call per wakeup instead of a settimeout/recv loop.
+Connecting never blocks either: connectStep() advances a non-blocking
+connect, and failed attempts are spaced by exponential backoff with jitter.
+SharedLan multiplexes the six LAN memory banks over one such socket.
+UartEngine is the serial counterpart: readinto straight into the parser
+ring, sleeping between polls, with timeouts derived from the baud rate.
+It drives any UART-like object (machine.UART, a pyserial port, or the
+SerialPort/openSerial() backend here for CPython on POSIX), so the serial
+protocol also runs on a PC gateway with USB-serial adapters.
+Works on MicroPython and CPython.
+"""
+
+import time
+
+from hmi2frame import FrameParser
+
+try:
+    import select
+except ImportError:
+    import uselect as select
+
+try:
+    import selectors
+except ImportError:
+    selectors = None
+
+try:
+    import socket
+except ImportError:
+    socket = None
+
+try:
+    import random
+except ImportError:
+    import urandom as random
+
+try:
+    from errno import EAGAIN, EINPROGRESS
+except ImportError:
+    EAGAIN = 11
+    EINPROGRESS = 115
+
+# errno values meaning "try again later" on a non-blocking socket
+WOULD_BLOCK = (EAGAIN, EINPROGRESS, 35, 10035)  # + BSD/macOS and Windows EWOULDBLOCK
+
+SEND_QUEUE_SIZE = 1024
+
+# Connection states
+LINK_DOWN = 0
+LINK_CONNECTING = 1
+LINK_UP = 2
+
+# UART timing
+UART_BITS_PER_BYTE = 10  # start + 8 data + stop bits
+UART_DEFAULT_BAUDRATE = 9600  # assumed when the UART does not tell (slowest common rate)
+UART_LATENCY = 100  # ms the panel app may take to answer on top of the wire time
+MAX_REQUEST = 37  # bytes of the longest UART request ('k' display line)
+MAX_REPLY = 9  # bytes of the longest reply (a 'M'/'O' record)
+
+RETRY_BASE = 250  # ms before the first reconnect attempt after a failure
+RETRY_MAX = 30000  # ms, backoff ceiling
+
+
+def ticksMs():
+    """Millisecond tick counter (time.ticks_ms on MicroPython)."""
+    try:
+        return time.ticks_ms()
+    except AttributeError:
+        return int(time.time() * 1000)
+
+
+def ticksDiff(a, b):
+    """a - b for ticksMs() values, wrap-safe on MicroPython."""
+    try:
+        return time.ticks_diff(a, b)
+    except AttributeError:
+        return a - b
+
+
+def ticksAdd(a, delta):
+    """a + delta for ticksMs() values, wrap-safe on MicroPython."""
+    try:
+        return time.ticks_add(a, delta)
+    except AttributeError:
+        return a + delta
+
+
+try:
+    ticksUs = time.ticks_us
+    ticksDiffUs = time.ticks_diff
+except AttributeError:
+    def ticksUs():
+        """Microsecond tick counter (time.ticks_us on MicroPython)."""
+        return int(time.perf_counter() * 1000000)
+
+    def ticksDiffUs(a, b):
+        return a - b
+
+
+def sleepUs(us):
+    """Sleep us microseconds (time.sleep_us on MicroPython)."""
+    try:
+        time.sleep_us(us)
+    except AttributeError:
+        time.sleep(us / 1000000.0)
+
+
+def isSerial(obj):
+    """True if obj looks like a UART: write, readinto (or read) and any() (or pyserial's in_waiting)."""
+    return (hasattr(obj, 'write') and (hasattr(obj, 'readinto') or hasattr(obj, 'read'))
+            and (hasattr(obj, 'any') or hasattr(obj, 'in_waiting')))
+
+
+def uartBaudrate(uart):
+    """Baud rate of a UART object: its baudrate attribute (pyserial) or its repr (machine.UART)."""
+    rate = getattr(uart, 'baudrate', None)
+    if isinstance(rate, int) and rate > 0:
+        return rate
+    text = repr(uart)
+    pos = text.find('baudrate=')
+    if pos >= 0:
+        pos += 9
+        end = pos
+        while end < len(text) and '0' <= text[end] <= '9':
+            end += 1
+        if end > pos:
+            return int(text[pos:end])
+    return UART_DEFAULT_BAUDRATE
+
+
+class LanEngine:
+    """
+    Readiness-driven socket pump.
+    connectStep() an address (or attach() a connected socket), then send()
+    frames and pull replies with readFrame() (blocking up to a timeout) or
+    wait() (one readiness step). A closed or failed socket is detached;
+    check `connected` / `state`.
+    While the link is down, connectStep() starts a new attempt only once
+    the backoff delay has passed (nextRetry) and returns False at once
+    otherwise, so callers never stall on an unreachable panel. A link
+    closed by the peer or a socket error counts as a failure too, and the
+    count only resets once a complete reply arrives: a server that
+    accepts and then drops every connection keeps backing off.
+    """
+
+    def __init__(self, parser, queueSize=SEND_QUEUE_SIZE):
+        self.parser = parser
+        self.sock = None
+        self.readInto = None
+        self.poller = None
+        self.pollWait = None
+        self.pollMask = 0
+        self.queue = bytearray(queueSize)
+        self.queueView = memoryview(self.queue)
+        self.queueHead = 0
+        self.queueTail = 0
+        self.sendTimeout = 1000  # ms a full send queue may stay stuck
+        self.state = LINK_DOWN
+        self.connectStart = 0
+        self.failures = 0  # consecutive failed attempts, reset by a complete reply
+        self.nextRetry = ticksMs()
+        self.retryBase = RETRY_BASE
+        self.retryMax = RETRY_MAX
+        if hasattr(select, 'poll'):
+            self.pollIn = select.POLLIN
+            self.pollOut = select.POLLOUT
+            self.pollEnd = getattr(select, 'POLLHUP', 0) | getattr(select, 'POLLERR', 0)
+        else:
+            self.pollIn = selectors.EVENT_READ
+            self.pollOut = selectors.EVENT_WRITE
+            self.pollEnd = 0
+
+    @property
+    def connected(self):
+        return self.state == LINK_UP
+
+    def attach(self, sock):
+        """Take over a connected socket: non-blocking, TCP_NODELAY, registered for polling."""
+        self.close()
+        sock.setblocking(False)
+        self._register(sock, self.pollIn)
+        self._up()
+
+    def _register(self, sock, mask):
+        self.sock = sock
+        self.queueHead = 0
+        self.queueTail = 0
+        if hasattr(select, 'poll'):
+            self.poller = select.poll()
+            # MicroPython's ipoll() reuses its result tuple: no allocation per wait
+            self.pollWait = getattr(self.poller, 'ipoll', None) or self.poller.poll
+        else:
+            self.poller = selectors.DefaultSelector()
+        self.poller.register(sock, mask)
+        self.pollMask = mask
+
+    def _up(self):
+        sock = self.sock
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except (AttributeError, OSError):
+            pass  # not every MicroPython port has TCP_NODELAY
+        # CPython sockets have recv_into, MicroPython sockets readinto
+        self.readInto = getattr(sock, 'recv_into', None) or sock.readinto
+        self.parser.reset()
+        if self.pollMask != self.pollIn:
+            self.poller.modify(sock, self.pollIn)
+            self.pollMask = self.pollIn
+        self.state = LINK_UP
+
+    def connectStep(self, address, timeout_ms):
+        """
+        Advance the connection to address without blocking.
+        Starts a non-blocking connect when the link is down and the backoff
+        delay has passed, then checks it for completion on later calls;
+        an attempt still pending after timeout_ms counts as failed.
+        Returns True once the link is up.
+        """
+        if self.state == LINK_UP:
+            return True
+        if self.state == LINK_DOWN:
+            if ticksDiff(ticksMs(), self.nextRetry) < 0:
+                return False  # circuit open: wait for the retry time
+            if not self._startConnect(address):
+                self.failed()
+                return False
+        done = self._connectDone()
+        if done > 0:
+            self._up()
+            return True
+        if done < 0 or ticksDiff(ticksMs(), self.connectStart) >= timeout_ms:
+            self.close()
+            self.failed()
+        return False
+
+    def _startConnect(self, address):
+        self.close()
+        self.connectStart = ticksMs()
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        except OSError:
+            return False
+        sock.setblocking(False)
+        try:
+            sock.connect(address)
+        except OSError as ex:
+            if not (ex.args and ex.args[0] in WOULD_BLOCK):
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+                return False
+        self._register(sock, self.pollOut)
+        self.state = LINK_CONNECTING
+        return True
+
+    def _connectDone(self):
+        """1 if the pending connect completed, 0 if still in progress, -1 if it failed."""
+        events = 0
+        if hasattr(self.poller, 'poll'):
+            for entry in self.poller.poll(0):
+                events |= entry[1]
+        else:
+            for key, ev in self.poller.select(0):
+                events |= ev
+        if events & self.pollEnd:
+            return -1
+        if not events & self.pollOut:
+            return 0
+        try:
+            # CPython reports a refused connect as writable; SO_ERROR tells
+            if self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR):
+                return -1
+        except (AttributeError, OSError):
+            pass  # MicroPython: POLLERR/POLLHUP already covered it
+        return 1
+
+    def failed(self):
+        """Count a failed attempt (or a tripped link) and schedule the next one."""
+        self.failures += 1
+        delay = min(self.retryMax, self.retryBase << min(self.failures - 1, 16))
+        # Full delay +-25% so several boards do not retry in lockstep
+        delay = delay * 3 // 4 + random.getrandbits(16) * (delay // 2) // 65536
+        self.nextRetry = ticksAdd(ticksMs(), delay)
+
+    def _lost(self):
+        """The link broke under a connected socket: close it and back off."""
+        self.close()
+        self.failed()
+
+    def retryNow(self):
+        """Allow the next connectStep() to attempt immediately."""
+        self.nextRetry = ticksMs()
+
+    def retryIn(self):
+        """Milliseconds until the next connect attempt may start (0 when connected or due)."""
+        if self.state != LINK_DOWN:
+            return 0
+        return max(0, ticksDiff(self.nextRetry, ticksMs()))
+
+    def close(self):
+        """Unregister and close the socket, dropping queued bytes."""
+        sock = self.sock
+        self.sock = None
+        self.readInto = None
+        self.state = LINK_DOWN
+        self.queueHead = 0
+        self.queueTail = 0
+        if sock is None:
+            return
+        try:
+            self.poller.unregister(sock)
+        except Exception:
+            pass
+        try:
+            sock.close()
+        except Exception:
+            pass
+        self.poller = None
+
+    def queued(self):
+        """Outbound bytes still waiting for the socket."""
+        return self.queueTail - self.queueHead
+
+    def send(self, data, frames=1):
+        """
+        Write data, queueing whatever the socket cannot take right now.
+        Blocks (polling) only while the send queue is full. frames (how
+        many frames data packs) only matters to SharedLan.
+        Returns False if the link failed.
+        """
+        if self.state != LINK_UP:
+            return False
+        n = 0
+        if self.queueHead == self.queueTail:
+            # Fast path: the whole frame usually goes out at once, no view needed
+            n = self._write(data)
+            if n < 0:
+                return False
+            if n == len(data):
+                return True
+        view = memoryview(data)[n:]
+        start = ticksMs()
+        while len(view):
+            space = len(self.queue) - self.queueTail
+            if space < len(view) and self.queueHead:
+                # Compact: move the unsent bytes to the front
+                count = self.queueTail - self.queueHead
+                self.queue[0:count] = self.queueView[self.queueHead:self.queueTail]
+                self.queueHead = 0
+                self.queueTail = count
+                space = len(self.queue) - count
+            chunk = min(space, len(view))
+            if chunk:
+                self.queue[self.queueTail:self.queueTail + chunk] = view[:chunk]
+                self.queueTail += chunk
+                view = view[chunk:]
+                continue
+            remaining = self.sendTimeout - ticksDiff(ticksMs(), start)
+            if remaining <= 0:
+                self._lost()
+                return False
+            if self.wait(remaining) < 0:
+                return False
+        return True
+
+    def wait(self, timeout_ms):
+        """
+        Wait up to timeout_ms for the socket, then read what arrived into the
+        parser and write queued bytes it can take.
+        Returns the number of bytes received, or -1 if the link closed.
+        """
+        if self.state != LINK_UP:
+            return -1
+        mask = 0
+        if self.parser.space() or not self.parser.ready():
+            mask = self.pollIn
+        if self.queueTail != self.queueHead:
+            mask |= self.pollOut
+        if mask != self.pollMask:
+            self.poller.modify(self.sock, mask)
+            self.pollMask = mask
+
+        events = 0
+        if hasattr(self.poller, 'poll'):
+            for entry in self.pollWait(max(0, timeout_ms)):
+                events |= entry[1]
+        else:
+            for key, ev in self.poller.select(max(0, timeout_ms) / 1000.0):
+                events |= ev
+
+        received = 0
+        if events & self.pollOut:
+            if self._writeQueue() < 0:
+                return -1
+        if events & (self.pollIn | self.pollEnd):
+            received = self._read()
+        return received
+
+    def waitReadable(self, timeout_ms):
+        """
+        Sleep until the socket has bytes to read, at most timeout_ms,
+        without reading them or touching the poller: a scan thread waits
+        here outside the lock, and the next wait() takes the bytes.
+        Returns at once while queued bytes still have to go out.
+        """
+        if self.state != LINK_UP or self.queueTail != self.queueHead:
+            return
+        try:
+            select.select((self.sock,), (), (), max(0, timeout_ms) / 1000.0)
+        except (OSError, ValueError):
+            pass  # closed meanwhile: the next wait() reports it
+
+    def readFrame(self, out, timeout_ms):
+        """
+        Pop the next reply frame into out, waiting up to timeout_ms.
+        Returns the frame length, or -1 on timeout or closed link.
+        """
+        n = self.parser.nextFrame(out)
+        if n >= 0:
+            return n
+        start = ticksMs()
+        remaining = timeout_ms
+        while remaining > 0:
+            if self.wait(remaining) < 0:
+                return -1
+            n = self.parser.nextFrame(out)
+            if n >= 0:
+                return n
+            remaining = timeout_ms - ticksDiff(ticksMs(), start)
+        return -1
+
+    def _read(self):
+        try:
+            n = self.parser.readFrom(self.readInto)
+        except OSError as ex:
+            if ex.args and ex.args[0] in WOULD_BLOCK:
+                return 0
+            self._lost()
+            return -1
+        if n == 0 and self.parser.space():
+            # Readable with nothing to read: the peer closed the connection
+            self._lost()
+            return -1
+        if n and self.failures and self.parser.ready():
+            self.failures = 0  # the panel answered: the link works again
+        return n or 0
+
+    def _write(self, view):
+        try:
+            n = self.sock.send(view)
+        except OSError as ex:
+            if ex.args and ex.args[0] in WOULD_BLOCK:
+                return 0
+            self._lost()
+            return -1
+        return n or 0
+
+    def _writeQueue(self):
+        n = self._write(self.queueView[self.queueHead:self.queueTail])
+        if n > 0:
+            self.queueHead += n
+            if self.queueHead == self.queueTail:
+                self.queueHead = 0
+                self.queueTail = 0
+        return n
+
+
+class SharedLan:
+    """
+    One panel connection shared by up to six bank views (slots 1-6).
+    Every frame already starts with its slot byte; replies carry none but
+    come back in request order, so the owner slot of each frame sent is
+    queued (run-length) and each reply is routed to that bank's parser.
+    A missing reply would shift that routing for good: a bank that times
+    out calls resync(), which restarts the stream for every bank.
+    Banks attach through Hmi2.init(shared, bank); poll()/update() schedule
+    their cycles round-robin so no bank starves the others.
+    """
+
+    def __init__(self, ip_address, port=1030, connect_timeout=5.0):
+        if isinstance(ip_address, str):
+            self.serverIp = tuple(int(x) for x in ip_address.split('.'))
+        else:
+            self.serverIp = tuple(ip_address)
+        self.port = port
+        self.connectTimeout = connect_timeout
+        self.parser = FrameParser(512)
+        self.engine = LanEngine(self.parser)
+        self.frame = bytearray(128)
+        self.frameView = memoryview(self.frame)
+        self.ports = {}  # slot -> SharedLanPort
+        self.banks = []  # attached Hmi2 views, scheduling order
+        self.turn = 0
+        self.owners = []  # [slot, frames] runs, oldest first
+        self.ownersHead = 0
+
+    def register(self, bank):
+        """Attach an Hmi2 bank view. Returns its LanEngine-compatible port."""
+        slot = bank.myLanSlot
+        if slot in self.ports:
+            raise ValueError("LAN memory bank %d is already attached" % slot)
+        port = SharedLanPort(self, slot, bank.lanParser)
+        self.ports[slot] = port
+        self.banks.append(bank)
+        return port
+
+    @property
+    def connected(self):
+        return self.engine.connected
+
+    def connect(self):
+        """
+        Advance the shared connection without blocking (see
+        LanEngine.connectStep). Returns True if connected.
+        """
+        if self.engine.connected:
+            return True
+        if not self.engine.connectStep(('.'.join(map(str, self.serverIp)), self.port), int(self.connectTimeout * 1000)):
+            return False
+        self.clearOwners()
+        for port in self.ports.values():
+            port.parser.reset()
+        return True
+
+    def close(self):
+        """Close the socket; every bank sees the link as lost."""
+        self.engine.close()
+        self.clearOwners()
+
+    def send(self, slot, data, frames=1):
+        """
+        Send `frames` frames packed in data on behalf of a bank and queue it
+        as owner of their replies. The caller knows the count, so nothing
+        is copied or scanned here.
+        """
+        if not self.engine.send(data):
+            self.clearOwners()
+            return False
+        owners = self.owners
+        if len(owners) > self.ownersHead and owners[-1][0] == slot:
+            owners[-1][1] += frames
+        else:
+            owners.append([slot, frames])
+        return True
+
+    def resync(self):
+        """
+        Reset the shared stream after a bank missed a reply. Replies carry
+        no slot, so once one is lost every later reply would be routed to
+        the bank of the request before it. The socket is closed (replies
+        still in flight die with it), the owner queue and partial frames
+        are dropped, and every bank resyncs with 'a' and re-announces its
+        written tags once the connection is back.
+        """
+        for bank in self.banks:
+            bank.abortCycle()
+            bank.closeLan()
+            bank.reannounce()
+        self.close()
+        self.parser.reset()
+        self.engine.failed()
+
+    def clearOwners(self):
+        self.owners = []
+        self.ownersHead = 0
+
+    def pump(self, timeout_ms):
+        """Wait up to timeout_ms for the socket and route complete replies. Returns bytes received or -1."""
+        n = self.engine.wait(timeout_ms)
+        if n < 0:
+            self.clearOwners()
+            return -1
+        self.route()
+        return n
+
+    def route(self):
+        """Hand every complete reply frame to the bank that sent its request."""
+        while True:
+            n = self.parser.nextFrame(self.frame)
+            if n < 0:
+                return
+            if self.ownersHead == len(self.owners):
+                continue  # unsolicited
+            run = self.owners[self.ownersHead]
+            run[1] -= 1
+            if run[1] <= 0:
+                self.ownersHead += 1
+                if self.ownersHead == len(self.owners):
+                    self.clearOwners()
+            port = self.ports.get(run[0])
+            if port is not None:
+                port.parser.feed(self.frameView[:n])
+
+    def step(self):
+        """Give every bank one non-blocking poll() step, starting one bank later each call."""
+        done = 0
+        count = len(self.banks)
+        if not count:
+            return 0
+        first = self.turn % count
+        self.turn = first + 1
+        for k in range(count):
+            if self.banks[(first + k) % count].poll(0):
+                done += 1
+        return done
+
+    def poll(self, timeout_ms=0):
+        """
+        Advance the banks' update cycles, round-robin, waiting at most
+        timeout_ms for replies. Returns the number of cycles completed.
+        """
+        start = ticksMs()
+        while True:
+            done = self.step()
+            remaining = timeout_ms - ticksDiff(ticksMs(), start)
+            if done or remaining <= 0:
+                return done
+            if self.pump(remaining) < 0:
+                return 0
+
+    def update(self):
+        """Run one update cycle on every bank, interleaved on the socket."""
+        waiting = list(self.banks)
+        while waiting:
+            for bank in list(waiting):
+                if bank.poll(0) or not bank.cycleState:
+                    # Completed, aborted or could not start
+                    waiting.remove(bank)
+            if waiting and self.pump(100) < 0:
+                break
+        for bank in waiting:
+            bank.abortCycle()
+
+
+class SharedLanPort:
+    """LanEngine-compatible handle of one bank on a SharedLan."""
+
+    def __init__(self, shared, slot, parser):
+        self.shared = shared
+        self.slot = slot
+        self.parser = parser
+
+    @property
+    def connected(self):
+        return self.shared.engine.connected
+
+    def send(self, data, frames=1):
+        return self.shared.send(self.slot, data, frames)
+
+    def wait(self, timeout_ms):
+        return self.shared.pump(timeout_ms)
+
+    def waitReadable(self, timeout_ms):
+        self.shared.engine.waitReadable(timeout_ms)
+
+    def readFrame(self, out, timeout_ms):
+        n = self.parser.nextFrame(out)
+        if n >= 0:
+            return n
+        start = ticksMs()
+        remaining = timeout_ms
+        while remaining > 0:
+            if self.shared.pump(remaining) < 0:
+                return -1
+            n = self.parser.nextFrame(out)
+            if n >= 0:
+                return n
+            remaining = timeout_ms - ticksDiff(ticksMs(), start)
+        return -1
+
+    @property
+    def state(self):
+        return self.shared.engine.state
+
+    def failed(self):
+        self.shared.engine.failed()
+
+    def retryIn(self):
+        return self.shared.engine.retryIn()
+
+    def close(self):
+        self.shared.close()
+
+
+class UartEngine:
+    """
+    Receive side of a UART link.
+    Waiting bytes move straight into the parser's ring with readinto, never
+    more than any() reports, so a read cannot block on the UART timeout;
+    waiting for a reply sleeps two byte times per poll instead of
+    spinning. frameTimeout() follows the baud rate: the wire time of the
+    longest request plus the longest reply, doubled, plus `latency` ms for
+    the panel app itself (UART_LATENCY, or the port's replyLatency when it
+    reports a longer one, as hmi2capture.ReplayPort does).
+    Same surface as LanEngine (state, connected, parser, send, wait,
+    readFrame, retryIn), so Hmi2 drives either through one bound link.
+    """
+
+    def __init__(self, parser, uart=None, baudrate=None):
+        self.parser = parser
+        self.attach(uart, baudrate)
+
+    def attach(self, uart, baudrate=None):
+        """Take over a UART; baudrate defaults to what the UART reports."""
+        self.uart = uart
+        self.readInto = None
+        self.available = None
+        self.connected = uart is not None
+        self.state = LINK_UP if uart is not None else LINK_DOWN
+        if uart is not None:
+            # machine.UART/SerialPort: any() and readinto; pyserial: in_waiting
+            self.readInto = getattr(uart, 'readinto', None) or self._readIntoFromRead
+            self.available = getattr(uart, 'any', None) or self._inWaiting
+        self.baudrate = baudrate or (uartBaudrate(uart) if uart is not None else UART_DEFAULT_BAUDRATE)
+        self.latency = max(UART_LATENCY, getattr(uart, 'replyLatency', 0))
+        self.byteUs = UART_BITS_PER_BYTE * 1000000 // self.baudrate
+        self.pollUs = 2 * self.byteUs  # a reply's first bytes
+        self.parser.reset()
+
+    def ready(self):
+        """True if a UART is attached (a UART link has no connect step)."""
+        return self.connected
+
+    def retryIn(self):
+        return 0
+
+    def send(self, data, frames=1):
+        """Write frames (their count is unused here). Returns False if the UART failed."""
+        try:
+            self.uart.write(data)
+        except OSError:
+            return False
+        return True
+
+    def wireMs(self, nbytes):
+        """Milliseconds nbytes take on the wire, rounded up."""
+        return (nbytes * self.byteUs + 999) // 1000
+
+    def frameTimeout(self):
+        """Milliseconds to wait for the reply to one request."""
+        return self.latency + 2 * self.wireMs(MAX_REQUEST + MAX_REPLY)
+
+    def read(self):
+        """Move the bytes waiting in the UART into the parser. Returns the count read."""
+        n = self.available()
+        if not n:
+            return 0
+        return self.parser.readFrom(self.readInto, n) or 0
+
+    def wait(self, timeout_ms):
+        """
+        Read what has arrived; if nothing has, sleep two byte times (at
+        most timeout_ms) and read again. Returns the number of bytes read.
+        """
+        n = self.read()
+        if n or timeout_ms <= 0:
+            return n
+        sleepUs(min(timeout_ms * 1000, self.pollUs))
+        return self.read()
+
+    def waitReadable(self, timeout_ms):
+        """Sleep two byte times (at most timeout_ms) unless bytes are already waiting; nothing is read."""
+        if self.connected and not self.available():
+            sleepUs(min(max(0, timeout_ms) * 1000, self.pollUs))
+
+    def readFrame(self, out, timeout_ms):
+        """
+        Pop the next reply frame into out, waiting up to timeout_ms.
+        Returns the frame length, or -1 on timeout.
+        """
+        n = self.parser.nextFrame(out)
+        if n >= 0:
+            return n
+        start = ticksMs()
+        remaining = timeout_ms
+        while remaining > 0:
+            self.wait(remaining)
+            n = self.parser.nextFrame(out)
+            if n >= 0:
+                return n
+            remaining = timeout_ms - ticksDiff(ticksMs(), start)
+        return -1
+
+    def discard(self):
+        """Drop buffered and pending bytes (partial frame left by a timeout), without allocating."""
+        self.parser.reset()
+        n = self.available()
+        while n:
+            self.parser.readFrom(self.readInto, n)
+            self.parser.reset()
+            n = self.available()
+
+    def _inWaiting(self):
+        return self.uart.in_waiting
+
+    def _readIntoFromRead(self, buf):
+        # UARTs without readinto: one read() copy per call
+        data = self.uart.read(len(buf))
+        if not data:
+            return None
+        n = len(data)
+        buf[:n] = data
+        return n
+
+
+class SerialPort:
+    """
+    Serial port for CPython on POSIX (ttyUSB/ttyACM adapters, ttyS, ptys):
+    raw 8N1, non-blocking, with the machine.UART calls UartEngine uses
+    (write, readinto, any, baudrate). readinto reads straight into the
+    caller's buffer and any() asks the kernel (FIONREAD), so neither
+    allocates. Use openSerial() to get a pyserial port instead where
+    pyserial is installed (and on Windows, which has no termios).
+    """
+
+    def __init__(self, device, baudrate=UART_DEFAULT_BAUDRATE):
+        import fcntl
+        import os
+        import termios
+        from array import array
+        self.device = device
+        self.baudrate = baudrate
+        self._os = os
+        self._termios = termios
+        self._ioctl = fcntl.ioctl
+        self._waiting = array('i', [0])
+        self.fd = os.open(device, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            self._configure()
+        except Exception:
+            os.close(self.fd)
+            self.fd = -1
+            raise
+
+    def _configure(self):
+        termios = self._termios
+        speed = getattr(termios, 'B%d' % self.baudrate, None)
+        if speed is None:
+            raise ValueError("Unsupported baud rate %d" % self.baudrate)
+        attrs = termios.tcgetattr(self.fd)
+        attrs[0] = 0  # iflag: no flow control, no CR/NL mapping
+        attrs[1] = 0  # oflag: no output processing
+        attrs[2] = termios.CS8 | termios.CREAD | termios.CLOCAL  # 8N1, ignore modem lines
+        attrs[3] = 0  # lflag: no echo, not canonical, no signals
+        attrs[4] = attrs[5] = speed
+        attrs[6][termios.VMIN] = 0
+        attrs[6][termios.VTIME] = 0
+        termios.tcsetattr(self.fd, termios.TCSANOW, attrs)
+        termios.tcflush(self.fd, termios.TCIOFLUSH)
+
+    def fileno(self):
+        return self.fd
+
+    def any(self):
+        """Number of bytes waiting to be read."""
+        self._ioctl(self.fd, self._termios.FIONREAD, self._waiting, True)
+        return self._waiting[0]
+
+    def readinto(self, buf):
+        """Read waiting bytes into buf. Returns the count, or None if nothing is waiting."""
+        try:
+            return self._os.readv(self.fd, (buf,)) or None
+        except BlockingIOError:
+            return None
+
+    def read(self, nbytes=None):
+        """Read up to nbytes waiting bytes, or None if nothing is waiting."""
+        try:
+            return self._os.read(self.fd, nbytes or self.any() or 1) or None
+        except BlockingIOError:
+            return None
+
+    def write(self, buf):
+        """Write all of buf, waiting for the driver when its queue is full. Returns len(buf)."""
+        view = memoryview(buf)
+        sent = 0
+        while sent < len(view):
+            try:
+                sent += self._os.write(self.fd, view[sent:])
+            except BlockingIOError:
+                select.select((), (self.fd,), (), 1.0)
+        return sent
+
+    def close(self):
+        if self.fd >= 0:
+            self._os.close(self.fd)
+            self.fd = -1
+
+    def __repr__(self):
+        return "SerialPort(%r, baudrate=%d)" % (self.device, self.baudrate)
+
+
+def openSerial(device, baudrate=UART_DEFAULT_BAUDRATE):
+    """
+    Open a serial port for Hmi2.init() on CPython: a non-blocking pyserial
+    port when pyserial is installed, otherwise a SerialPort.
+    """
+    try:
+        import serial
+    except ImportError:
+        return SerialPort(device, baudrate)
+    return serial.Serial(device, baudrate, timeout=0, write_timeout=None)
@@ -0,0 +1,88 @@
+import os
+import random
+import struct
+import sys
+import time
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+import hmi2  # noqa: E402
+import hmi2sim  # noqa: E402
+
+
+@pytest.fixture
+def panelServer():
+    """Factory of simulated panel apps on ephemeral ports, stopped after the test."""
+    servers = []
+
+    def start(**kwargs):
+        server = hmi2sim.PanelServer('127.0.0.1', 0, **kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def lanHmi():
+    """Factory of connected, call-driven Hmi2 objects, closed after the test."""
+    clients = []
+
+    def connect(target, bank=None, hmi=None, **kwargs):
+        kwargs.setdefault('auto_update', False)
+        kwargs.setdefault('background_scan', False)
+        if hmi is None:
+            hmi = hmi2.Hmi2()
+        hmi.init(target, bank, **kwargs)
+        clients.append(hmi)
+        deadline = time.time() + 3
+        while not hmi.connect2Server():
+            assert time.time() < deadline, "no connection to the simulator"
+            time.sleep(0.001)
+        return hmi
+
+    yield connect
+    for hmi in clients:
+        hmi.enableAutoUpdate(False)
+        hmi.closeLan()
+
+
+def float32(value):
+    return struct.unpack('>f', struct.pack('>f', value))[0]
+
+
+def writeRandom(hmi, count, seed):
+    """Make `count` random local set* writes, reproducible from seed."""
+    rnd = random.Random(seed)
+    for _ in range(count):
+        kind = rnd.choice('BNDF')
+        if kind == 'B':
+            hmi.setBoolean(rnd.randrange(hmi.bSize), rnd.randrange(16), rnd.random() < 0.5)
+        elif kind == 'N':
+            hmi.setInt(rnd.randrange(hmi.ndfSize), rnd.randrange(0x10000))
+        elif kind == 'D':
+            hmi.setDInt(rnd.randrange(hmi.ndfSize), rnd.randrange(0x100000000))
+        else:
+            hmi.setFloat(rnd.randrange(hmi.ndfSize), float32(rnd.uniform(-10.0, 10.0)))
+
+
+def tablesMatch(hmi, bank):
+    """True if the client tables hold what the panel bank holds."""
+    return (list(hmi.bFile) == bank.bFile and list(hmi.nFile) == bank.nFile
+            and list(hmi.dFile) == bank.dFile and list(hmi.fFile) == bank.fFile)
+
+
+@pytest.fixture
+def matches():
+    return tablesMatch
+
+
+@pytest.fixture
+def randomWrites():
+    return writeRandom
@@ -0,0 +1,59 @@
+"""Adaptive scan interval: backs off while the panel is idle, snaps back on activity."""
+
+import time
+
+
+def adaptiveHmi(lanHmi, server, **kwargs):
+    """A client in sync with the panel, adaptive scan on: floor 50 ms, ceiling 400 ms."""
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)], update_interval_ms=50, **kwargs)
+    hmi.enableAdaptiveScan(ceiling_ms=400, backoff=2, hold_cycles=3)
+    # The 'a' resync counts as activity: the idle count starts after it
+    hmi.update()
+    assert hmi.scanIdle == 0
+    return hmi
+
+
+def idlePeriods(hmi, cycles):
+    periods = []
+    for _ in range(cycles):
+        hmi.update()
+        periods.append(hmi.getScanInterval())
+    return periods
+
+
+def test_idle_cycles_back_off_to_the_ceiling(panelServer, lanHmi):
+    server = panelServer()
+    hmi = adaptiveHmi(lanHmi, server)
+    assert idlePeriods(hmi, 7) == [50, 50, 50, 100, 200, 400, 400]
+
+
+def test_panel_changes_and_writes_snap_back(panelServer, lanHmi):
+    server = panelServer()
+    hmi = adaptiveHmi(lanHmi, server)
+    idlePeriods(hmi, 6)
+    server.panel.apply(1, 'setInt', 4, 44)
+    hmi.update()
+    assert hmi.nFile[4] == 44
+    assert hmi.getScanInterval() == 50
+    idlePeriods(hmi, 6)
+    hmi.setInt(5, 55)
+    hmi.update()
+    assert hmi.getScanInterval() == 50
+    # Writing a value the table already holds is not activity
+    idlePeriods(hmi, 6)
+    hmi.setInt(5, 55)
+    hmi.update()
+    assert hmi.getScanInterval() == 400
+
+
+def test_a_write_is_due_within_the_floor(panelServer, lanHmi):
+    server = panelServer()
+    hmi = adaptiveHmi(lanHmi, server, write_behind=True)
+    idlePeriods(hmi, 6)
+    hmi.lastUpdateTime = now = time.ticks_ms()
+    assert not hmi.scanDue(now + 60)
+    hmi.setInt(2, 22)
+    assert hmi.scanDue(now + 60)
+    assert not hmi.scanDue(now + 40)
+    hmi.enableAdaptiveScan(False)
+    assert hmi.getScanInterval() == 50 and hmi.scanCeiling is None
@@ -0,0 +1,95 @@
+"""AsyncHmi2: the update cycle over asyncio streams and the background scan task."""
+
+import asyncio
+import time
+
+import hmi2sim
+from hmi2async import AsyncHmi2
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+async def connected(server, bank=1, **kwargs):
+    hmi = AsyncHmi2()
+    hmi.init('127.0.0.1', bank, port=server.address[1], **kwargs)
+    await hmi.connect()
+    return hmi
+
+
+async def until(check, limit=5.0):
+    deadline = time.time() + limit
+    while not check():
+        assert time.time() < deadline, "condition never met"
+        await asyncio.sleep(0.01)
+
+
+def test_update_and_flush(panelServer, matches, randomWrites):
+    server = panelServer(latency=0.001)
+    bank = server.panel.bank(1)
+
+    async def main():
+        hmi = await connected(server)
+        for event in hmi2sim.randomScript(100, slot=1, seed=4):
+            server.panel.apply(*event[1:])
+        while server.panel.pending(1):
+            assert await hmi.update()
+        randomWrites(hmi, 60, 3)
+        assert server.panel.stats()['commands'].get('L', 0) == 0
+        before = server.panel.stats()['framesIn']
+        acked = await hmi.flush()
+        assert acked == server.panel.stats()['framesIn'] - before
+        assert not hmi.pendingWrites
+        assert await hmi.flush() == 0
+        assert matches(hmi, bank)
+        await hmi.close()
+
+    run(main())
+
+
+def test_flush_without_acks_keeps_the_writes(panelServer):
+    server = panelServer()
+    bank = server.panel.bank(1)
+
+    async def main():
+        hmi = await connected(server)
+        hmi.responseTimeout = 100
+        await hmi.update()
+        server.link.loss = 1.0
+        hmi.setInt(3, 33)
+        hmi.setFloat(4, 0.5)
+        assert await hmi.flush() == 0
+        assert hmi.pendingWrites
+        server.link.loss = 0.0
+        assert await hmi.flush() > 0
+        assert not hmi.pendingWrites
+        assert bank.nFile[3] == 33 and bank.fFile[4] == 0.5
+        await hmi.close()
+
+    run(main())
+
+
+def test_scan_task_syncs_and_reconnects(panelServer, matches):
+    server = panelServer()
+    bank = server.panel.bank(2)
+
+    async def main():
+        hmi = await connected(server, 2, scan_interval_ms=10)
+        hmi.reconnectDelay = 20
+        hmi.start()
+        for event in hmi2sim.randomScript(50, slot=2, seed=6):
+            server.panel.apply(*event[1:])
+        hmi.setDInt(1, 123456)
+        await until(lambda: not server.panel.pending(2) and bank.dFile[1] == 123456)
+        await until(lambda: matches(hmi, bank))
+
+        server.dropConnections()
+        await asyncio.sleep(0.05)
+        server.panel.apply(2, 'setInt', 5, 555)
+        await until(lambda: hmi.getInt(5) == 555)
+        assert server.connections == 2
+        await hmi.close()
+        assert hmi.scanTask is None
+
+    run(main())
@@ -0,0 +1,60 @@
+"""Background scans: timer ticks (boards) and the scan thread (PC)."""
+
+import time
+
+import hmi2
+import hmi2sim
+
+
+def tickUntilIdle(hmi, server, slot, limit=200):
+    """Run timer ticks until the panel is drained and the cycle ended. Returns the tick count."""
+    ticks = 0
+    while server.panel.pending(slot) or hmi.cycleState != hmi2.CYCLE_IDLE:
+        assert ticks < limit, "the timer ticks stopped draining"
+        hmi._scheduledScan(0)
+        ticks += 1
+    return ticks
+
+
+def test_timer_ticks_drain_in_round_trips(panelServer, lanHmi, matches):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)])
+    hmi.update()
+    for event in hmi2sim.randomScript(100, slot=1, seed=2):
+        server.panel.apply(*event[1:])
+    # One reply per tick would take about 100 ticks
+    assert tickUntilIdle(hmi, server, 1) <= 5
+    assert matches(hmi, server.panel.bank(1))
+
+
+def test_a_timer_tick_yields_while_the_panel_is_slow(panelServer, lanHmi):
+    server = panelServer(latency=0.1)
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)])
+    server.panel.apply(1, 'setInt', 6, 66)
+    longest = 0.0
+    deadline = time.time() + 5
+    while hmi.nFile[6] != 66 or hmi.cycleState != hmi2.CYCLE_IDLE:
+        assert time.time() < deadline
+        start = time.perf_counter()
+        hmi._scheduledScan(0)
+        longest = max(longest, time.perf_counter() - start)
+    assert longest < 0.04
+
+
+def test_scan_thread_syncs_without_api_calls(panelServer, lanHmi, matches):
+    server = panelServer(latency=0.1)
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)], auto_update=True, background_scan=True,
+                 update_interval_ms=10)
+    assert hmi.updateTimer is not None
+    for event in hmi2sim.randomScript(10, slot=1, seed=5):
+        server.panel.apply(*event[1:])
+    # The scan lock is not held across round trips: foreground calls do not wait for the panel
+    start = time.perf_counter()
+    hmi.getInt(0)
+    assert time.perf_counter() - start < 0.05
+    deadline = time.time() + 10
+    while server.panel.pending(1) or not matches(hmi, server.panel.bank(1)):
+        assert time.time() < deadline, "the scan thread did not sync"
+        time.sleep(0.02)
+    hmi.enableAutoUpdate(False)
+    assert hmi.updateTimer is None
@@ -0,0 +1,93 @@
+"""Reconnect backoff: a flapping server, failure counting and writes lost with the socket."""
+
+import socket
+import threading
+import time
+
+import pytest
+
+import hmi2
+
+
+@pytest.fixture
+def flappingServer():
+    """A server that accepts every connection and closes it at once. Yields (address, accepts)."""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(16)
+    listener.settimeout(0.05)
+    accepts = []
+    running = [True]
+
+    def serve():
+        while running[0]:
+            try:
+                conn, peer = listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            accepts.append(time.monotonic())
+            conn.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield listener.getsockname(), accepts
+    running[0] = False
+    thread.join()
+    listener.close()
+
+
+def test_a_flapping_server_is_backed_off(flappingServer):
+    address, accepts = flappingServer
+    hmi = hmi2.Hmi2()
+    hmi.init([address + (1,)], auto_update=False)
+    deadline = time.time() + 1.5
+    while time.time() < deadline:
+        hmi.update()
+        time.sleep(0.002)
+    hmi.closeLan()
+    # 250 ms doubling: attempts near 0, 0.25, 0.75 s (+-25%), not one per update()
+    assert 2 <= len(accepts) <= 5
+    assert hmi.lanEngine.failures >= 2
+
+
+def test_failures_reset_after_the_first_reply(panelServer, lanHmi):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)])
+    engine = hmi.lanEngine
+    engine.retryBase = 10
+    hmi.update()
+    server.dropConnections()
+    time.sleep(0.05)
+    hmi.update()
+    assert not engine.connected
+    assert engine.failures == 1
+    deadline = time.time() + 3
+    while not hmi.connect2Server():
+        assert time.time() < deadline, "no reconnect"
+        time.sleep(0.002)
+    # Connected is not enough: the panel has to answer
+    assert engine.failures == 1
+    hmi.update()
+    assert engine.failures == 0
+
+
+def test_writes_sent_into_a_dropped_socket_are_sent_again(panelServer, lanHmi):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 2)], write_behind=True)
+    hmi.lanEngine.retryBase = 10
+    bank = server.panel.bank(2)
+    hmi.update()
+    server.dropConnections()
+    time.sleep(0.05)
+    hmi.setInt(3, 33)
+    hmi.setDInt(1, 123456)
+    assert hmi.flush() == 0
+    assert hmi.pendingWrites
+    deadline = time.time() + 3
+    while bank.nFile[3] != 33 or bank.dFile[1] != 123456:
+        assert time.time() < deadline, "the writes were lost with the socket"
+        hmi.update()
+        time.sleep(0.002)
+    assert server.connections == 2
@@ -0,0 +1,123 @@
+"""Wire capture and ReplayPort: recorded sessions played back without a panel."""
+
+import io
+
+import pytest
+
+import hmi2
+import hmi2sim
+from hmi2capture import ReplayPort, readCapture
+
+
+def replay(source, speed, limit=200, **kwargs):
+    """Run update() over a capture until it is used up; returns (hmi, port, cycles)."""
+    kwargs.setdefault('drain_window', 4)
+    port = ReplayPort(source, speed=speed)
+    hmi = hmi2.Hmi2()
+    hmi.init(port, auto_update=False, background_scan=False, **kwargs)
+    cycles = 0
+    while not port.finished():
+        assert cycles < limit, "replay never finished"
+        hmi.update()
+        cycles += 1
+    return hmi, port, cycles
+
+
+def sameTables(a, b):
+    return (list(a.bFile) == list(b.bFile) and list(a.nFile) == list(b.nFile)
+            and list(a.dFile) == list(b.dFile) and list(a.fFile) == list(b.fFile))
+
+
+@pytest.fixture
+def lanCapture(tmp_path, panelServer, lanHmi):
+    """A LAN session draining a random script, captured to a file; yields (path, client)."""
+    server = panelServer(latency=0.001, seed=3)
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)], drain_window=4)
+    path = str(tmp_path / 'lan.cap')
+    capture = hmi.startCapture(path)
+    for event in hmi2sim.randomScript(200, slot=1, seed=1):
+        server.panel.apply(*event[1:])
+    for _ in range(25):
+        hmi.update()
+    hmi.stopCapture()
+    assert capture.framesOut and capture.framesIn
+    return path, hmi
+
+
+@pytest.mark.parametrize('speed', [0, 1.0])
+def test_lan_replay_rebuilds_the_tables(lanCapture, speed):
+    path, live = lanCapture
+    hmi, port, cycles = replay(path, speed)
+    stats = port.stats()
+    assert stats['mismatches'] == 0
+    assert stats['records'] == len(readCapture(path))
+    assert cycles <= 25
+    assert sameTables(hmi, live)
+
+
+def test_replay_ends_after_trailing_app_writes(tmp_path, panelServer, lanHmi):
+    server = panelServer(latency=0.001, seed=3)
+    live = lanHmi([('127.0.0.1', server.address[1], 1)], drain_window=4)
+    path = str(tmp_path / 'writes.cap')
+    live.startCapture(path)
+    for event in hmi2sim.randomScript(100, slot=1, seed=1):
+        server.panel.apply(*event[1:])
+    for i in range(20):
+        live.update()
+        live.setInt(i % 10, i * 7)
+        live.setBoolean(2, i % 16, i & 1)
+        live.print('x%d' % i)
+    for i in range(5):
+        live.setInt(20 + i, i)
+    live.stopCapture()
+
+    hmi, port, cycles = replay(path, 0)
+    assert port.stats()['mismatches'] == 0
+    assert cycles <= 21
+    # The replaying client does not repeat the app writes: they are skipped
+    assert port.stats()['skipped'] > 0
+    assert port.lastScan < port.cursor < len(port.records)
+
+
+def test_serial_replay_from_a_stream():
+    panel = hmi2sim.Panel(banks=1)
+    live = hmi2.Hmi2()
+    live.init(hmi2sim.PanelSerial(panel, baudrate=115200), auto_update=False, background_scan=False)
+    buf = io.BytesIO()
+    live.startCapture(buf)
+    for event in hmi2sim.randomScript(60, slot=1, seed=2):
+        panel.apply(*event[1:])
+    for i in range(10):
+        live.setInt(1, i)
+        live.update()
+    live.stopCapture()
+
+    hmi, port, _ = replay(buf.getvalue(), 0, drain_window=1)
+    assert port.stats()['mismatches'] == 0
+    assert list(hmi.dFile) == list(live.dFile)
+    assert list(hmi.fFile) == list(live.fFile)
+
+
+def test_reply_budget_covers_a_slow_capture(tmp_path, panelServer, lanHmi):
+    server = panelServer(latency=0.05, seed=3)
+    live = lanHmi([('127.0.0.1', server.address[1], 1)], drain_window=4)
+    path = str(tmp_path / 'slow.cap')
+    live.startCapture(path)
+    for event in hmi2sim.randomScript(30, slot=1, seed=1):
+        server.panel.apply(*event[1:])
+    for _ in range(4):
+        live.update()
+    live.stopCapture()
+
+    port = ReplayPort(path, speed=0.5)
+    hmi = hmi2.Hmi2()
+    hmi.init(port, auto_update=False, background_scan=False, drain_window=4)
+    hmi.enableMetrics()
+    cycles = 0
+    while not port.finished():
+        assert cycles < 50, "replay never finished"
+        hmi.update()
+        cycles += 1
+    assert hmi.getMetrics()['timeouts'] == 0
+    assert port.stats()['mismatches'] == 0
+    assert sameTables(hmi, live)
@@ -0,0 +1,125 @@
+"""Value codec: single values, and the batch frame paths with and without NumPy."""
+
+import random
+from array import array
+
+import pytest
+
+import hmi2
+import hmi2codec
+from hmi2codec import (encode16, encode32, encodeFloat, decode16, decode32, decodeFloat,
+                       encodeFrames, decodeFrames, frameSize)
+
+COMMANDS = (76, 78, 80, 75, 77, 79)  # 'L' 'N' 'P', records 'K' 'M' 'O'
+PREFIXES = (b'@', bytes((3, 64)), b'')
+
+
+def sampleValues(command, count, seed=1):
+    rnd = random.Random(seed)
+    if command in hmi2codec.FLOAT_COMMANDS:
+        return array('f', [rnd.uniform(-1e6, 1e6) for _ in range(count)])
+    if hmi2codec.COMMAND_DIGITS[command] == hmi2codec.SIZE16:
+        return array('H', [rnd.randrange(0x10000) for _ in range(count)])
+    return array('L', [rnd.randrange(0x100000000) for _ in range(count)])
+
+
+def encodeWith(monkeypatch, useNumpy, command, values, start, prefix):
+    if not useNumpy:
+        monkeypatch.setattr(hmi2codec, 'numpy', None)
+    buf = bytearray(len(values) * frameSize(command, len(prefix)))
+    end = encodeFrames(buf, 0, command, values, start, prefix)
+    monkeypatch.undo()
+    assert end == len(buf)
+    return bytes(buf)
+
+
+def test_single_values_round_trip():
+    buf = bytearray(6)
+    for value in (0, 1, 0x3F, 0x40, 0x1234, 0xFFFF):
+        encode16(buf, 0, value)
+        assert decode16(buf, 0) == value
+    for value in (0, 0x3F, 0x12345678, 0xFFFFFFFF):
+        encode32(buf, 0, value)
+        assert decode32(buf, 0) == value
+    encodeFloat(buf, 0, 2.5)
+    assert decodeFloat(buf, 0) == 2.5
+    assert all(b < 64 for b in buf)
+
+
+@pytest.mark.parametrize('command', COMMANDS)
+@pytest.mark.parametrize('prefix', PREFIXES)
+def test_frames_round_trip_loop(monkeypatch, command, prefix):
+    values = sampleValues(command, 40)
+    data = encodeWith(monkeypatch, False, command, values, 5, prefix)
+    table = array(values.typecode, [0] * 50)
+    monkeypatch.setattr(hmi2codec, 'numpy', None)
+    assert decodeFrames(data, command, table, len(prefix)) == 40
+    assert list(table[5:45]) == list(values)
+
+
+def test_decode_rejects_foreign_frames():
+    data = bytearray(2 * frameSize(76))
+    encodeFrames(data, 0, 76, [1, 2])
+    with pytest.raises(ValueError):
+        decodeFrames(data, 78, [0] * 4)
+    with pytest.raises(ValueError):
+        decodeFrames(data[:-1], 76, [0] * 4)
+
+
+@pytest.mark.parametrize('useNumpy', (False, True))
+def test_word_numbers_beyond_a_byte_raise(monkeypatch, useNumpy):
+    if useNumpy:
+        pytest.importorskip('numpy')
+    values = sampleValues(76, 20)
+    with pytest.raises(ValueError):
+        encodeWith(monkeypatch, useNumpy, 76, values, 250, b'@')
+    assert encodeWith(monkeypatch, useNumpy, 76, values, 236, b'@')[2] == 236
+
+
+@pytest.mark.parametrize('command', COMMANDS)
+@pytest.mark.parametrize('prefix', PREFIXES)
+def test_numpy_matches_loop(monkeypatch, command, prefix):
+    numpy = pytest.importorskip('numpy')
+    assert hmi2codec.numpy is numpy
+    values = sampleValues(command, 64, seed=command)
+    loop = encodeWith(monkeypatch, False, command, values, 3, prefix)
+    vectorized = encodeWith(monkeypatch, True, command, values, 3, prefix)
+    assert vectorized == loop
+
+    tableLoop = array(values.typecode, [0] * 70)
+    tableNumpy = array(values.typecode, [0] * 70)
+    monkeypatch.setattr(hmi2codec, 'numpy', None)
+    decodeFrames(loop, command, tableLoop, len(prefix))
+    monkeypatch.undo()
+    decodeFrames(loop, command, tableNumpy, len(prefix))
+    assert list(tableNumpy) == list(tableLoop)
+
+
+def test_numpy_wraps_like_the_loop(monkeypatch):
+    pytest.importorskip('numpy')
+    values = [-1, 0x1FFFF, 0x123456789] * 6
+    for command in (76, 78):
+        assert (encodeWith(monkeypatch, True, command, values, 0, b'@')
+                == encodeWith(monkeypatch, False, command, values, 0, b'@'))
+
+
+def test_deprecated_hmi2_helpers_wrap_the_codec():
+    hmi = hmi2.Hmi2()
+    with pytest.warns(DeprecationWarning):
+        hmi.fragmentData16(0xBEEF)
+    assert (hmi.hd, hmi.md, hmi.ld) == (0xB, 0x3B, 0x2F)
+    with pytest.warns(DeprecationWarning):
+        assert hmi.joinInt16(hmi.hd, hmi.md, hmi.ld) == 0xBEEF
+    with pytest.warns(DeprecationWarning):
+        hmi.fragmentData8(0xA5)
+        assert hmi.joinInt8(hmi.md, hmi.ld) == 0xA5
+    with pytest.warns(DeprecationWarning):
+        hmi.fragmentData32(0x12345678)
+        assert hmi.joinInt32(hmi.hd32, hmi.md32, hmi.ld32, hmi.hd, hmi.md, hmi.ld) == 0x12345678
+    with pytest.warns(DeprecationWarning):
+        hmi.fragmentDataFloat(-2.5)
+        bits = hmi.joinInt32(hmi.hd32, hmi.md32, hmi.ld32, hmi.hd, hmi.md, hmi.ld)
+        assert hmi.joinFloat(bits) == -2.5
+    buf = bytearray(6)
+    encodeFloat(buf, 0, -2.5)
+    assert (hmi.hd32, hmi.md32, hmi.ld32, hmi.hd, hmi.md, hmi.ld) == tuple(buf)
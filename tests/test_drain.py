@@ -0,0 +1,36 @@
+"""Draining panel change records with update(), one 'c' at a time or pipelined."""
+
+import time
+
+import hmi2sim
+
+
+def test_update_drains_panel_changes(panelServer, lanHmi, matches):
+    server = panelServer()
+    for drainWindow in (1, 4):
+        hmi = lanHmi([('127.0.0.1', server.address[1], drainWindow)], drain_window=drainWindow)
+        bank = server.panel.bank(drainWindow)
+        for event in hmi2sim.randomScript(150, slot=drainWindow, seed=drainWindow):
+            server.panel.apply(*event[1:])
+        assert server.panel.pending(drainWindow)
+        while server.panel.pending(drainWindow):
+            hmi.update()
+        assert matches(hmi, bank)
+
+
+def test_pipelining_overlaps_the_round_trips(panelServer, lanHmi, matches):
+    server = panelServer(latency=0.005)
+    elapsed = {}
+    for drainWindow in (1, 4):
+        hmi = lanHmi([('127.0.0.1', server.address[1], drainWindow)], drain_window=drainWindow)
+        hmi.update()
+        for event in hmi2sim.randomScript(40, slot=drainWindow, seed=3):
+            server.panel.apply(*event[1:])
+        start = time.perf_counter()
+        hmi.update()
+        elapsed[drainWindow] = time.perf_counter() - start
+        assert not server.panel.pending(drainWindow)
+        assert matches(hmi, server.panel.bank(drainWindow))
+    # 42 round trips of 5 ms one by one, about a quarter of them with 4 in flight
+    assert elapsed[4] < elapsed[1] * 0.6
+
@@ -0,0 +1,44 @@
+"""Redundant LAN endpoints: hot-standby failover across two simulated panel apps."""
+
+import time
+
+
+def test_fails_over_when_the_primary_hangs_and_back_when_the_standby_dies(panelServer, lanHmi, matches):
+    primary = panelServer()
+    standby = panelServer()
+    hmi = lanHmi([('127.0.0.1', primary.address[1], 1), ('127.0.0.1', standby.address[1], 2)])
+    hmi.responseTimeout = 200
+    for _ in range(5):
+        hmi.update()
+    hmi.setInt(3, 333)
+    hmi.setFloat(1, 1.5)
+    hmi.setBoolean(0, 2, True)
+    hmi.update()
+    assert primary.panel.bank(1).nFile[3] == 333
+    assert hmi.endpointIndex == 0
+
+    # The primary stops answering: the standby takes over and gets the full state
+    primary.link.loss = 1.0
+    hmi.update()
+    hmi.update()
+    assert hmi.failovers == 1
+    assert hmi.endpointIndex == 1
+    bank = standby.panel.bank(2)
+    assert bank.nFile[3] == 333 and bank.fFile[1] == 1.5 and bank.bFile[0] == 4
+    hmi.setInt(4, 44)
+    hmi.update()
+    assert bank.nFile[4] == 44
+    assert matches(hmi, bank)
+
+    # The old primary recovers as standby, then the new primary crashes
+    primary.link.loss = 0.0
+    for _ in range(5):
+        hmi.update()
+    standby.stop()
+    deadline = time.time() + 5
+    while hmi.endpointIndex != 0:
+        assert time.time() < deadline, "no failover back to the first endpoint"
+        hmi.update()
+    assert hmi.failovers == 2
+    hmi.update()
+    assert primary.panel.bank(1).nFile[4] == 44
@@ -0,0 +1,75 @@
+"""Ring-buffered reply frame parser."""
+
+import random
+
+from hmi2frame import FrameParser
+
+
+def randomFrames(rnd, count, longest):
+    body = [x for x in range(256) if x != 98]
+    return [bytes(rnd.choice(body) for _ in range(rnd.randrange(longest))) + b'b' for _ in range(count)]
+
+
+def drain(parser, out):
+    frames = []
+    while True:
+        n = parser.nextFrame(out)
+        if n < 0:
+            return frames
+        frames.append(bytes(out[:n]))
+
+
+def test_frames_split_over_feeds_come_out_whole():
+    rnd = random.Random(1)
+    out = bytearray(64)
+    for size in (16, 32, 256):
+        parser = FrameParser(size)
+        frames = randomFrames(rnd, 200, 12)
+        stream = b''.join(frames)
+        got = []
+        pos = 0
+        while pos < len(stream):
+            chunk = stream[pos:pos + rnd.randrange(1, 20)]
+            accepted = 0
+            while accepted < len(chunk):
+                accepted += parser.feed(chunk[accepted:])
+                got += drain(parser, out)
+            pos += len(chunk)
+        assert got == frames
+        assert parser.pending() == 0
+
+
+def test_read_from_respects_the_limit():
+    parser = FrameParser(32)
+    source = bytearray(b'@Kab@Mcdb')
+    calls = []
+
+    def readinto(view):
+        n = min(len(view), len(source))
+        view[:n] = source[:n]
+        del source[:n]
+        calls.append(n)
+        return n
+
+    assert parser.readFrom(readinto, 3) == 3
+    assert not parser.ready()
+    parser.readFrom(readinto)
+    assert drain(parser, bytearray(16)) == [b'@Kab', b'@Mcdb']
+    assert calls == [3, 6]
+
+
+def test_a_full_ring_without_terminator_is_dropped():
+    parser = FrameParser(8)
+    assert parser.feed(b'x' * 8) == 8
+    assert parser.feed(b'ab') == 2
+    assert parser.overflows == 1
+    assert drain(parser, bytearray(8)) == [b'ab']
+
+
+def test_long_frames_are_truncated_to_the_output():
+    parser = FrameParser(32)
+    parser.feed(b'0123456789b@cb')
+    out = bytearray(4)
+    assert parser.nextFrame(out) == 11
+    assert bytes(out) == b'0123'
+    assert drain(parser, bytearray(8)) == [b'@cb']
@@ -0,0 +1,50 @@
+"""Link metrics: per-command counters, RTTs, timeouts and the Prometheus export."""
+
+import hmi2forpc
+
+
+def test_counts_requests_replies_and_round_trips(panelServer, lanHmi):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)])
+    hmi.enableMetrics()
+    hmi.update()
+    hmi.setInt(2, 22)
+    snap = hmi.getMetrics()
+    assert snap['framesOut']['a'] == 1 and snap['framesOut']['L'] == 1
+    assert snap['bytesOut']['L'] == 8  # slot, '@', 'L', word, 3 digits, 'b'
+    sent = sum(snap['framesOut'].values())
+    assert sum(snap['framesIn'].values()) == sent
+    # Every reply is paired with its request
+    assert snap['rttCount'] == sent == sum(snap['rttCounts'])
+    assert snap['cycles'] == 1 and snap['timeouts'] == 0
+
+
+def test_packed_frames_are_counted_once(panelServer, lanHmi):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)], write_behind=True)
+    hmi.enableMetrics()
+    for word in range(5):
+        hmi.setInt(word, word + 1)
+    hmi.setDInt(1, 7)
+    assert hmi.flush() == 6
+    snap = hmi.getMetrics()
+    assert snap['framesOut'] == {'L': 5, 'N': 1}
+    assert snap['rttCount'] == 6
+
+
+def test_timeouts_and_the_prometheus_text(panelServer, lanHmi):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)])
+    hmi.responseTimeout = 50
+    hmi.enableMetrics()
+    hmi.update()
+    server.link.loss = 1.0
+    hmi.update()
+    assert hmi.getMetrics()['timeouts'] == 1
+    text = hmi2forpc.prometheusText(hmi, labels={'panel': 'p1'})
+    assert 'hmi2_response_timeouts_total{panel="p1"} 1\n' in text
+    assert 'hmi2_frames_sent_total{panel="p1",command="e"} 1\n' in text
+    assert '# TYPE hmi2_rtt_seconds histogram' in text
+    assert 'hmi2_rtt_seconds_bucket{panel="p1",le="+Inf"} ' in text
+    hmi.enableMetrics(False)
+    assert hmi.getMetrics() is None and hmi2forpc.prometheusText(hmi) == ''
@@ -0,0 +1,53 @@
+"""The non-blocking poll() update cycle on the readiness-driven LAN engine."""
+
+import time
+
+import hmi2
+import hmi2sim
+
+
+def pollUntilIdle(hmi, limit=5.0):
+    """Run poll() cycles until one completes with no panel change left."""
+    deadline = time.time() + limit
+    while True:
+        assert time.time() < deadline, "poll() never went idle"
+        if hmi.poll(10) and hmi.cycleState == hmi2.CYCLE_IDLE and not hmi.pendingWrites:
+            return
+
+
+def test_poll_reaches_idle_with_matching_tables(panelServer, lanHmi, matches, randomWrites):
+    server = panelServer(latency=0.002)
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)], drain_window=4)
+    bank = server.panel.bank(1)
+    for event in hmi2sim.randomScript(200, slot=1, seed=7):
+        server.panel.apply(*event[1:])
+    assert server.panel.pending(1)
+    steps = 0
+    deadline = time.time() + 5
+    while server.panel.pending(1):
+        assert time.time() < deadline, "poll() stopped draining"
+        hmi.poll(0)
+        steps += 1
+        if steps <= 50 and hmi.cycleState != hmi2.CYCLE_IDLE:
+            # Writes made while a cycle owns the link are queued, not sent
+            randomWrites(hmi, 1, steps)
+            assert hmi.pendingWrites
+    pollUntilIdle(hmi)
+    assert hmi.cycleState == hmi2.CYCLE_IDLE
+    assert matches(hmi, bank)
+    assert steps > 1
+
+
+def test_poll_does_not_wait_for_a_slow_panel(panelServer, lanHmi):
+    server = panelServer(latency=0.1)
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)])
+    server.panel.apply(1, 'setInt', 2, 22)
+    start = time.perf_counter()
+    assert not hmi.poll(0)
+    assert time.perf_counter() - start < 0.05
+    assert hmi.cycleState == hmi2.CYCLE_POLL
+    # The blocking update() finishes the cycle poll() started
+    hmi.update()
+    assert hmi.cycleState == hmi2.CYCLE_IDLE
+    pollUntilIdle(hmi)
+    assert hmi.nFile[2] == 22
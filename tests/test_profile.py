@@ -0,0 +1,55 @@
+"""Update-cycle profiler: phase times, decoded records and bytes per cycle."""
+
+import hmi2sim
+from hmi2profile import PHASE_DRAIN, PHASE_POLL, Hmi2Profiler
+
+
+def test_a_slow_panel_profiles_network_bound(panelServer, lanHmi):
+    server = panelServer(latency=0.01)
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)], drain_window=1)
+    profiler = hmi.enableProfiler()
+    hmi.update()
+    server.panel.apply(1, 'setInt', 3, 33)
+    server.panel.apply(1, 'setFloat', 2, 1.5)
+    server.panel.apply(1, 'setBoolean', 0, 1, True)
+    hmi.update()
+    summary = hmi.getProfile()
+    assert summary['cycles'] == 2 and summary['aborted'] == 0
+    assert summary['bound'] == 'network'
+    assert summary['records']['K'] == 1 and summary['records']['O'] == 1 and summary['records']['A'] == 1
+    # Three records and the 'd' at one 'c' round trip each, plus two polls
+    assert summary['phases']['drain']['totalUs'] >= 4 * 9000
+    assert summary['phases']['poll']['totalUs'] >= 2 * 9000
+    assert summary['bytesIn']['max'] > 0 and summary['bytesOut']['total'] > 0
+    lines = []
+    profiler.report(lines.append)
+    assert lines[0].startswith("[HMI2] 2 cycles (0 aborted), network-bound")
+    hmi.enableProfiler(False)
+    assert hmi.getProfile() is None
+
+
+def test_an_aborted_cycle_is_not_folded_in(panelServer, lanHmi):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)])
+    hmi.responseTimeout = 50
+    hmi.enableProfiler()
+    for event in hmi2sim.randomScript(20, slot=1, seed=1):
+        server.panel.apply(*event[1:])
+    hmi.update()
+    cycles = hmi.getProfile()['cycles']
+    server.link.loss = 1.0
+    hmi.update()
+    summary = hmi.getProfile()
+    assert summary['cycles'] == cycles and summary['aborted'] == 1
+
+
+def test_decode_time_is_taken_out_of_the_drain_phase():
+    profiler = Hmi2Profiler()
+    profiler.start()
+    profiler.mark(PHASE_POLL)
+    profiler.record(75, 300)
+    profiler.record(79, 200)
+    profiler.end(PHASE_DRAIN)
+    summary = profiler.summary()
+    assert summary['phases']['decode']['totalUs'] == 500
+    assert summary['records']['K'] == 1 and summary['records']['O'] == 1
@@ -0,0 +1,45 @@
+"""Tag tables sized from the hmi2.h board profiles."""
+
+import time
+
+import pytest
+
+import hmi2
+
+
+@pytest.mark.parametrize('profile, sizes', [('UNO', (20, 20)), ('mega', (60, 50)), ('DUE', (60, 50)), (None, (60, 50))])
+def test_profiles_size_the_tables(profile, sizes):
+    hmi = hmi2.Hmi2(profile)
+    assert (hmi.bSize, hmi.ndfSize) == sizes
+    assert len(hmi.bFile) == sizes[0]
+    assert len(hmi.nFile) == len(hmi.dFile) == len(hmi.fFile) == sizes[1]
+    assert len(hmi.nFileUpdate) == (sizes[1] + 7) // 8
+
+
+def test_sizes_override_the_profile():
+    hmi = hmi2.Hmi2('UNO', b_size=8)
+    assert (hmi.bSize, hmi.ndfSize) == (8, 20)
+    with pytest.raises(ValueError):
+        hmi2.Hmi2('ATTINY')
+    with pytest.raises(ValueError):
+        hmi2.Hmi2(b_size=61)
+    with pytest.raises(ValueError):
+        hmi2.Hmi2(ndf_size=0)
+
+
+def test_words_outside_the_tables_are_ignored(panelServer, lanHmi):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 2)], hmi=hmi2.Hmi2(b_size=4, ndf_size=4))
+    hmi.setInt(4, 1)
+    hmi.setBoolean(4, 0, True)
+    assert hmi.getInt(4) == 0 and not hmi.getBoolean(4, 0)
+    server.panel.apply(2, 'setInt', 10, 5)
+    server.panel.apply(2, 'setInt', 3, 6)
+    server.panel.apply(2, 'setBoolean', 20, 1, True)
+    deadline = time.time() + 3
+    while server.panel.pending(2):
+        assert time.time() < deadline
+        hmi.update()
+    assert list(hmi.nFile) == [0, 0, 0, 6]
+    assert list(hmi.bFile) == [0, 0, 0, 0]
+    assert server.panel.bank(2).nFile[4] == 0
@@ -0,0 +1,87 @@
+"""Serial (UART) link: the in-process PanelSerial loopback, a real pty and the baud-rate reply timeout."""
+
+import os
+import time
+
+import pytest
+
+import hmi2
+import hmi2sim
+from hmi2transport import SerialPort
+
+
+def roundTrip(hmi, bank):
+    hmi.update()
+    hmi.setInt(5, 999)
+    hmi.setFloat(7, -2.25)
+    hmi.setBoolean(0, 3, True)
+    hmi.setDInt(8, 123456789)
+    hmi.setCursor(0, 1)
+    hmi.print('Hi')
+    hmi.setCursor(0, 0)
+    hmi.print('Lo')
+    assert bank.nFile[5] == 999
+    assert bank.fFile[7] == -2.25
+    assert bank.bFile[0] == 8
+    assert bank.dFile[8] == 123456789
+    assert bank.getLine(1, 0).startswith('Lo')
+    assert bank.getLine(1, 1).startswith('Hi')
+
+
+def test_loopback_round_trip(matches):
+    panel = hmi2sim.Panel(banks=1)
+    hmi = hmi2.Hmi2()
+    hmi.init(hmi2sim.PanelSerial(panel, baudrate=115200), auto_update=False, background_scan=False)
+    roundTrip(hmi, panel.bank(1))
+    for event in hmi2sim.randomScript(60, slot=1, seed=4):
+        panel.apply(*event[1:])
+    while panel.pending(1):
+        hmi.update()
+    assert matches(hmi, panel.bank(1))
+
+
+
+@pytest.mark.skipif(os.name != 'posix' or not hasattr(os, 'openpty'), reason="needs a POSIX pty")
+def test_pty_round_trip(matches):
+    panel = hmi2sim.Panel(banks=1)
+    pty = hmi2sim.PanelPty(panel).start()
+    port = SerialPort(pty.device, 115200)
+    try:
+        hmi = hmi2.Hmi2()
+        hmi.init(port, auto_update=False, background_scan=False)
+        roundTrip(hmi, panel.bank(1))
+        for event in hmi2sim.randomScript(60, slot=1, seed=5):
+            panel.apply(*event[1:])
+        while panel.pending(1):
+            hmi.update()
+        assert matches(hmi, panel.bank(1))
+    finally:
+        port.close()
+        pty.stop()
+
+def uartHmi(baudrate, **kwargs):
+    hmi = hmi2.Hmi2()
+    hmi.init(hmi2sim.PanelSerial(hmi2sim.Panel(banks=1), baudrate=baudrate, **kwargs),
+             auto_update=False, background_scan=False)
+    return hmi
+
+
+def test_reply_timeout_follows_the_baud_rate():
+    fast = uartHmi(115200)
+    slow = uartHmi(1200)
+    assert fast.linkTimeout() == fast.hardEngine.frameTimeout() < 150
+    assert slow.linkTimeout() == slow.hardEngine.frameTimeout() > 800
+    # An explicit responseTimeout wins on either link, shorter or longer
+    fast.responseTimeout = 500
+    assert fast.linkTimeout() == 500
+    lan = hmi2.Hmi2()
+    assert lan.linkTimeout() == hmi2.RESPONSE_TIMEOUT
+    lan.responseTimeout = 200
+    assert lan.linkTimeout() == 200
+
+
+def test_a_silent_fast_line_times_out_on_its_budget():
+    hmi = uartHmi(115200, loss=1.0)
+    start = time.perf_counter()
+    hmi.update()
+    assert time.perf_counter() - start < 0.5
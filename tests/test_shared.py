@@ -0,0 +1,107 @@
+"""Six memory banks multiplexed over one SharedLan socket."""
+
+import random
+import time
+
+import pytest
+
+import hmi2
+import hmi2sim
+from hmi2transport import SharedLan
+
+
+def test_replies_are_routed_to_their_bank(panelServer, matches):
+    server = panelServer(latency=0.002)
+    shared = SharedLan('127.0.0.1', port=server.address[1])
+    views = []
+    for slot in range(1, 7):
+        hmi = hmi2.Hmi2()
+        hmi.init(shared, slot, auto_update=False, drain_window=4)
+        views.append(hmi)
+    with pytest.raises(ValueError):
+        hmi2.Hmi2().init(shared, 3, auto_update=False)
+
+    for slot in range(1, 7):
+        for event in hmi2sim.randomScript(60, slot=slot, seed=slot):
+            server.panel.apply(*event[1:])
+    rnd = random.Random(9)
+    deadline = time.time() + 5
+    while server.panel.pending():
+        assert time.time() < deadline, "banks stopped draining"
+        shared.poll(5)
+        if rnd.random() < 0.2:
+            rnd.choice(views).setInt(rnd.randrange(50), rnd.randrange(0x10000))
+    shared.update()
+    shared.update()
+    views[4].setDInt(7, 123456)
+    views[4].update()
+
+    assert server.connections == 1
+    assert shared.owners[shared.ownersHead:] == []
+    for hmi in views:
+        assert matches(hmi, server.panel.bank(hmi.myLanSlot))
+    assert server.panel.bank(5).dFile[7] == 123456
+    shared.close()
+
+
+def test_reconnects_after_an_outage(panelServer):
+    server = panelServer()
+    shared = SharedLan('127.0.0.1', port=server.address[1])
+    hmi = hmi2.Hmi2()
+    hmi.init(shared, 6, auto_update=False)
+    shared.update()
+    server.dropConnections()
+    time.sleep(0.05)
+    shared.update()
+    deadline = time.time() + 5
+    while not shared.connected:
+        assert time.time() < deadline, "no reconnect"
+        shared.poll(50)
+    server.panel.apply(6, 'setInt', 1, 4321)
+    shared.update()
+    shared.update()
+    assert hmi.nFile[1] == 4321
+    assert server.connections == 2
+    shared.close()
+
+
+def test_a_lost_reply_resyncs_every_bank(panelServer, matches):
+    server = panelServer(latency=0.001, loss=0.02, seed=3)
+    shared = SharedLan('127.0.0.1', port=server.address[1])
+    shared.engine.retryBase = 10
+    views = []
+    for slot in (1, 2):
+        hmi = hmi2.Hmi2()
+        hmi.init(shared, slot, auto_update=False, drain_window=4)
+        hmi.responseTimeout = 50
+        views.append(hmi)
+    # Disjoint value ranges: a reply routed to the wrong bank stands out
+    for k in range(120):
+        server.panel.apply(1, 'setInt', k % 20, k)
+        server.panel.apply(2, 'setInt', k % 20, 60000 + k)
+
+    def separated():
+        return (all(v < 1000 for v in views[0].nFile)
+                and all(v == 0 or v >= 60000 for v in views[1].nFile))
+
+    rnd = random.Random(4)
+    deadline = time.time() + 8
+    while server.panel.pending() or server.link.dropped < 3:
+        assert time.time() < deadline, "banks stopped draining"
+        shared.poll(5)
+        if rnd.random() < 0.1:
+            views[0].setInt(20 + rnd.randrange(10), rnd.randrange(1000))
+            views[1].setInt(20 + rnd.randrange(10), 60000 + rnd.randrange(1000))
+        if server.link.dropped >= 3:
+            server.link.loss = 0.0
+
+    # update() ends every bank's cycle: once nothing is owed on the stream,
+    # no bank can still be one reply short
+    while (not shared.connected or shared.owners[shared.ownersHead:] or server.panel.pending()
+           or any(hmi.syncro or hmi.pendingWrites or hmi.cycleState for hmi in views)):
+        assert time.time() < deadline, "banks did not resync"
+        shared.update()
+    assert separated()
+    for hmi in views:
+        assert matches(hmi, server.panel.bank(hmi.myLanSlot))
+    shared.close()
@@ -0,0 +1,86 @@
+"""The panel simulator itself, driven with raw frames (no Hmi2 in the loop)."""
+
+import socket
+import time
+
+import hmi2sim
+
+
+def exchange(sock, frames, replies):
+    """Send frames and read `replies` reply frames back."""
+    sock.sendall(b''.join(frames))
+    data = b''
+    deadline = time.time() + 3
+    while data.count(b'b') < replies:
+        assert time.time() < deadline, "missing replies"
+        data += sock.recv(4096)
+    return [frame + b'b' for frame in data.split(b'b')[:-1]]
+
+
+def test_poll_drain_and_write_ack():
+    panel = hmi2sim.Panel(banks=2)
+    panel.apply(2, 'setInt', 4, 1234)
+    assert panel.handleFrame(b'\x02@eb') == b'cb'
+    assert panel.handleFrame(b'\x01@eb') == b'db'
+    record = panel.handleFrame(b'\x02@cb')
+    assert record == bytes([hmi2sim.REC_INT, 4] + hmi2sim.split6(1234, 3)) + b'b'
+    assert panel.handleFrame(b'\x02@cb') == b'db'
+    # Writes are acknowledged with their command letter
+    assert panel.handleFrame(b'\x01@L\x07' + bytes(hmi2sim.split6(999, 3)) + b'b') == b'Lb'
+    assert panel.bank(1).nFile[7] == 999
+    assert panel.handleFrame(b'\x07@eb') is None
+    assert panel.stats()['framesIn'] == 5
+
+
+def test_sync_replays_the_panel_tags_then_asks_for_updates():
+    panel = hmi2sim.Panel(banks=1)
+    panel.apply(1, 'setBoolean', 3, 2, True)
+    panel.apply(1, 'setFloat', 1, 2.5)
+    while panel.handleFrame(b'@cb', lan=False) != b'db':
+        pass
+    assert panel.handleFrame(b'@ab', lan=False) == b'cb'
+    codes = []
+    while True:
+        reply = panel.handleFrame(b'@cb', lan=False)
+        codes.append(reply[0])
+        if reply[0] in (hmi2sim.CODE_DONE, hmi2sim.CODE_UPDATE):
+            break
+    assert codes == [hmi2sim.REC_BINARY, hmi2sim.REC_REAL, hmi2sim.CODE_UPDATE]
+
+
+def test_random_script_is_reproducible():
+    assert hmi2sim.randomScript(50, slot=3, seed=8) == hmi2sim.randomScript(50, slot=3, seed=8)
+    assert all(event[1] == 3 for event in hmi2sim.randomScript(20, slot=3))
+
+
+def test_server_answers_in_order_and_drops_replies(panelServer):
+    server = panelServer()
+    server.panel.apply(1, 'setInt', 0, 7)
+    with socket.create_connection(server.address, 3) as sock:
+        replies = exchange(sock, [b'\x01@eb', b'\x01@cb', b'\x01@cb', b'\x02@Nb'], 4)
+        assert [r[0] for r in replies] == [hmi2sim.CODE_CHANGES, hmi2sim.REC_INT, hmi2sim.CODE_DONE, hmi2sim.CODE_DONE]
+        server.link.loss = 1.0
+        sock.sendall(b'\x01@eb')
+        sock.settimeout(0.2)
+        try:
+            assert sock.recv(16) == b''
+        except socket.timeout:
+            pass
+        assert server.link.dropped == 1
+    assert server.connections == 1
+
+
+def test_latency_holds_replies_back(panelServer):
+    server = panelServer(latency=0.05)
+    with socket.create_connection(server.address, 3) as sock:
+        start = time.monotonic()
+        exchange(sock, [b'\x01@eb'], 1)
+        assert time.monotonic() - start >= 0.045
+
+
+def test_serial_loopback_paces_replies_at_the_baud_rate():
+    uart = hmi2sim.PanelSerial(baudrate=1200)
+    uart.write(b'@eb')
+    assert uart.any() == 0
+    time.sleep(0.06)  # 5 bytes at 1200 baud: 42 ms
+    assert uart.read() == b'db'
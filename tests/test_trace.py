@@ -0,0 +1,53 @@
+"""Trace hooks: the ring-buffer recorder, several subscribers and the console printer."""
+
+import hmi2
+from hmi2trace import TraceFanout, TraceRecorder, printTrace
+
+
+def test_recorder_keeps_the_last_events():
+    recorder = TraceRecorder(4)
+    for k in range(6):
+        recorder('send', k)
+    assert len(recorder) == 4 and recorder.dropped == 2
+    assert [args for stamp, event, args in recorder.events()] == [(2,), (3,), (4,), (5,)]
+    lines = []
+    recorder.dump(lines.append)
+    assert lines[0] == "[HMI2] 2 older events dropped"
+    assert lines[1].startswith("[HMI2] +0us send (2,)")
+    recorder.clear()
+    assert recorder.events() == []
+
+
+def test_hooks_see_a_cycle_and_detach(panelServer, lanHmi):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)], write_behind=True)
+    assert hmi.trace is None
+    first = hmi.addTraceHook(TraceRecorder(64))
+    assert hmi.trace is first
+    second = hmi.addTraceHook(TraceRecorder(64))
+    assert isinstance(hmi.trace, TraceFanout)
+    hmi.update()
+    hmi.setInt(1, 11)
+    hmi.setInt(2, 22)
+    hmi.flush()
+    names = [event for stamp, event, args in first.events()]
+    assert names == [event for stamp, event, args in second.events()]
+    assert names[:2] == ['update', 'send'] and 'reply' in names
+    assert ('sendFrames', (2, 16)) in [(event, args) for stamp, event, args in first.events()]
+    hmi.removeTraceHook(second)
+    hmi.removeTraceHook(first)
+    assert hmi.trace is None
+    first.clear()
+    hmi.setInt(3, 33)
+    hmi.update()
+    assert len(first) == 0
+
+
+def test_print_trace_goes_quiet_when_removed(capsys):
+    hmi = hmi2.Hmi2()
+    hmi.addTraceHook(printTrace)
+    hmi.setInt(1, 5)
+    assert "[HMI2] writeNFile (1, 5)" in capsys.readouterr().out
+    hmi.removeTraceHook(printTrace)
+    hmi.setInt(1, 6)
+    assert capsys.readouterr().out == ''
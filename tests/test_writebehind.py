@@ -0,0 +1,58 @@
+"""Write-behind: set* writes queued and sent coalesced by flush()/update()."""
+
+
+def test_flush_is_acked(panelServer, lanHmi, matches, randomWrites):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 3)], write_behind=True)
+    bank = server.panel.bank(3)
+    hmi.update()
+    randomWrites(hmi, 400, 5)
+    hmi.setCursor(0, 0)
+    hmi.print('hello')
+    assert hmi.pendingWrites
+    assert server.panel.stats()['commands'].get('L', 0) == 0
+    before = server.panel.stats()['framesIn']
+    acked = hmi.flush()
+    assert acked == server.panel.stats()['framesIn'] - before
+    assert acked > 0
+    assert not hmi.pendingWrites
+    assert hmi.flush() == 0
+    assert matches(hmi, bank)
+    assert bank.getLine(1, 0).startswith('hello')
+
+
+def test_repeated_writes_coalesce(panelServer, lanHmi):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)], write_behind=True)
+    for value in range(100):
+        hmi.setInt(2, value)
+        hmi.setBoolean(1, 4, value & 1)
+    assert hmi.flush() == 2
+    bank = server.panel.bank(1)
+    assert bank.nFile[2] == 99
+    assert bank.getBoolean(1, 4)
+
+
+def test_update_sends_the_pending_writes(panelServer, lanHmi, matches, randomWrites):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 1)], write_behind=True)
+    randomWrites(hmi, 50, 2)
+    hmi.update()
+    assert not hmi.pendingWrites
+    assert matches(hmi, server.panel.bank(1))
+
+
+def test_resync_pushes_the_local_tables(panelServer, lanHmi, matches, randomWrites):
+    server = panelServer()
+    hmi = lanHmi([('127.0.0.1', server.address[1], 2)], write_behind=True)
+    bank = server.panel.bank(2)
+    randomWrites(hmi, 100, 9)
+    hmi.update()
+    # The panel app restarts with empty tables and asks for a full resync
+    bank.bFile = [0] * 60
+    bank.nFile = [0] * 50
+    bank.dFile = [0] * 50
+    bank.fFile = [0.0] * 50
+    hmi.syncro = True
+    hmi.update()
+    assert matches(hmi, bank)